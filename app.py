@@ -24,11 +24,14 @@ from scipy import stats
 from scipy.stats import gaussian_kde
 from scipy.optimize import minimize_scalar
 import io
+import math
+import re
 import warnings
 import json
 import os
 import hashlib
 import joblib
+from typing import NamedTuple
 
 # Import unified components
 from components import (
@@ -81,6 +84,14 @@ try:
 except ImportError:
     SUPABASE_AVAILABLE = False
 
+# Numba JIT kernels (optional)
+try:
+    from returns_numba import compound_by_group
+    from copula_numba import kendall_tau_knight, rolling_copula_numba, full_period_copula_numba
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
 # ═══════════════════════════════════════════════════════════════════════════════
 # CONFIGURATION - DATA SOURCES
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -694,6 +705,193 @@ def standardize_cnpj(cnpj):
         return None
     return str(cnpj).replace('.', '').replace('/', '').replace('-', '')
 
+
+def align_ffill(values, index_i8, target_i8):
+    """
+    Forward-fill rows of a 2D array onto target dates - NumPy equivalent of
+    reindex(method='ffill').fillna(0). Both date arrays are sorted int64 nanoseconds.
+    """
+    pos = np.searchsorted(index_i8, target_i8, side='right') - 1
+    aligned = values[np.maximum(pos, 0)]
+    aligned[pos < 0] = 0.0
+    aligned[np.isnan(aligned)] = 0.0
+    return aligned
+
+
+def trailing_compound_returns(returns, cutoffs):
+    """
+    Compound return from each cutoff date (inclusive) to the end of a sorted returns series,
+    read off one reverse cumulative product. None means the whole series; NaNs count as flat
+    days, as in Series.prod().
+    """
+    vals = np.nan_to_num(returns.to_numpy(dtype=np.float64), nan=0.0)
+    suffix = np.append(np.cumprod(1.0 + vals[::-1])[::-1], 1.0)
+    starts = [0 if c is None else returns.index.searchsorted(c, side='left') for c in cutoffs]
+    return suffix[starts] - 1.0
+
+
+def rolling_compound_returns(returns, window):
+    """
+    Compound return over each trailing window of a returns series, as (1 + r).prod() - 1 over
+    rolling(window) would give: NaN for the first window - 1 rows and for any window holding a
+    NaN. Every window is read off one log1p prefix sum, so there is no per-window callback.
+    """
+    vals = returns.to_numpy(dtype=np.float64)
+    missing = np.isnan(vals)
+    log_sum = np.concatenate(([0.0], np.cumsum(np.log1p(np.where(missing, 0.0, vals)))))
+    nan_count = np.concatenate(([0], np.cumsum(missing)))
+    
+    out = np.full(len(vals), np.nan)
+    if len(vals) >= window:
+        window_ret = np.expm1(log_sum[window:] - log_sum[:-window])
+        window_ret[(nan_count[window:] - nan_count[:-window]) > 0] = np.nan
+        out[window - 1:] = window_ret
+    return pd.Series(out, index=returns.index, name=returns.name)
+
+
+TRAILING_PERIODS = (('12M', 12), ('24M', 24), ('36M', 36), ('Total', None))
+
+
+def trailing_period_slices(returns, periods=TRAILING_PERIODS):
+    """
+    (name, returns from the cutoff onward) for each (name, months) of a sorted returns series;
+    months=None is the whole series. Periods longer than the history are skipped. Starts come
+    from searchsorted on the index and the slices are positional views. Periods are listed
+    shortest first, so once one is out of range the longer ones are not checked.
+    """
+    idx = returns.index
+    first_date, last_date = idx[0], idx[-1]
+    out_of_range = False
+    slices = []
+    for period_name, months in periods:
+        if months is None:
+            slices.append((period_name, returns))
+            continue
+        if out_of_range:
+            continue
+        cutoff = last_date - pd.DateOffset(months=months)
+        if cutoff < first_date:
+            out_of_range = True
+            continue
+        slices.append((period_name, returns.iloc[idx.searchsorted(cutoff, side='left'):]))
+    return slices
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def _aligned_benchmark(bench_series, target_i8, _target_index):
+    return bench_series.reindex(_target_index, method='ffill').fillna(0)
+
+
+def aligned_benchmark(bench_series, target_index):
+    """
+    Benchmark returns forward-filled onto target_index with gaps as 0. Cached per series and
+    index; the DatetimeIndex is keyed by its int64 nanoseconds since Streamlit cannot hash it.
+    """
+    return _aligned_benchmark(bench_series, target_index.as_unit('ns').asi8, target_index)
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def build_fund_lookup(fund_metrics, columns=('CNPJ', 'CATEGORIA BTG', 'SUBCATEGORIA BTG')):
+    """Fund name -> {column: value} for the given columns that exist, keeping the first row per name."""
+    return (
+        fund_metrics.drop_duplicates('FUNDO DE INVESTIMENTO')
+        .set_index('FUNDO DE INVESTIMENTO')[[c for c in columns if c in fund_metrics.columns]]
+        .to_dict('index')
+    )
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def fund_liquidity_map(fund_metrics):
+    """Fund name -> LIQUIDEZ ('D+X'), keeping the first row per name."""
+    if 'LIQUIDEZ' not in fund_metrics.columns:
+        return {}
+    return fund_metrics.drop_duplicates('FUNDO DE INVESTIMENTO').set_index('FUNDO DE INVESTIMENTO')['LIQUIDEZ'].to_dict()
+
+
+# Column title plus centered Min/Max labels above a range filter's two number inputs (one element)
+RANGE_FILTER_HEADER = (
+    "<h6 style='text-align: center; color: #D4AF37'>{col}</h6>"
+    "<div style='display: flex; gap: 1rem; margin-bottom: -10px;'>"
+    "<p style='flex: 1; text-align: center;'>Min</p>"
+    "<p style='flex: 1; text-align: center;'>Max</p>"
+    "</div>"
+)
+
+# Metric columns shown as percentages; RATIO_KEYS columns are plain numbers instead
+PCT_KEYS = re.compile(r"RETURN|VOL|SHARPE|MDD|OMEGA|RACHEV|VAR|CVAR|KENDALL|TAIL|ASYMMETRY|CDAR|M_ABOVE|BEST_MONTH|WORST_MONTH|EXCESS")
+RATIO_KEYS = ("SHARPE", "OMEGA", "RACHEV", "KENDALL", "ASYMMETRY")
+
+# Constraint tables longer than this are not handed to st.data_editor whole
+EDITOR_MAX_ROWS = 50
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def _classify_metric_columns(cols):
+    """Return (pct_cols, ratio_cols) for a column tuple; ratio_cols is a subset of pct_cols."""
+    pct_cols = [c for c in cols if PCT_KEYS.search(c)]
+    ratio_cols = [c for c in pct_cols if any(k in c for k in RATIO_KEYS)]
+    return pct_cols, ratio_cols
+
+
+def range_filter_mask(df, ranges):
+    """
+    Boolean mask of rows with every column inside its inclusive (min, max) range; NaN fails.
+    """
+    mask = np.ones(len(df), dtype=bool)
+    for col, (lo, hi) in ranges.items():
+        # na_value: nullable (Int64/Float64) columns give NA rather than False for missing rows
+        mask &= df[col].between(lo, hi).to_numpy(dtype=bool, na_value=False)
+    return mask
+
+
+def apply_category_filters(mask, df, filters):
+    """AND every categorical isin condition into mask in a single reduction (in place)."""
+    if filters:
+        np.logical_and.reduce([mask] + [df[col].isin(vals).to_numpy() for col, vals in filters.items()], out=mask)
+    return mask
+
+
+def constraint_editor_rows(df, key_col, label, key):
+    """
+    Rows of a constraint table to pass to st.data_editor. Small tables go in whole; past
+    EDITOR_MAX_ROWS only the rows picked in a multiselect (active ones preselected) are
+    edited, since the editor re-renders every row on each rerun. Unpicked rows end up
+    inactive, exactly as if unchecked in the full table.
+    """
+    if len(df) <= EDITOR_MAX_ROWS:
+        return df
+    
+    picked = st.multiselect(
+        f"{label} to constrain ({len(df)} available):",
+        df[key_col].tolist(),
+        default=df.loc[df['Active'].to_numpy(dtype=bool), key_col].tolist(),
+        key=key
+    )
+    return df[df[key_col].isin(picked).to_numpy()].reset_index(drop=True)
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def _categorize_columns(cols):
+    """Split fund metrics columns into the Column Selection categories (cached on the column tuple)."""
+    cols = list(cols)
+    present = set(cols)
+    
+    def existing(candidates):
+        return [c for c in candidates if c in present]
+    
+    return {
+        'basic': existing(['FUNDO DE INVESTIMENTO', 'CNPJ', 'GESTOR', 'CATEGORIA BTG',
+                           'SUBCATEGORIA BTG', 'STATUS', 'VL_PATRIM_LIQ', 'NR_COTST', 'TRIBUTAÇÃO', 'LIQUIDEZ', 'SUITABILITY']),
+        'return': [c for c in cols if 'RETURN' in c] + [c for c in cols if 'EXCESS' in c],
+        'risk': existing(['VOL_12M', 'VOL_24M', 'VOL_36M', 'VOL_TOTAL',
+                          'SHARPE_12M', 'SHARPE_24M', 'SHARPE_36M', 'SHARPE_TOTAL',
+                          'MDD', 'CDAR_95', 'MDD_DAYS']),
+        'advanced': existing(['OMEGA_DAILY', 'OMEGA_MONTHLY', 'OMEGA_WEEKLY', 'RACHEV_DAILY', 'RACHEV_MONTHLY', 'RACHEV_WEEKLY',
+                              'VAR_95_D', 'VAR_95_M', 'CVAR_95_D', 'CVAR_95_M']),
+        'exposure': [c for c in cols if any(x in c for x in ('KENDALL_TAU', 'TAIL_LOWER', 'TAIL_UPPER', 'ASYMMETRY'))],
+        'monthly': existing(['M_ABOVE_0', 'M_ABOVE_BCHMK', 'BEST_MONTH', 'WORST_MONTH'])
+    }
+
 # ═══════════════════════════════════════════════════════════════════════════════
 # COPULA FUNCTIONS FOR EXPOSURE CALCULATION
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -706,6 +904,15 @@ def to_empirical_cdf(returns_series):
     return uniform
 
 
+def fast_kendall_tau(u, v):
+    """Kendall's tau-b of two arrays - jitted Knight algorithm when numba is available."""
+    u = np.asarray(u, dtype=np.float64)
+    v = np.asarray(v, dtype=np.float64)
+    if NUMBA_AVAILABLE:
+        return kendall_tau_knight(u, v)
+    return stats.kendalltau(u, v)[0]
+
+
 def gumbel_270_loglik(u, v, theta):
     """Gumbel 270° rotation: captures LOWER tail dependence."""
     u_rot = 1 - u
@@ -732,15 +939,13 @@ def gumbel_270_loglik(u, v, theta):
         return -1e10
 
 
-def estimate_gumbel_270_parameter(u, v):
-    """Estimate Gumbel 270° copula parameter using MLE."""
-    tau_empirical = stats.kendalltau(u, v)[0]
+def estimate_gumbel_270_parameter(u, v, tau=None):
+    """Estimate Gumbel 270° copula parameter using MLE (pass tau if already computed)."""
+    tau_empirical = fast_kendall_tau(u, v) if tau is None else tau
     
     if tau_empirical <= 0.01:
         return 1.1, False
     
-    theta_init = max(1.01, 1 / (1 - tau_empirical))
-    
     def neg_loglik(theta):
         if theta <= 1.0:
             return 1e10
@@ -794,15 +999,13 @@ def gumbel_180_loglik(u, v, theta):
         return -1e10
 
 
-def estimate_gumbel_180_parameter(u, v):
-    """Estimate Survival Gumbel (180°) parameter using MLE."""
-    tau_empirical = stats.kendalltau(u, v)[0]
+def estimate_gumbel_180_parameter(u, v, tau=None):
+    """Estimate Survival Gumbel (180°) parameter using MLE (pass tau if already computed)."""
+    tau_empirical = fast_kendall_tau(u, v) if tau is None else tau
     
     if tau_empirical <= 0.01:
         return 1.1, False
     
-    theta_init = max(1.01, 1 / (1 - tau_empirical))
-    
     def neg_loglik(theta):
         if theta <= 1.0:
             return 1e10
@@ -833,10 +1036,43 @@ def clayton_tail_dependence(theta):
     return 2 ** (-1 / theta)
 
 
-def estimate_rolling_copula_for_chart(fund_returns, benchmark_returns, window=250):
+# Minimum rolling windows per thread before the numba kernel is split across cores
+COPULA_WINDOWS_PER_JOB = 250
+
+
+def _rolling_copula_parallel(fund_arr, bench_arr, window, n_jobs=None):
+    """
+    rolling_copula_numba over contiguous blocks of windows, one per thread.
+    
+    Windows are independent and the kernel releases the GIL, so blocks run
+    concurrently; each block gets window - 1 leading observations of overlap.
+    n_jobs caps the threads (default: all cores); callers that already run
+    inside a worker pass their share so the pools do not oversubscribe.
+    """
+    n_windows = fund_arr.shape[0] - window + 1
+    n_jobs = min(n_jobs or os.cpu_count() or 1, n_windows // COPULA_WINDOWS_PER_JOB)
+    if n_jobs <= 1:
+        return rolling_copula_numba(fund_arr, bench_arr, window)
+    
+    bounds = np.linspace(0, n_windows, n_jobs + 1).astype(np.int64)
+    blocks = joblib.Parallel(n_jobs=n_jobs, prefer='threads')(
+        joblib.delayed(rolling_copula_numba)(fund_arr[a:b + window - 1], bench_arr[a:b + window - 1], window)
+        for a, b in zip(bounds[:-1], bounds[1:])
+    )
+    return tuple(np.concatenate(parts) for parts in zip(*blocks))
+
+
+# Rolling copula outputs are bounded in [-1, 1] and shown to 4 decimals, so they are stored as
+# float32: the cached results (unpickled on every rerun) and chart payloads are half the size.
+# Ranks, Kendall tau and the Gumbel fits themselves are computed in float64.
+COPULA_RESULT_DTYPE = np.float32
+
+
+def estimate_rolling_copula_for_chart(fund_returns, benchmark_returns, window=250, n_jobs=None):
     """
     Calculate rolling copula metrics for visualization.
     Returns DataFrame with kendall_tau, tail_lower, tail_upper, asymmetry_index.
+    n_jobs is the thread budget for the numba window split (see _rolling_copula_parallel).
     """
     # Align benchmark to fund's dates
     benchmark_aligned = benchmark_returns.reindex(fund_returns.index, method='ffill').fillna(0)
@@ -859,6 +1095,20 @@ def estimate_rolling_copula_for_chart(fund_returns, benchmark_returns, window=25
     
     n_windows = n - effective_window + 1
     
+    if NUMBA_AVAILABLE:
+        kendall, tail_lower, tail_upper, asym = _rolling_copula_parallel(
+            aligned['fund'].to_numpy(dtype=np.float64),
+            aligned['benchmark'].to_numpy(dtype=np.float64),
+            effective_window,
+            n_jobs=n_jobs
+        )
+        return pd.DataFrame({
+            'kendall_tau': kendall,
+            'tail_lower': tail_lower,
+            'tail_upper': tail_upper,
+            'asymmetry_index': asym
+        }, index=aligned.index[effective_window - 1:].rename(None), dtype=COPULA_RESULT_DTYPE)
+    
     # Pre-allocate arrays
     tau_series = np.zeros(n_windows)
     tail_lower_series = np.zeros(n_windows)
@@ -866,22 +1116,21 @@ def estimate_rolling_copula_for_chart(fund_returns, benchmark_returns, window=25
     asymmetry_series = np.zeros(n_windows)
     dates = []
     
+    fund_arr = aligned['fund'].to_numpy()
+    bench_arr = aligned['benchmark'].to_numpy()
+    
     # Rolling window estimation
     for i in range(n_windows):
-        # Extract window
-        window_fund = aligned['fund'].iloc[i:i+effective_window]
-        window_bench = aligned['benchmark'].iloc[i:i+effective_window]
-        
-        # Transform to empirical CDF
-        u = to_empirical_cdf(window_fund)
-        v = to_empirical_cdf(window_bench)
+        # Transform window to empirical CDF (same ranks as to_empirical_cdf, without pandas overhead)
+        u = stats.rankdata(fund_arr[i:i+effective_window]) / (effective_window + 1)
+        v = stats.rankdata(bench_arr[i:i+effective_window]) / (effective_window + 1)
         
         # Calculate Kendall's tau
-        tau = stats.kendalltau(u.values, v.values)[0]
+        tau = fast_kendall_tau(u, v)
         tau_series[i] = tau
         
         # Fit Gumbel 270° for LOWER tail
-        theta_lower, success_lower = estimate_gumbel_270_parameter(u.values, v.values)
+        theta_lower, success_lower = estimate_gumbel_270_parameter(u, v, tau)
         
         if success_lower:
             lambda_lower, _ = gumbel_270_tail_dependence(theta_lower)
@@ -891,7 +1140,7 @@ def estimate_rolling_copula_for_chart(fund_returns, benchmark_returns, window=25
             tail_lower_series[i] = 0.1
         
         # Fit Gumbel 180° for UPPER tail
-        theta_upper, success_upper = estimate_gumbel_180_parameter(u.values, v.values)
+        theta_upper, success_upper = estimate_gumbel_180_parameter(u, v, tau)
         
         if success_upper:
             _, lambda_upper = gumbel_180_tail_dependence(theta_upper)
@@ -916,10 +1165,108 @@ def estimate_rolling_copula_for_chart(fund_returns, benchmark_returns, window=25
         'tail_lower': tail_lower_series,
         'tail_upper': tail_upper_series,
         'asymmetry_index': asymmetry_series
-    }, index=dates)
+    }, index=dates, dtype=COPULA_RESULT_DTYPE)
     
     return results
 
+
+def _one_bench(bench_name, fund_series, bench_series, window=250, n_jobs=None):
+    """Rolling copula for one benchmark - unit of work for joblib."""
+    return bench_name, estimate_rolling_copula_for_chart(fund_series, bench_series, window=window, n_jobs=n_jobs)
+
+
+def estimate_rolling_copula_by_benchmark(fund_returns, benchmarks, bench_names, window=250):
+    """
+    Rolling copula metrics for several benchmarks.
+    
+    Benchmarks are independent, so with more than one they are spread over
+    workers; a single benchmark runs in-process. The numba kernel releases
+    the GIL, so it uses threads (compiled once, no per-worker JIT); the pure
+    Python path uses processes. Each worker gets an equal share of the cores
+    for its own window split, so the two levels never exceed the core count.
+    """
+    if len(bench_names) > 1:
+        n_cores = os.cpu_count() or 1
+        n_jobs = min(len(bench_names), n_cores)
+        inner_jobs = max(1, n_cores // n_jobs)
+        results = joblib.Parallel(n_jobs=n_jobs, prefer='threads' if NUMBA_AVAILABLE else 'processes')(
+            joblib.delayed(_one_bench)(b, fund_returns, benchmarks[b], window, inner_jobs) for b in bench_names
+        )
+    else:
+        results = [_one_bench(b, fund_returns, benchmarks[b], window) for b in bench_names]
+    
+    return dict(results)
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def _available_benchmarks(cols_tuple):
+    """Exposure benchmarks present in the benchmark columns, in display order."""
+    present = set(cols_tuple)
+    return tuple(b for b in ('CDI', 'USDBRL', 'GOLD', 'IBOVESPA', 'SP500', 'BITCOIN') if b in present)
+
+
+COPULA_METRICS = ('kendall_tau', 'tail_lower', 'tail_upper', 'asymmetry_index')
+
+
+def copula_last_and_average(copula_results):
+    """
+    Last-window and average values of the rolling copula metrics, as two arrays ordered like
+    COPULA_METRICS, from one NumPy block (NaN windows are left out of the average, as in .mean()).
+    """
+    vals = copula_results[list(COPULA_METRICS)].to_numpy(dtype=np.float64)
+    return vals[-1], np.nanmean(vals, axis=0)
+
+
+def _series_content_key(series):
+    """
+    Content identity for a series or frame used in cache keys. Hashes the values and index,
+    so a data refresh or re-upload over the same date range or shape gets a new key.
+    """
+    if series is None or len(series) == 0:
+        return (0,)
+    digest = hashlib.blake2b(pd.util.hash_pandas_object(series, index=True).to_numpy().tobytes(), digest_size=16)
+    return (len(series), digest.hexdigest())
+
+
+@st.cache_data(ttl=3600, show_spinner=False, max_entries=64)
+def estimate_rolling_copula_cached(fund_key, bench_key, window, _fund_returns, _benchmark_returns):
+    """Cached estimate_rolling_copula_for_chart - keyed on fund/benchmark identity, not on the series."""
+    return estimate_rolling_copula_for_chart(_fund_returns, _benchmark_returns, window=window)
+
+
+@st.cache_data(ttl=3600, show_spinner=False, max_entries=64)
+def estimate_rolling_copula_by_benchmark_cached(fund_key, bench_keys, window, _fund_returns, _bench_map):
+    """Cached estimate_rolling_copula_by_benchmark - bench_keys is a tuple of (name, *series key)."""
+    bench_names = [key[0] for key in bench_keys]
+    return estimate_rolling_copula_by_benchmark(_fund_returns, _bench_map, bench_names, window=window)
+
+
+def _compute_exposure_row(bench_name, u_full, bench_arr):
+    """
+    Full-period copula metrics for one benchmark (fallback when the rolling window does not fit).
+    Returns (bench_name, (kendall_tau, tail_lower, tail_upper, asymmetry)).
+    """
+    if NUMBA_AVAILABLE:
+        metrics = full_period_copula_numba(
+            np.asarray(u_full, dtype=np.float64),
+            np.asarray(bench_arr, dtype=np.float64).reshape(1, -1)
+        )
+        return bench_name, tuple(metric[0] for metric in metrics)
+    
+    v = stats.rankdata(bench_arr) / (len(bench_arr) + 1)
+    
+    tau = fast_kendall_tau(u_full, v)
+    
+    theta_lower, _ = estimate_gumbel_270_parameter(u_full, v, tau)
+    lambda_lower, _ = gumbel_270_tail_dependence(theta_lower)
+    
+    theta_upper, _ = estimate_gumbel_180_parameter(u_full, v, tau)
+    _, lambda_upper = gumbel_180_tail_dependence(theta_upper)
+    
+    asymmetry = (lambda_lower - lambda_upper) / (lambda_lower + lambda_upper) if (lambda_lower + lambda_upper) > 0 else 0
+    
+    return bench_name, (tau, lambda_lower, lambda_upper, asymmetry)
+
 # ═══════════════════════════════════════════════════════════════════════════════
 # DATA LOADING FUNCTIONS
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -956,6 +1303,12 @@ def load_fund_data(file_path=None, uploaded_file=None):
                           'CATEGORIA BTG', 'SUBCATEGORIA BTG', 'STATUS', 'LAST_UPDATE', 'TRIBUTAÇÃO', 'LIQUIDEZ', 'SUITABILITY']:
                 df[col] = pd.to_numeric(df[col], errors='ignore')
         
+        # Repeated labels as category, converted once here: the screener's option lists and
+        # isin filters then work on integer codes
+        for col in ['GESTOR', 'CATEGORIA BTG', 'SUBCATEGORIA BTG', 'STATUS', 'TRIBUTAÇÃO', 'LIQUIDEZ', 'SUITABILITY']:
+            if col in df.columns:
+                df[col] = df[col].astype('category')
+        
         return df
     except Exception as e:
         st.error(f"Error loading data: {str(e)}")
@@ -1046,24 +1399,34 @@ def calculate_cumulative_returns(returns_series):
     return (1 + returns_series).cumprod() - 1
 
 
+class ReturnsBundle(NamedTuple):
+    """Fund returns with the full series' values and int64 (ns) dates precomputed for array code."""
+    filtered: pd.Series
+    full: pd.Series
+    full_arr: np.ndarray
+    full_idx_i8: np.ndarray
+
+
 def get_fund_returns(fund_details, cnpj_standard, period_months=None):
     """Extract returns for a specific fund - handle duplicate dates by keeping max NR_COTST."""
     if fund_details is None:
         return None
     
-    # Use standardized CNPJ for lookup
-    fund_data = fund_details[fund_details['CNPJ_STANDARD'] == cnpj_standard].sort_index()
+    # Use standardized CNPJ for lookup - only the columns needed below are copied
+    has_cotst = 'NR_COTST' in fund_details.columns
+    cols = ['VL_QUOTA', 'NR_COTST'] if has_cotst else ['VL_QUOTA']
+    fund_data = fund_details.loc[fund_details['CNPJ_STANDARD'].to_numpy() == cnpj_standard, cols]
     
     if len(fund_data) == 0:
         return None
     
-    # Handle duplicate dates - keep row with highest NR_COTST (largest class)
-    if 'NR_COTST' in fund_data.columns:
-        fund_data = fund_data.reset_index()
-        date_col = fund_data.columns[0]
-        fund_data = fund_data.sort_values('NR_COTST', ascending=False)
-        fund_data = fund_data.drop_duplicates(subset=[date_col], keep='first')
-        fund_data = fund_data.set_index(date_col)
+    # Handle duplicate dates - keep row with highest NR_COTST (largest class).
+    # One lexsort (date, then NR_COTST descending) replaces the reset/sort/dedup/set/sort chain.
+    if has_cotst:
+        order = np.lexsort((-fund_data['NR_COTST'].to_numpy(dtype=float), fund_data.index.to_numpy()))
+        fund_data = fund_data.iloc[order]
+        fund_data = fund_data[~fund_data.index.duplicated(keep='first')]
+    else:
         fund_data = fund_data.sort_index()
     
     quota_series = fund_data['VL_QUOTA'].dropna()
@@ -1076,12 +1439,81 @@ def get_fund_returns(fund_details, cnpj_standard, period_months=None):
     daily_returns = quota_series.pct_change().dropna()
     
     # Filter by period if specified
-    if period_months is not None:
-        cutoff_date = daily_returns.index[-1] - pd.DateOffset(months=period_months)
-        daily_returns_filtered = daily_returns[daily_returns.index >= cutoff_date]
-        return daily_returns_filtered, daily_returns
+    filtered_returns = filter_returns_by_period(daily_returns, period_months)
+    
+    return ReturnsBundle(
+        filtered_returns,
+        daily_returns,
+        daily_returns.to_numpy(dtype=np.float64),
+        daily_returns.index.as_unit('ns').asi8
+    )
+
+
+def get_fund_returns_many(fund_details, cnpjs, period_months=None):
+    """
+    get_fund_returns for several CNPJs, in input order.
+    
+    The lookups are independent, so with more than one CNPJ they are spread
+    over a thread pool; threads share fund_details instead of pickling it to
+    worker processes, and most of each lookup is numpy work.
+    """
+    if len(cnpjs) > 1:
+        n_jobs = min(len(cnpjs), os.cpu_count() or 1)
+        return joblib.Parallel(n_jobs=n_jobs, prefer='threads')(
+            joblib.delayed(get_fund_returns)(fund_details, cnpj, period_months) for cnpj in cnpjs
+        )
+    return [get_fund_returns(fund_details, cnpj, period_months) for cnpj in cnpjs]
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def prepare_optimizer_inputs(selected_funds, min_history_days, fund_metrics, details_key, _fund_details):
+    """
+    Returns matrix and fund metadata for the fund optimizer, cached per selection (in order)
+    and history requirement; fund_details is keyed by its content (_series_content_key).
+    
+    Returns (all_returns_df, fund_start_dates, excluded, fund_categories, fund_subcategories):
+    all_returns_df is the inner join of the funds with at least min_history_days of history,
+    excluded lists (name, days) for those without it.
+    """
+    meta_by_name = build_fund_lookup(fund_metrics)
+    cnpjs = [standardize_cnpj(meta_by_name[fund_name]['CNPJ']) for fund_name in selected_funds]
+    
+    fund_returns_dict = {}
+    fund_start_dates = {}
+    excluded = []
+    for fund_name, returns_result in zip(selected_funds, get_fund_returns_many(_fund_details, cnpjs)):
+        if returns_result is not None:
+            full_returns = returns_result.full
+            if len(full_returns) >= min_history_days:
+                fund_returns_dict[fund_name] = full_returns
+                # get_fund_returns drops NaNs, so the first date is the first valid one
+                fund_start_dates[fund_name] = full_returns.index[0]
+            else:
+                excluded.append((fund_name, len(full_returns)))
+    
+    # Align all returns to the dates every fund reports (inner join): starts at the
+    # youngest fund and never invents zero returns for a fund's missing days
+    all_returns_df = pd.concat(fund_returns_dict, axis=1, join='inner') if fund_returns_dict else pd.DataFrame()
+    
+    fund_categories = {}
+    fund_subcategories = {}
+    for fund_name in all_returns_df.columns:
+        meta = meta_by_name.get(fund_name)
+        if meta is not None:
+            fund_categories[fund_name] = meta['CATEGORIA BTG']
+            fund_subcategories[fund_name] = meta['SUBCATEGORIA BTG']
     
-    return daily_returns, daily_returns
+    return all_returns_df, fund_start_dates, excluded, fund_categories, fund_subcategories
+
+
+def filter_returns_by_period(returns_full, period_months=None):
+    """Slice the trailing period of a sorted returns series (view, no boolean mask)."""
+    if period_months is None or len(returns_full) == 0:
+        return returns_full
+    
+    cutoff_date = returns_full.index[-1] - pd.DateOffset(months=period_months)
+    cutoff_idx = returns_full.index.searchsorted(cutoff_date, side='left')
+    return returns_full.iloc[cutoff_idx:]
 
 
 def calculate_benchmark_returns(benchmark_data, fund_dates, period_months=None):
@@ -1090,7 +1522,7 @@ def calculate_benchmark_returns(benchmark_data, fund_dates, period_months=None):
     
     if period_months is not None:
         cutoff_date = fund_dates[-1] - pd.DateOffset(months=period_months)
-        aligned = aligned[aligned.index >= cutoff_date]
+        aligned = aligned.loc[cutoff_date:]
     
     # Calculate period return
     if len(aligned) > 0:
@@ -1119,127 +1551,130 @@ def calculate_relative_performance(fund_ret, bench_ret):
         return fund_ret / bench_ret
 
 
-def create_monthly_returns_table(fund_returns_full, benchmark_data, comparison_method='Relative Performance'):
-    """Create monthly returns table organized by year with fund, benchmark, and comparison."""
+def compound_returns_by_period(returns, freq='ME'):
+    """Compound daily returns into period returns via the log-sum identity (no Python callback)."""
+    if (NUMBA_AVAILABLE and freq == 'ME' and isinstance(returns, pd.Series) and len(returns) > 0
+            and returns.index.is_monotonic_increasing):
+        idx = returns.index
+        y0, m0 = idx[0].year, idx[0].month
+        group_ids = ((idx.year - y0) * 12 + idx.month - m0).to_numpy().astype(np.int32)
+        n_groups = int(group_ids[-1]) + 1
+        values = compound_by_group(returns.to_numpy(dtype=np.float64), group_ids, n_groups)
+        month_ends = pd.date_range(idx[0].normalize() + pd.offsets.MonthEnd(0), periods=n_groups, freq='ME', name=idx.name)
+        return pd.Series(values, index=month_ends, name=returns.name)
+    
+    return np.expm1(np.log1p(returns).resample(freq).sum())
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def returns_by_frequency(returns):
+    """Daily, weekly and monthly versions of a daily returns series, keyed by frequency label."""
+    return {
+        'Daily': returns,
+        'Weekly': compound_returns_by_period(returns, 'W'),
+        'Monthly': compound_returns_by_period(returns, 'ME'),
+    }
+
+
+def create_monthly_returns_table(fund_returns_full, benchmark_data, comparison_method='Relative Performance',
+                                 monthly_fund=None, monthly_bench=None):
+    """
+    Create monthly returns table organized by year with fund, benchmark, and comparison.
+    
+    monthly_fund / monthly_bench can be passed when the caller already compounded
+    the series, so the resampling is not repeated.
+    """
     # Convert daily returns to monthly
-    fund_monthly = fund_returns_full.resample('ME').apply(lambda x: (1 + x).prod() - 1)
+    if monthly_fund is not None:
+        fund_monthly = monthly_fund
+    else:
+        fund_monthly = compound_returns_by_period(fund_returns_full, 'ME')
     
     # Align benchmark with fund dates
-    aligned_benchmark = benchmark_data.reindex(fund_returns_full.index, method='ffill').fillna(0)
-    benchmark_monthly = aligned_benchmark.resample('ME').apply(lambda x: (1 + x).prod() - 1)
-    
-    # Get years with data (reverse order - latest first)
-    years = sorted(fund_monthly.index.year.unique(), reverse=True)
+    if monthly_bench is not None:
+        benchmark_monthly = monthly_bench
+    else:
+        aligned_benchmark = benchmark_data.reindex(fund_returns_full.index, method='ffill').fillna(0)
+        benchmark_monthly = compound_returns_by_period(aligned_benchmark, 'ME')
     
-    # Month names
     months = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+    cols = ['Year', 'Type'] + months + ['YTD', 'Total']
+    if len(fund_monthly) == 0:
+        return pd.DataFrame(columns=cols)
+    
+    fund_vals = fund_monthly.to_numpy(dtype=float)
+    bench_vals = benchmark_monthly.reindex(fund_monthly.index).to_numpy(dtype=float)
+    
+    # Contiguous year blocks of the (sorted) monthly series
+    years = fund_monthly.index.year.to_numpy()
+    month_pos = fund_monthly.index.month.to_numpy() - 1
+    unique_years, starts = np.unique(years, return_index=True)
+    ends = np.r_[starts[1:], len(years)]
+    year_pos = np.searchsorted(unique_years, years)
+    
+    # Year x month grids
+    fund_grid = np.full((len(unique_years), 12), np.nan)
+    bench_grid = np.full((len(unique_years), 12), np.nan)
+    fund_grid[year_pos, month_pos] = fund_vals
+    bench_grid[year_pos, month_pos] = bench_vals
+    
+    # YTD per year block, Total from a single running product
+    ytd_fund = np.multiply.reduceat(1 + fund_vals, starts) - 1
+    ytd_bench = np.multiply.reduceat(1 + bench_vals, starts) - 1
+    cum_fund = np.cumprod(1 + fund_vals)[ends - 1] - 1
+    cum_bench = np.cumprod(1 + bench_vals)[ends - 1] - 1
+    
+    fund_block = np.column_stack([fund_grid, ytd_fund, cum_fund])
+    bench_block = np.column_stack([bench_grid, ytd_bench, cum_bench])
+    
+    # Comparison row (months need data for both fund and benchmark)
+    if comparison_method == 'Relative Performance':
+        comp_block = relative_performance_array(fund_block, bench_block)
+    elif comparison_method == 'Percentage Points':
+        comp_block = fund_block - bench_block
+    else:  # Benchmark Performance
+        comp_block = bench_block.copy()
+        comp_block[:, :12] = np.where(np.isnan(fund_grid), np.nan, bench_grid)
+    
+    # Stack rows per year, latest year first
+    if comparison_method != 'Benchmark Performance':
+        blocks = [fund_block, bench_block, comp_block]
+        row_types = ['Investment Fund', 'Benchmark', comparison_method]
+    else:
+        blocks = [fund_block, comp_block]
+        row_types = ['Investment Fund', comparison_method]
     
-    # Build the data structure
-    table_data = []
+    values = np.stack(blocks, axis=1)[::-1].reshape(-1, 14)
     
-    # First pass: calculate all cumulative values forward
-    cumulative_data = {}
-    cumulative_fund_temp = 1.0
-    cumulative_benchmark_temp = 1.0
-    
-    for year in sorted(fund_monthly.index.year.unique()):
-        year_fund = fund_monthly[fund_monthly.index.year == year]
-        year_benchmark = benchmark_monthly[benchmark_monthly.index.year == year]
-        
-        ytd_fund = 1.0
-        ytd_benchmark = 1.0
-        
-        for month_num in range(1, 13):
-            fund_month = year_fund[year_fund.index.month == month_num]
-            bench_month = year_benchmark[year_benchmark.index.month == month_num]
-            
-            if len(fund_month) > 0:
-                ret = fund_month.iloc[0]
-                ytd_fund *= (1 + ret)
-                cumulative_fund_temp *= (1 + ret)
-            
-            if len(bench_month) > 0:
-                ret = bench_month.iloc[0]
-                ytd_benchmark *= (1 + ret)
-                cumulative_benchmark_temp *= (1 + ret)
-        
-        cumulative_data[year] = {
-            'ytd_fund': ytd_fund - 1,
-            'ytd_benchmark': ytd_benchmark - 1,
-            'cumulative_fund': cumulative_fund_temp - 1,
-            'cumulative_benchmark': cumulative_benchmark_temp - 1
-        }
+    df = pd.DataFrame(values, columns=months + ['YTD', 'Total'])
+    df.insert(0, 'Type', np.tile(row_types, len(unique_years)))
+    df.insert(0, 'Year', np.repeat(unique_years[::-1].astype(int), len(row_types)))
     
-    # Second pass: build table in reverse order (latest first)
-    for year in years:
-        year_fund = fund_monthly[fund_monthly.index.year == year]
-        year_benchmark = benchmark_monthly[benchmark_monthly.index.year == year]
-        
-        # Fund row
-        fund_row = {'Year': year, 'Type': 'Investment Fund'}
-        for month_name in months:
-            month_num = months.index(month_name) + 1
-            month_data = year_fund[year_fund.index.month == month_num]
-            fund_row[month_name] = month_data.iloc[0] if len(month_data) > 0 else np.nan
-        fund_row['YTD'] = cumulative_data[year]['ytd_fund']
-        fund_row['Total'] = cumulative_data[year]['cumulative_fund']
-        table_data.append(fund_row)
-        
-        # Benchmark row - only if NOT "Benchmark Performance"
-        if comparison_method != 'Benchmark Performance':
-            benchmark_row = {'Year': year, 'Type': 'Benchmark'}
-            for month_name in months:
-                month_num = months.index(month_name) + 1
-                month_data = year_benchmark[year_benchmark.index.month == month_num]
-                benchmark_row[month_name] = month_data.iloc[0] if len(month_data) > 0 else np.nan
-            benchmark_row['YTD'] = cumulative_data[year]['ytd_benchmark']
-            benchmark_row['Total'] = cumulative_data[year]['cumulative_benchmark']
-            table_data.append(benchmark_row)
-        
-        # Comparison row
-        comparison_row = {'Year': year, 'Type': comparison_method}
-        for month_name in months:
-            month_num = months.index(month_name) + 1
-            fund_month = year_fund[year_fund.index.month == month_num]
-            bench_month = year_benchmark[year_benchmark.index.month == month_num]
-            
-            if len(fund_month) > 0 and len(bench_month) > 0:
-                fund_ret = fund_month.iloc[0]
-                bench_ret = bench_month.iloc[0]
-                
-                if comparison_method == 'Relative Performance':
-                    comparison_row[month_name] = calculate_relative_performance(fund_ret, bench_ret)
-                elif comparison_method == 'Percentage Points':
-                    comparison_row[month_name] = fund_ret - bench_ret
-                else:  # Benchmark Performance
-                    comparison_row[month_name] = bench_ret
-            else:
-                comparison_row[month_name] = np.nan
-        
-        # YTD and Total for comparison row
-        ytd_fund = cumulative_data[year]['ytd_fund']
-        ytd_benchmark = cumulative_data[year]['ytd_benchmark']
-        cumul_fund = cumulative_data[year]['cumulative_fund']
-        cumul_benchmark = cumulative_data[year]['cumulative_benchmark']
-        
-        if comparison_method == 'Relative Performance':
-            comparison_row['YTD'] = calculate_relative_performance(ytd_fund, ytd_benchmark)
-            comparison_row['Total'] = calculate_relative_performance(cumul_fund, cumul_benchmark)
-        elif comparison_method == 'Percentage Points':
-            comparison_row['YTD'] = ytd_fund - ytd_benchmark
-            comparison_row['Total'] = cumul_fund - cumul_benchmark
-        else:  # Benchmark Performance
-            comparison_row['YTD'] = ytd_benchmark
-            comparison_row['Total'] = cumul_benchmark
-        
-        table_data.append(comparison_row)
+    return df[cols]
+
+
+def relative_performance_array(fund_ret, bench_ret):
+    """Vectorized calculate_relative_performance over arrays of returns."""
+    fund_ret = np.asarray(fund_ret, dtype=float)
+    bench_ret = np.asarray(bench_ret, dtype=float)
     
-    # Create DataFrame
-    df = pd.DataFrame(table_data)
-    cols = ['Year', 'Type'] + months + ['YTD', 'Total']
-    df = df[cols]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result = np.select(
+            [
+                (fund_ret >= 0) & (bench_ret >= 0),
+                (fund_ret < 0) & (bench_ret < 0),
+                (fund_ret > 0) & (bench_ret < 0),
+            ],
+            [
+                fund_ret / bench_ret,
+                bench_ret / fund_ret,
+                (fund_ret - bench_ret) / np.abs(bench_ret),
+            ],
+            default=fund_ret / bench_ret
+        )
     
-    return df
+    result[(bench_ret == 0) | np.isnan(fund_ret) | np.isnan(bench_ret)] = np.nan
+    return result
 
 
 def style_monthly_returns_table(df, comparison_method):
@@ -1330,9 +1765,82 @@ def style_monthly_returns_table(df, comparison_method):
         row_in_year += 1
     
     html += '</tbody></table></div>'
-    
+
     return html
 
+
+def create_monthly_returns_table_figure(df):
+    """Render monthly returns table as a plotly go.Table with vectorized cell styling."""
+    months = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+    value_cols = months + ['YTD', 'Total']
+
+    vals = df[value_cols].to_numpy(dtype=float)
+    nan_mask = np.isnan(vals)
+
+    # Formatted text and colors computed once over the whole grid
+    cell_text = np.where(nan_mask, '', np.char.mod('%.2f%%', np.where(nan_mask, 0.0, vals) * 100))
+    font_colors = np.where(vals < 0, '#FF0000', '#FFFFFF')
+
+    # Year shown only on the first row of each group; alternate shading per year
+    years = df['Year'].to_numpy()
+    first_in_year = np.r_[True, years[1:] != years[:-1]] if len(years) else np.array([], dtype=bool)
+    year_text = np.where(first_in_year, years.astype(str), '')
+    row_fill = np.where(np.cumsum(first_in_year) % 2 == 1, '#1a1a1a', '#262626')
+
+    n_cols = len(value_cols) + 2
+    fig = go.Figure(go.Table(
+        columnwidth=[60, 130] + [70] * len(value_cols),
+        header=dict(
+            values=['<b>YEAR</b>', '<b>TYPE</b>'] + [f'<b>{c.upper()}</b>' for c in value_cols],
+            fill_color='#D4AF37',
+            font=dict(color='#000000', size=12),
+            line_color='#D4AF37',
+            align='center',
+            height=32
+        ),
+        cells=dict(
+            values=[year_text, df['Type'].to_numpy()] + list(cell_text.T),
+            fill_color=[row_fill] * n_cols,
+            font=dict(
+                color=[np.full(len(df), '#FFD700'), np.full(len(df), '#D4AF37')] + list(font_colors.T),
+                size=12
+            ),
+            line_color='#333333',
+            align=['center', 'left'] + ['right'] * len(value_cols),
+            height=28
+        )
+    ))
+
+    fig.update_layout(
+        paper_bgcolor='#000000',
+        plot_bgcolor='#000000',
+        margin=dict(l=0, r=0, t=0, b=0),
+        height=32 + 28 * len(df) + 10
+    )
+
+    return fig
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def style_exposure_table(exposure_df):
+    """Apply RdYlGn gradient to exposure table - returns HTML (cached, so reruns skip Styler CSS)."""
+    value_cols = [col for col in exposure_df.columns if col != 'Benchmark']
+    
+    styler = exposure_df.style.format(
+        {col: "{:.4f}" for col in value_cols}
+    ).background_gradient(
+        cmap='RdYlGn',
+        subset=value_cols,
+        vmin=-1, vmax=1
+    ).hide(axis='index').set_table_styles([
+        {'selector': '', 'props': 'width: 100%; border-collapse: collapse; font-size: 12px; border: 2px solid #D4AF37;'},
+        {'selector': 'th', 'props': 'background-color: #D4AF37; color: #000000; font-weight: 700; padding: 8px; text-align: center;'},
+        {'selector': 'td', 'props': 'padding: 8px; border: 1px solid #333333; text-align: right;'},
+        {'selector': 'td.col0', 'props': 'color: #FFD700; font-weight: 600; text-align: left;'}
+    ])
+    
+    return f'<div style="overflow-x: auto;">{styler.to_html()}</div>'
+
 # ═══════════════════════════════════════════════════════════════════════════════
 # VISUALIZATION FUNCTIONS
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -1518,6 +2026,12 @@ def create_rolling_vol_chart(fund_returns_full, window_months=12):
     
     return fig
 
+def group_weights(weights_series, group_map):
+    """Sum weights per group_map label (missing funds -> 'Unknown'), in first-appearance order."""
+    groups = [group_map.get(name, 'Unknown') for name in weights_series.index]
+    return weights_series.groupby(groups, sort=False, dropna=False).sum()
+
+
 def create_portfolio_pie_chart(weights_series, chart_type, fund_categories, fund_subcategories):
     """
     Create pie charts for portfolio composition.
@@ -1545,13 +2059,10 @@ def create_portfolio_pie_chart(weights_series, chart_type, fund_categories, fund
         
     elif chart_type == 'category':
         # By category
-        category_weights = {}
-        for fund, weight in weights_series.items():
-            cat = fund_categories.get(fund, 'Unknown')
-            category_weights[cat] = category_weights.get(cat, 0) + weight
+        category_weights = group_weights(weights_series, fund_categories)
         
-        labels = list(category_weights.keys())
-        values = list(category_weights.values())
+        labels = category_weights.index.tolist()
+        values = category_weights.tolist()
         title = 'Portfolio Allocation by Category'
         
         # Distinct colors for categories
@@ -1559,13 +2070,10 @@ def create_portfolio_pie_chart(weights_series, chart_type, fund_categories, fund
         
     else:  # subcategory
         # By subcategory
-        subcat_weights = {}
-        for fund, weight in weights_series.items():
-            subcat = fund_subcategories.get(fund, 'Unknown')
-            subcat_weights[subcat] = subcat_weights.get(subcat, 0) + weight
+        subcat_weights = group_weights(weights_series, fund_subcategories)
         
-        labels = list(subcat_weights.keys())
-        values = list(subcat_weights.values())
+        labels = subcat_weights.index.tolist()
+        values = subcat_weights.tolist()
         title = 'Portfolio Allocation by Subcategory'
         
         # Color palette for subcategories
@@ -1596,60 +2104,150 @@ def create_portfolio_pie_chart(weights_series, chart_type, fund_categories, fund
     
     return fig
 
+
+# Cached builders for the portfolio analysis views. Streamlit reruns the whole
+# script on every widget interaction, so these are keyed on the (hashable)
+# weights/returns and only rebuilt when the portfolio actually changes.
+# The figures are only read by st.plotly_chart, so cache_resource hands back
+# the same object instead of unpickling a copy on every rerun.
+@st.cache_resource(ttl=3600, show_spinner=False, max_entries=32)
+def cached_portfolio_pie_chart(weights_items, chart_type, fund_categories, fund_subcategories):
+    """create_portfolio_pie_chart keyed on a tuple of (fund, weight) pairs."""
+    weights_series = pd.Series(dict(weights_items), dtype=float)
+    return create_portfolio_pie_chart(weights_series, chart_type, fund_categories, fund_subcategories)
+
+
+@st.cache_resource(ttl=3600, show_spinner=False, max_entries=32)
+def cached_rolling_sharpe_chart(fund_returns_full, window_months=12):
+    """create_rolling_sharpe_chart keyed on the returns series contents."""
+    return create_rolling_sharpe_chart(fund_returns_full, window_months)
+
+
+@st.cache_resource(ttl=3600, show_spinner=False, max_entries=32)
+def cached_rolling_vol_chart(fund_returns_full, window_months=12):
+    """create_rolling_vol_chart keyed on the returns series contents."""
+    return create_rolling_vol_chart(fund_returns_full, window_months)
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def weight_breakdown(weights_items, group_map, label):
+    """Weight % summed per group (funds missing from group_map count as 'Unknown')."""
+    weights = group_weights(pd.Series(dict(weights_items), dtype=float), group_map)
+    
+    return pd.DataFrame({
+        label: weights.index.tolist(),
+        'Weight %': weights.to_numpy() * 100
+    }).sort_values('Weight %', ascending=False)
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def liquidity_breakdown(weights_items, liquidity_map, total_weight):
+    """
+    Normalized weight per liquidity level, ordered by 'D+X' days (unparseable levels last),
+    and the weight-averaged days. Funds without a liquidity are left out.
+    """
+    weights = pd.Series(dict(weights_items), dtype=float)
+    levels = pd.Series([liquidity_map.get(name) for name in weights.index], index=weights.index, dtype=object)
+    valid = levels.notna().to_numpy()
+    norm_weights = weights[valid] / total_weight if total_weight > 0 else weights[valid] * 0
+    by_level = norm_weights.groupby(levels[valid].to_numpy(), sort=False).sum()
+    
+    # Parse each distinct level once rather than once per fund
+    level_days = {}
+    for level in by_level.index:
+        try:
+            level_days[level] = int(str(level).replace('D+', '').strip())
+        except (ValueError, AttributeError):
+            pass
+    avg_days = sum(by_level[level] * days for level, days in level_days.items())
+    
+    order = sorted(by_level.index, key=lambda x: level_days[x] if str(x).replace('D+', '').strip().isdigit() else 9999)
+    return by_level.reindex(order), avg_days
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def portfolio_cumulative_chart(period_returns, period_cdi, selected_period):
+    """Cumulative Portfolio vs CDI figure for the selected period."""
+    portfolio_cum = calculate_cumulative_returns(period_returns) * 100
+    cdi_cum = calculate_cumulative_returns(period_cdi) * 100
+    
+    return go.Figure(
+        data=[
+            go.Scatter(
+                x=portfolio_cum.index,
+                y=portfolio_cum.values,
+                name='Portfolio',
+                line=dict(color='#D4AF37', width=3),
+                hovertemplate='%{y:.2f}%<extra></extra>'
+            ),
+            go.Scatter(
+                x=cdi_cum.index,
+                y=cdi_cum.values,
+                name='CDI',
+                line=dict(color='#00CED1', width=2),
+                hovertemplate='%{y:.2f}%<extra></extra>'
+            )
+        ],
+        layout=dict(
+            title=f'Cumulative Returns - {selected_period}',
+            xaxis_title='Date',
+            yaxis_title='Cumulative Return (%)',
+            template=PLOTLY_TEMPLATE,
+            hovermode='x unified',
+            height=500
+        )
+    )
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def portfolio_monthly_calendar(portfolio_returns, cdi_returns, comparison_method):
+    """Monthly returns table and its styled HTML for the portfolio view."""
+    monthly_table = create_monthly_returns_table(portfolio_returns, cdi_returns, comparison_method)
+    return monthly_table, style_monthly_returns_table(monthly_table, comparison_method)
+
+
+def drawdown_periods(drawdowns, threshold=-0.001):
+    """
+    Contiguous runs of a drawdown series below threshold, found by run-length encoding the mask.
+    
+    Returns (starts, ends, durations, max_dds, ongoing): start/end positions of each run (end
+    inclusive), its length in calendar days, its deepest drawdown, and whether the last run is
+    still open at the end of the series.
+    """
+    mask = (drawdowns < threshold).to_numpy()
+    edges = np.diff(mask.astype(np.int8), prepend=0, append=0)
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1) - 1
+    durations = (drawdowns.index[ends] - drawdowns.index[starts]).days.to_numpy()
+    # Each reduceat segment runs on past its run's end, but only into values above threshold,
+    # which cannot lower the minimum; fmin skips NaNs like Series.min()
+    max_dds = np.fmin.reduceat(drawdowns.to_numpy(dtype=np.float64), starts) if len(starts) else np.empty(0)
+    return starts, ends, durations, max_dds, bool(len(mask) and mask[-1])
+
+
 def create_underwater_plot(fund_returns_full):
     """Create underwater plot with MAX DD highlighted - YELLOW base, RED max DD (no markers)."""
-    cumulative = (1 + fund_returns_full).cumprod()
-    running_max = cumulative.expanding().max()
-    drawdown = (cumulative - running_max) / running_max * 100
-
-    # Calculate CDaR (95%) - Conditional Drawdown at Risk
-    cdar_95 = PortfolioMetrics.cdar(fund_returns_full, confidence=0.95) * 100
-    
-    # Find longest drawdown period
-    drawdown_values = drawdown.values
-    drawdown_dates = drawdown.index.to_numpy()
-    is_underwater = drawdown_values < -0.01
-    
-    underwater_periods = []
-    current_start = None
-    current_start_idx = None
-    current_length = 0
-    current_depth = 0
-    
-    for idx, is_under in enumerate(is_underwater):
-        if is_under:
-            if current_start is None:
-                current_start = drawdown_dates[idx]
-                current_start_idx = idx
-            current_length += 1
-            current_depth = min(current_depth, drawdown_values[idx])
-        else:
-            if current_start is not None:
-                underwater_periods.append({
-                    'start': current_start,
-                    'start_idx': current_start_idx,
-                    'end_idx': idx - 1,
-                    'length': current_length,
-                    'depth': current_depth
-                })
-                current_start = None
-                current_start_idx = None
-                current_length = 0
-                current_depth = 0
-    
-    if current_start is not None:
-        underwater_periods.append({
-            'start': current_start,
-            'start_idx': current_start_idx,
-            'end_idx': len(drawdown_values) - 1,
-            'length': current_length,
-            'depth': current_depth
-        })
-    
-    # Find max drawdown period
+    drawdowns = PortfolioMetrics.drawdown_series(fund_returns_full)
+    drawdown = drawdowns * 100
+
+    # Calculate CDaR (95%) - Conditional Drawdown at Risk, from the same drawdown series
+    cdar_95 = PortfolioMetrics.cdar_from_drawdowns(drawdowns, confidence=0.95) * 100
+    
+    # Underwater runs (deeper than 0.01%) from the shared run-length encoder; the red overlay
+    # marks the deepest one
+    starts, ends, _, depths, _ = drawdown_periods(drawdown, -0.01)
+    drawdown_values = drawdown.to_numpy()
+    
     max_dd_period = None
-    if underwater_periods:
-        max_dd_period = max(underwater_periods, key=lambda x: abs(x['depth']))
+    if len(starts):
+        deepest = int(np.argmax(np.abs(depths)))
+        max_dd_period = {
+            'start': drawdown.index.to_numpy()[starts[deepest]],
+            'start_idx': starts[deepest],
+            'end_idx': ends[deepest],
+            'length': int(ends[deepest] - starts[deepest] + 1),
+            'depth': depths[deepest]
+        }
     
     fig = go.Figure()
     
@@ -1672,7 +2270,7 @@ def create_underwater_plot(fund_returns_full):
         
         fig.add_trace(go.Scatter(
             x=drawdown.index[start_idx:end_idx+1],
-            y=drawdown.values[start_idx:end_idx+1],
+            y=drawdown_values[start_idx:end_idx+1],
             fill='tozeroy',
             fillcolor='rgba(255, 0, 0, 0.5)',
             line=dict(color='#FF0000', width=3),
@@ -1727,6 +2325,12 @@ def create_underwater_plot(fund_returns_full):
     return fig, max_dd_info
 
 
+@st.cache_resource(ttl=3600, show_spinner=False, max_entries=32)
+def cached_underwater_plot(fund_returns_full):
+    """create_underwater_plot keyed on the returns series contents; the info dict is read-only."""
+    return create_underwater_plot(fund_returns_full)
+
+
 def create_omega_gauge(omega_value, frequency='Daily'):
     """Create gauge chart for Omega ratio - BLUE bar, DARK BLACK background."""
     fig = go.Figure(go.Indicator(
@@ -1816,11 +2420,12 @@ def create_omega_cdf_chart(returns_data, threshold=0, frequency='daily'):
     losses = abs(returns_pct[returns_pct <= threshold].sum())
     omega = gains / losses if losses > 0 else np.inf
     
-    fig = go.Figure()
+    # Traces are collected first so the figure is built (and validated) in one call
+    traces = []
     
     # Red area (losses) - NO MARKERS
     if below_threshold.any():
-        fig.add_trace(go.Scatter(
+        traces.append(go.Scatter(
             x=sorted_returns[below_threshold],
             y=cdf[below_threshold],
             fill='tozeroy',
@@ -1833,7 +2438,7 @@ def create_omega_cdf_chart(returns_data, threshold=0, frequency='daily'):
     
     # Green area (gains) - NO MARKERS
     if above_threshold.any():
-        fig.add_trace(go.Scatter(
+        traces.append(go.Scatter(
             x=sorted_returns[above_threshold],
             y=cdf[above_threshold],
             fill='tozeroy',
@@ -1845,7 +2450,7 @@ def create_omega_cdf_chart(returns_data, threshold=0, frequency='daily'):
         ))
     
     # CDF line
-    fig.add_trace(go.Scatter(
+    traces.append(go.Scatter(
         x=sorted_returns,
         y=cdf,
         mode='lines',
@@ -1854,36 +2459,44 @@ def create_omega_cdf_chart(returns_data, threshold=0, frequency='daily'):
         hovertemplate='Return: %{x:.2f}%<br>CDF: %{y:.2f}<extra></extra>'
     ))
     
-    fig.add_vline(x=threshold, line_dash="dash", line_color="#FFFFFF")
-    
-    fig.update_layout(
+    fig = go.Figure(data=traces, layout=dict(
         title=f'Omega Ratio Visualization - {frequency.title()} Returns',
         xaxis_title=f'{frequency.title()} Return (%)',
         yaxis_title='Cumulative Probability',
         template=PLOTLY_TEMPLATE,
         height=400
-    )
+    ))
+    
+    fig.add_vline(x=threshold, line_dash="dash", line_color="#FFFFFF")
     
     return fig
 
 
+def rachev_tails(returns_pct, alpha=5):
+    """
+    Lower/upper alpha% thresholds and tail means of a returns series. Both percentiles come
+    from a single np.percentile call, i.e. one partition of the data instead of two.
+    """
+    lower_threshold, upper_threshold = np.percentile(returns_pct, [alpha, 100 - alpha])
+    expected_loss = returns_pct[returns_pct <= lower_threshold].mean()
+    expected_gain = returns_pct[returns_pct >= upper_threshold].mean()
+    return lower_threshold, upper_threshold, expected_loss, expected_gain
+
+
 def create_combined_rachev_var_chart(returns_data, var_val, cvar_val, frequency='daily'):
     """Combined Rachev/VaR/CVaR chart with highlighted tails."""
     returns_pct = returns_data * 100
     
     # Calculate tail thresholds
-    lower_threshold = np.percentile(returns_pct, 5)
-    upper_threshold = np.percentile(returns_pct, 95)
-    
-    expected_loss = returns_pct[returns_pct <= lower_threshold].mean()
-    expected_gain = returns_pct[returns_pct >= upper_threshold].mean()
+    lower_threshold, upper_threshold, expected_loss, expected_gain = rachev_tails(returns_pct)
     
     rachev_ratio = expected_gain / abs(expected_loss) if expected_loss > 0 else np.inf
     
-    fig = go.Figure()
+    # Histogram, KDE and both tail areas go into go.Figure together; VaR/CVaR lines are added after
+    traces = []
     
     # Histogram
-    fig.add_trace(go.Histogram(
+    traces.append(go.Histogram(
         x=returns_pct,
         nbinsx=50,
         name='Distribution',
@@ -1898,7 +2511,7 @@ def create_combined_rachev_var_chart(returns_data, var_val, cvar_val, frequency=
         kde_values = kde(x_range)
         
         # Full KDE (gold)
-        fig.add_trace(go.Scatter(
+        traces.append(go.Scatter(
             x=x_range,
             y=kde_values,
             mode='lines',
@@ -1908,7 +2521,7 @@ def create_combined_rachev_var_chart(returns_data, var_val, cvar_val, frequency=
         
         # Lower tail (red) - Rachev
         lower_mask = x_range <= lower_threshold
-        fig.add_trace(go.Scatter(
+        traces.append(go.Scatter(
             x=x_range[lower_mask],
             y=kde_values[lower_mask],
             fill='tozeroy',
@@ -1920,7 +2533,7 @@ def create_combined_rachev_var_chart(returns_data, var_val, cvar_val, frequency=
         
         # Upper tail (green) - Rachev
         upper_mask = x_range >= upper_threshold
-        fig.add_trace(go.Scatter(
+        traces.append(go.Scatter(
             x=x_range[upper_mask],
             y=kde_values[upper_mask],
             fill='tozeroy',
@@ -1930,6 +2543,14 @@ def create_combined_rachev_var_chart(returns_data, var_val, cvar_val, frequency=
             showlegend=True
         ))
     
+    fig = go.Figure(data=traces, layout=dict(
+        title=f'Rachev Ratio & VaR/CVaR - {frequency.title()} (R = {rachev_ratio:.2f})',
+        xaxis_title=f'{frequency.title()} Return (%)',
+        yaxis_title='Probability Density',
+        template=PLOTLY_TEMPLATE,
+        height=450
+    ))
+    
     # VaR line
     fig.add_vline(
         x=var_val * 100,
@@ -1948,14 +2569,6 @@ def create_combined_rachev_var_chart(returns_data, var_val, cvar_val, frequency=
         annotation_position="bottom left"
     )
     
-    fig.update_layout(
-        title=f'Rachev Ratio & VaR/CVaR - {frequency.title()} (R = {rachev_ratio:.2f})',
-        xaxis_title=f'{frequency.title()} Return (%)',
-        yaxis_title='Probability Density',
-        template=PLOTLY_TEMPLATE,
-        height=450
-    )
-    
     return fig
 
 
@@ -2056,20 +2669,20 @@ def create_shareholders_chart(fund_details, cnpj_standard):
     return fig
 
 
-def create_exposure_time_series_chart(copula_results, metric_name, last_value, avg_value, benchmark_name):
+def create_exposure_time_series_grid(copula_results, last_values, avg_values, benchmark_name):
     """
-    Create exposure time series chart with yellow line, red dot for last value, and blue line for average.
+    Create the 2x2 exposure time series grid as a single figure: Kendall Tau and Asymmetry
+    on top, Lower and Upper Tail Dependence below. Each panel has a yellow line, a red dot
+    for the last value and a blue average line.
     
     Parameters:
     -----------
     copula_results : pd.DataFrame
         Results from estimate_rolling_copula_for_chart
-    metric_name : str
-        Column name ('kendall_tau', 'tail_lower', 'tail_upper', 'asymmetry_index')
-    last_value : float
-        Last window value
-    avg_value : float
-        Average value
+    last_values : dict
+        Last window value per metric column
+    avg_values : dict
+        Average value per metric column
     benchmark_name : str
         Name of benchmark
     
@@ -2077,9 +2690,7 @@ def create_exposure_time_series_chart(copula_results, metric_name, last_value, a
     --------
     plotly figure
     """
-    metric_series = copula_results[metric_name]
-    
-    # Title mapping
+    layout = [('kendall_tau', 1, 1), ('asymmetry_index', 1, 2), ('tail_lower', 2, 1), ('tail_upper', 2, 2)]
     title_map = {
         'kendall_tau': 'Kendall Tau',
         'tail_lower': 'Lower Tail Dependence',
@@ -2087,52 +2698,67 @@ def create_exposure_time_series_chart(copula_results, metric_name, last_value, a
         'asymmetry_index': 'Asymmetry Index'
     }
     
-    title = f'{title_map[metric_name]} - {benchmark_name}'
-    
-    fig = go.Figure()
-    
-    # Yellow solid line for time series
-    fig.add_trace(go.Scatter(
-        x=metric_series.index,
-        y=metric_series.values,
-        mode='lines',
-        line=dict(color='#D4AF37', width=2),
-        name='Time Series',
-        hovertemplate='%{y:.4f}<extra></extra>'
-    ))
-    
-    # Red dot for last value
-    fig.add_trace(go.Scatter(
-        x=[metric_series.index[-1]],
-        y=[last_value],
-        mode='markers',
-        marker=dict(color='#FF0000', size=10),
-        name=f'Last: {last_value:.4f}',
-        hovertemplate='Last: %{y:.4f}<extra></extra>'
-    ))
-    
-    # Blue horizontal line for average
-    fig.add_hline(
-        y=avg_value,
-        line_dash="solid",
-        line_color="#1E90FF",
-        line_width=2,
-        annotation_text=f"Avg: {avg_value:.4f}",
-        annotation_position="right"
+    fig = make_subplots(
+        rows=2, cols=2,
+        subplot_titles=[f'{title_map[m]} - {benchmark_name}' for m, _, _ in layout],
+        vertical_spacing=0.15,
+        horizontal_spacing=0.1
     )
     
+    for metric_name, row, col in layout:
+        metric_series = copula_results[metric_name]
+        last_value = last_values[metric_name]
+        avg_value = avg_values[metric_name]
+        
+        # Yellow solid line for time series (float32 is enough for the plotted curve)
+        fig.add_trace(go.Scatter(
+            x=metric_series.index,
+            y=metric_series.to_numpy(dtype=np.float32),
+            mode='lines',
+            line=dict(color='#D4AF37', width=2),
+            name='Time Series',
+            hovertemplate='%{y:.4f}<extra></extra>'
+        ), row=row, col=col)
+        
+        # Red dot for last value
+        fig.add_trace(go.Scatter(
+            x=[metric_series.index[-1]],
+            y=[last_value],
+            mode='markers',
+            marker=dict(color='#FF0000', size=10),
+            name=f'Last: {last_value:.4f}',
+            hovertemplate='Last: %{y:.4f}<extra></extra>'
+        ), row=row, col=col)
+        
+        # Blue horizontal line for average
+        fig.add_hline(
+            y=avg_value,
+            line_dash="solid",
+            line_color="#1E90FF",
+            line_width=2,
+            annotation_text=f"Avg: {avg_value:.4f}",
+            annotation_position="right",
+            row=row, col=col
+        )
+        
+        fig.update_yaxes(title_text=title_map[metric_name], row=row, col=col)
+        fig.update_xaxes(title_text='Date', row=row, col=col)
+    
     fig.update_layout(
-        title=title,
-        xaxis_title='Date',
-        yaxis_title=title_map[metric_name],
         template=PLOTLY_TEMPLATE,
-        height=350,
-        showlegend=True
+        height=700,
+        showlegend=False
     )
     
     return fig
 
 
+@st.cache_resource(ttl=3600, show_spinner=False, max_entries=32)
+def cached_exposure_time_series_grid(copula_results, last_values, avg_values, benchmark_name):
+    """create_exposure_time_series_grid keyed on the rolling copula results."""
+    return create_exposure_time_series_grid(copula_results, last_values, avg_values, benchmark_name)
+
+
 # ═══════════════════════════════════════════════════════════════════════════════
 # MAIN APPLICATION
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -2242,7 +2868,8 @@ class PortfolioMetrics:
     @staticmethod
     def drawdown_series(returns):
         cumulative = (1 + returns).cumprod()
-        running_max = cumulative.expanding().max()
+        # fmax skips NaNs like expanding().max(), without the rolling-window machinery
+        running_max = np.fmax.accumulate(cumulative.to_numpy(dtype=np.float64))
         return (cumulative - running_max) / running_max
     
     @staticmethod
@@ -2251,7 +2878,10 @@ class PortfolioMetrics:
     
     @staticmethod
     def cdar(returns, confidence=0.95):
-        drawdowns = PortfolioMetrics.drawdown_series(returns)
+        return PortfolioMetrics.cdar_from_drawdowns(PortfolioMetrics.drawdown_series(returns), confidence)
+    
+    @staticmethod
+    def cdar_from_drawdowns(drawdowns, confidence=0.95):
         threshold = np.percentile(drawdowns, (1 - confidence) * 100)
         tail_drawdowns = drawdowns[drawdowns <= threshold]
         if len(tail_drawdowns) == 0:
@@ -2272,7 +2902,7 @@ class PortfolioMetrics:
         if n == 0:
             return np.nan
         tail_size = max(1, int(n * alpha))
-        sorted_returns = np.sort(returns.values)
+        sorted_returns = np.sort(np.asarray(returns, dtype=np.float64))
         # Lower tail (worst returns - losses)
         lower_tail = sorted_returns[:tail_size]
         expected_loss = -np.mean(lower_tail)  # Make positive for ratio
@@ -2284,6 +2914,22 @@ class PortfolioMetrics:
         return expected_gain / np.abs(expected_loss)
 
 
+@st.cache_data(ttl=3600, show_spinner=False)
+def portfolio_risk_metrics(returns):
+    """
+    Sharpe and volatility per trailing period (see trailing_period_slices) plus the drawdown
+    series and max drawdown, for the portfolio risk dashboard, computed once per returns
+    series; the drawdown series is built once for MDD and durations.
+    """
+    sharpe = {}
+    vol = {}
+    for period_name, period_ret in trailing_period_slices(returns):
+        sharpe[period_name] = PortfolioMetrics.sharpe_ratio(period_ret)
+        vol[period_name] = PortfolioMetrics.annualized_volatility(period_ret)
+    drawdowns = PortfolioMetrics.drawdown_series(returns)
+    return {'sharpe': sharpe, 'vol': vol, 'drawdowns': drawdowns, 'mdd': drawdowns.min()}
+
+
 # ═══════════════════════════════════════════════════════════════════════════════
 # RECOMMENDED PORTFOLIO HELPER FUNCTIONS  
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -2319,6 +2965,30 @@ def create_portfolio_template():
     return pd.DataFrame({'Fund Name': ['Fund 1', 'Fund 2', 'Fund 3'], 'Allocation (%)': [40.0, 35.0, 25.0]})
 
 
+@st.cache_resource(ttl=3600, show_spinner=False)
+def excel_template_bytes(template_df, sheet_name='Sheet1'):
+    """
+    Serialize an upload template to .xlsx bytes; cached so openpyxl only runs when the template
+    changes. The bytes are immutable, so cache_resource shares them instead of unpickling a copy.
+    """
+    buffer = io.BytesIO()
+    with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
+        template_df.to_excel(writer, index=False, sheet_name=sheet_name)
+    return buffer.getvalue()
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def dataframe_csv_bytes(df):
+    """UTF-8 CSV export of a results table; cached on the frame contents so unchanged filters reuse it."""
+    return df.to_csv(index=False).encode('utf-8')
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def summary_statistics(df):
+    """describe() of the numerical result columns, one row per column; cached on the frame contents."""
+    return df.describe().T[['mean', 'std', 'min', '25%', '50%', '75%', 'max']]
+
+
 def create_monthly_returns_comparison_table(fund_returns_dict, cdi_returns, last_n_months=12):
     max_date = None
     for returns in fund_returns_dict.values():
@@ -3364,8 +4034,8 @@ def run_etf_system():
             if selected_period != 'All':
                 months = period_map[selected_period]
                 cutoff_date = etf_returns.index[-1] - pd.DateOffset(months=months)
-                etf_returns_filtered = etf_returns[etf_returns.index >= cutoff_date]
-                voo_returns_filtered = voo_returns[voo_returns.index >= cutoff_date]
+                etf_returns_filtered = etf_returns.loc[cutoff_date:]
+                voo_returns_filtered = voo_returns.loc[cutoff_date:]
             else:
                 etf_returns_filtered = etf_returns
                 voo_returns_filtered = voo_returns
@@ -3631,7 +4301,7 @@ def run_etf_system():
             
             with vol_chart_col:
                 # Rolling volatility chart
-                fig_vol = create_rolling_vol_chart(etf_returns, window_months=12)
+                fig_vol = cached_rolling_vol_chart(etf_returns, window_months=12)
                 st.plotly_chart(fig_vol, use_container_width=True)
             
             with vol_metrics_col:
@@ -3657,7 +4327,7 @@ def run_etf_system():
             
             with dd_chart_col:
                 # Underwater plot
-                fig_underwater, max_dd_info = create_underwater_plot(etf_returns)
+                fig_underwater, max_dd_info = cached_underwater_plot(etf_returns)
                 st.plotly_chart(fig_underwater, use_container_width=True)
             
             with dd_metrics_col:
@@ -3746,24 +4416,19 @@ def run_etf_system():
                                 etf_ret_aligned = etf_returns.reindex(common_idx)
                                 bench_ret_aligned = bench_returns.reindex(common_idx)
                                 
-                                copula_results = estimate_rolling_copula_for_chart(
+                                copula_results = estimate_rolling_copula_cached(
+                                    _series_content_key(etf_ret_aligned),
+                                    _series_content_key(bench_ret_aligned),
+                                    250,
                                     etf_ret_aligned,
-                                    bench_ret_aligned,
-                                    window=250
+                                    bench_ret_aligned
                                 )
                                 
                                 if copula_results is not None:
-                                    # Last window values (most recent)
-                                    last_kendall = copula_results['kendall_tau'].iloc[-1]
-                                    last_tail_lower = copula_results['tail_lower'].iloc[-1]
-                                    last_tail_upper = copula_results['tail_upper'].iloc[-1]
-                                    last_asymmetry = copula_results['asymmetry_index'].iloc[-1]
-                                    
-                                    # Average values across all windows
-                                    avg_kendall = copula_results['kendall_tau'].mean()
-                                    avg_tail_lower = copula_results['tail_lower'].mean()
-                                    avg_tail_upper = copula_results['tail_upper'].mean()
-                                    avg_asymmetry = copula_results['asymmetry_index'].mean()
+                                    # Last-window (most recent) and average values
+                                    last_vals, avg_vals = copula_last_and_average(copula_results)
+                                    last_kendall, last_tail_lower, last_tail_upper, last_asymmetry = last_vals
+                                    avg_kendall, avg_tail_lower, avg_tail_upper, avg_asymmetry = avg_vals
                                     
                                     # Add last window row
                                     exposure_data.append({
@@ -3787,17 +4452,7 @@ def run_etf_system():
                         exposure_df = pd.DataFrame(exposure_data)
                         
                         # Color-coded gradient
-                        st.dataframe(
-                            exposure_df.style.format(
-                                {col: "{:.4f}" for col in exposure_df.columns if col != 'Benchmark'}
-                            ).background_gradient(
-                                cmap='RdYlGn',
-                                subset=[col for col in exposure_df.columns if col != 'Benchmark'],
-                                vmin=-1, vmax=1
-                            ),
-                            use_container_width=True,
-                            hide_index=True
-                        )
+                        st.markdown(style_exposure_table(exposure_df), unsafe_allow_html=True)
                         
                         with st.expander("📚 Exposure Metrics Guide"):
                             st.markdown("""
@@ -3851,74 +4506,30 @@ def run_etf_system():
                         bench_ret_aligned = bench_returns.reindex(common_idx)
                         
                         with st.spinner(f'Calculating exposure time series for {selected_ts_benchmark}...'):
-                            copula_results = estimate_rolling_copula_for_chart(
+                            copula_results = estimate_rolling_copula_cached(
+                                _series_content_key(etf_ret_aligned),
+                                _series_content_key(bench_ret_aligned),
+                                250,
                                 etf_ret_aligned,
-                                bench_ret_aligned,
-                                window=250
+                                bench_ret_aligned
                             )
                             
                             if copula_results is not None:
                                 # Get last and average values
-                                last_kendall = copula_results['kendall_tau'].iloc[-1]
-                                avg_kendall = copula_results['kendall_tau'].mean()
-                                
-                                last_tail_lower = copula_results['tail_lower'].iloc[-1]
-                                avg_tail_lower = copula_results['tail_lower'].mean()
-                                
-                                last_tail_upper = copula_results['tail_upper'].iloc[-1]
-                                avg_tail_upper = copula_results['tail_upper'].mean()
-                                
-                                last_asymmetry = copula_results['asymmetry_index'].iloc[-1]
-                                avg_asymmetry = copula_results['asymmetry_index'].mean()
+                                last_vals, avg_vals = copula_last_and_average(copula_results)
+                                last_kendall, last_tail_lower, last_tail_upper, last_asymmetry = last_vals
+                                avg_kendall, avg_tail_lower, avg_tail_upper, avg_asymmetry = avg_vals
                                 
                                 # Create 2x2 grid of charts
                                 st.markdown(f"##### Exposure Evolution - {selected_ts_benchmark}")
                                 
-                                # Row 1: Kendall Tau and Asymmetry
-                                row1_col1, row1_col2 = st.columns(2)
-                                
-                                with row1_col1:
-                                    fig_kendall = create_exposure_time_series_chart(
-                                        copula_results,
-                                        'kendall_tau',
-                                        last_kendall,
-                                        avg_kendall,
-                                        selected_ts_benchmark
-                                    )
-                                    st.plotly_chart(fig_kendall, use_container_width=True)
-                                
-                                with row1_col2:
-                                    fig_asymmetry = create_exposure_time_series_chart(
-                                        copula_results,
-                                        'asymmetry_index',
-                                        last_asymmetry,
-                                        avg_asymmetry,
-                                        selected_ts_benchmark
-                                    )
-                                    st.plotly_chart(fig_asymmetry, use_container_width=True)
-                                
-                                # Row 2: Lower Tail and Upper Tail
-                                row2_col1, row2_col2 = st.columns(2)
-                                
-                                with row2_col1:
-                                    fig_tail_lower = create_exposure_time_series_chart(
-                                        copula_results,
-                                        'tail_lower',
-                                        last_tail_lower,
-                                        avg_tail_lower,
-                                        selected_ts_benchmark
-                                    )
-                                    st.plotly_chart(fig_tail_lower, use_container_width=True)
-                                
-                                with row2_col2:
-                                    fig_tail_upper = create_exposure_time_series_chart(
-                                        copula_results,
-                                        'tail_upper',
-                                        last_tail_upper,
-                                        avg_tail_upper,
-                                        selected_ts_benchmark
-                                    )
-                                    st.plotly_chart(fig_tail_upper, use_container_width=True)
+                                fig_exposure = cached_exposure_time_series_grid(
+                                    copula_results,
+                                    dict(zip(COPULA_METRICS, last_vals)),
+                                    dict(zip(COPULA_METRICS, avg_vals)),
+                                    selected_ts_benchmark
+                                )
+                                st.plotly_chart(fig_exposure, use_container_width=True)
                                 
                                 # Summary metrics
                                 st.markdown("##### Summary Statistics")
@@ -4060,20 +4671,21 @@ def run_etf_system():
             with st.expander("📈 Numerical Filters (Min/Max Ranges)", expanded=True):
                 if numerical_cols:
                     filter_cols = st.columns(3)
+                    # Min/max of every numerical column in one pass (NaNs skipped)
+                    col_stats = display_df[numerical_cols].agg(['min', 'max'])
                     
                     for idx, col in enumerate(numerical_cols):
                         with filter_cols[idx % 3]:
-                            col_data = display_df[col].dropna()
-                            if len(col_data) > 0:
-                                global_min = float(col_data.min())
-                                global_max = float(col_data.max())
+                            global_min = float(col_stats.at['min', col])
+                            global_max = float(col_stats.at['max', col])
+                            if not (np.isnan(global_min) and np.isnan(global_max)):
                                 
-                                st.markdown(f"<h6 style='text-align: center; color: #D4AF37'>{col}</h6>", unsafe_allow_html=True)
+                                # Centered column name with Min/Max labels
+                                st.markdown(RANGE_FILTER_HEADER.format(col=col), unsafe_allow_html=True)
                                 
                                 num_col1, num_col2 = st.columns(2)
                                 
                                 with num_col1:
-                                    st.markdown("<p style='text-align: center; margin-bottom: -10px;'>Min</p>", unsafe_allow_html=True)
                                     min_val = st.number_input(
                                         f"Min_{col}",
                                         min_value=global_min,
@@ -4084,7 +4696,6 @@ def run_etf_system():
                                     )
                                 
                                 with num_col2:
-                                    st.markdown("<p style='text-align: center; margin-bottom: -10px;'>Max</p>", unsafe_allow_html=True)
                                     max_val = st.number_input(
                                         f"Max_{col}",
                                         min_value=global_min,
@@ -4119,16 +4730,10 @@ def run_etf_system():
                 else:
                     st.info("No categorical columns selected")
             
-            # Apply filters
-            filtered_df = display_df.copy()
-            
-            # Apply numerical filters
-            for col, (min_val, max_val) in active_filters.items():
-                filtered_df = filtered_df[(filtered_df[col] >= min_val) & (filtered_df[col] <= max_val)]
-            
-            # Apply categorical filters
-            for col, selected_vals in categorical_filters.items():
-                filtered_df = filtered_df[filtered_df[col].isin(selected_vals)]
+            # Apply filters: accumulate one mask, slice once
+            mask = range_filter_mask(display_df, active_filters)
+            apply_category_filters(mask, display_df, categorical_filters)
+            filtered_df = display_df if mask.all() else display_df[mask]
             
             st.markdown("---")
             
@@ -4142,7 +4747,7 @@ def run_etf_system():
             export_col1, export_col2 = st.columns(2)
             
             with export_col1:
-                csv = filtered_df.to_csv(index=False).encode('utf-8')
+                csv = dataframe_csv_bytes(filtered_df)
                 st.download_button(
                     label="📥 Download as CSV",
                     data=csv,
@@ -4185,8 +4790,7 @@ def run_etf_system():
             st.markdown("#### 📈 Summary Statistics")
             
             if numerical_cols:
-                summary_stats = filtered_df[numerical_cols].describe().T
-                summary_stats = summary_stats[['mean', 'std', 'min', '25%', '50%', '75%', 'max']]
+                summary_stats = summary_statistics(filtered_df[numerical_cols])
                 st.dataframe(summary_stats, use_container_width=True)
     
     with tabs[3]:
@@ -4220,10 +4824,7 @@ def run_etf_system():
             template_df = pd.DataFrame({
                 'Ticker': ['VOO', 'AGG', 'VTI']
             })
-            buffer = io.BytesIO()
-            with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
-                template_df.to_excel(writer, index=False)
-            buffer.seek(0)
+            buffer = excel_template_bytes(template_df)
             
             tc1, tc2 = st.columns([1, 2])
             with tc1:
@@ -4503,17 +5104,16 @@ def run_etf_system():
                     # Get unique ETFs in selection
                     if st.session_state['selected_portfolio']:
                         # Create editable dataframe
-                        individual_etf_data = []
-                        for ticker in st.session_state['selected_portfolio']:
-                            existing = st.session_state['individual_asset_constraints'].get(ticker, {})
-                            individual_etf_data.append({
-                                'Ticker': ticker,
-                                'Min Weight (%)': existing.get('min', min_weight_global * 100),
-                                'Max Weight (%)': existing.get('max', max_weight_global * 100),
-                                'Active': ticker in st.session_state['individual_asset_constraints']
-                            })
-                        
-                        individual_etf_df = pd.DataFrame(individual_etf_data)
+                        tickers = st.session_state['selected_portfolio']
+                        cons = st.session_state['individual_asset_constraints']
+                        individual_etf_df = pd.DataFrame({
+                            'Ticker': tickers,
+                            'Min Weight (%)': np.fromiter((cons.get(t, {}).get('min', min_weight_global * 100) for t in tickers),
+                                                          dtype=np.float64, count=len(tickers)),
+                            'Max Weight (%)': np.fromiter((cons.get(t, {}).get('max', max_weight_global * 100) for t in tickers),
+                                                          dtype=np.float64, count=len(tickers)),
+                            'Active': np.fromiter((t in cons for t in tickers), dtype=bool, count=len(tickers))
+                        })
                         
                         st.markdown("**Edit Individual ETF Constraints:**")
                         st.caption("💡 Check 'Active' to override global constraints for a specific ETF")
@@ -4545,13 +5145,13 @@ def run_etf_system():
                         )
                         
                         # Update session state
-                        st.session_state['individual_asset_constraints'] = {}
-                        for _, row in edited_etf_df.iterrows():
-                            if row['Active']:
-                                st.session_state['individual_asset_constraints'][row['Ticker']] = {
-                                    'min': row['Min Weight (%)'],
-                                    'max': row['Max Weight (%)']
-                                }
+                        active_rows = edited_etf_df[edited_etf_df['Active'].astype(bool).to_numpy()]
+                        st.session_state['individual_asset_constraints'] = {
+                            name: {'min': lo, 'max': hi}
+                            for name, lo, hi in zip(active_rows['Ticker'].to_numpy(),
+                                                    active_rows['Min Weight (%)'].to_numpy(dtype=np.float64).tolist(),
+                                                    active_rows['Max Weight (%)'].to_numpy(dtype=np.float64).tolist())
+                        }
                         
                         # Show summary
                         active_count = len(st.session_state['individual_asset_constraints'])
@@ -4597,20 +5197,22 @@ def run_etf_system():
                         unique_categories = [str(cat) for cat in unique_categories]
                         
                         # Create editable dataframe
-                        individual_cat_data = []
-                        for category in sorted(unique_categories):
-                            existing = st.session_state['individual_category_constraints_etf'].get(category, {})
-                            individual_cat_data.append({
-                                'Category': category,
-                                'Min Weight (%)': existing.get('min', 0.0),
-                                'Max Weight (%)': existing.get('max', max_per_category_global * 100 if max_per_category_global else 100.0),
-                                'Active': category in st.session_state['individual_category_constraints_etf']
-                            })
-                        
-                        individual_cat_df = pd.DataFrame(individual_cat_data)
+                        categories = sorted(unique_categories)
+                        cons = st.session_state['individual_category_constraints_etf']
+                        default_max = max_per_category_global * 100 if max_per_category_global else 100.0
+                        individual_cat_df = pd.DataFrame({
+                            'Category': categories,
+                            'Min Weight (%)': np.fromiter((cons.get(c, {}).get('min', 0.0) for c in categories),
+                                                          dtype=np.float64, count=len(categories)),
+                            'Max Weight (%)': np.fromiter((cons.get(c, {}).get('max', default_max) for c in categories),
+                                                          dtype=np.float64, count=len(categories)),
+                            'Active': np.fromiter((c in cons for c in categories), dtype=bool, count=len(categories))
+                        })
                         
                         st.markdown("**Edit Individual Category Constraints:**")
                         st.caption("💡 Check 'Active' to override global constraints for a specific category")
+                        individual_cat_df = constraint_editor_rows(individual_cat_df, 'Category', "Classes",
+                                                                   key="individual_etf_category_picker")
                         
                         # Display editable table
                         edited_cat_df = st.data_editor(
@@ -4639,13 +5241,13 @@ def run_etf_system():
                         )
                         
                         # Update session state
-                        st.session_state['individual_category_constraints_etf'] = {}
-                        for _, row in edited_cat_df.iterrows():
-                            if row['Active']:
-                                st.session_state['individual_category_constraints_etf'][row['Category']] = {
-                                    'min': row['Min Weight (%)'],
-                                    'max': row['Max Weight (%)']
-                                }
+                        active_rows = edited_cat_df[edited_cat_df['Active'].astype(bool).to_numpy()]
+                        st.session_state['individual_category_constraints_etf'] = {
+                            name: {'min': lo, 'max': hi}
+                            for name, lo, hi in zip(active_rows['Category'].to_numpy(),
+                                                    active_rows['Min Weight (%)'].to_numpy(dtype=np.float64).tolist(),
+                                                    active_rows['Max Weight (%)'].to_numpy(dtype=np.float64).tolist())
+                        }
                         
                         # Show summary
                         active_cat_count = len(st.session_state['individual_category_constraints_etf'])
@@ -4678,7 +5280,8 @@ def run_etf_system():
                             if len(etf_return_series) >= min_history_days:
                                 etf_returns_dict[ticker] = etf_return_series
                                 valid_etfs.append(ticker)
-                                etf_start_dates[ticker] = etf_return_series.first_valid_index()
+                                # Already dropna'd, so the first date is the first valid one
+                                etf_start_dates[ticker] = etf_return_series.index[0]
                             else:
                                 st.warning(f"⚠️ Excluding {ticker}: Insufficient history ({len(etf_return_series)} days < {min_history_days})")
                     
@@ -4688,8 +5291,9 @@ def run_etf_system():
                     
                     st.success(f"✅ {len(valid_etfs)} ETFs meet individual minimum history requirement")
                     
-                    # Align all returns to common date range
-                    all_returns_df = pd.DataFrame(etf_returns_dict)
+                    # Align all returns to the dates every ETF reports (inner join): starts at the
+                    # youngest ETF and never invents zero returns for an ETF's missing days
+                    all_returns_df = pd.concat(etf_returns_dict, axis=1, join='inner')
                     
                     # Find youngest ETF (latest start date)
                     youngest_start = max(etf_start_dates.values())
@@ -4697,10 +5301,6 @@ def run_etf_system():
                     # Show alignment info
                     st.info(f"📅 Youngest ETF starts: {youngest_start.date()}")
                     
-                    # Trim to common period
-                    all_returns_df = all_returns_df.loc[youngest_start:]
-                    all_returns_df = all_returns_df.fillna(0)
-                    
                     # Check if aligned period meets minimum requirement
                     aligned_length = len(all_returns_df)
                     
@@ -4896,8 +5496,9 @@ def run_etf_system():
                         
                         # Display selected view
                         weights = result.weights
-                        fig_pie = create_portfolio_pie_chart(
-                            weights,
+                        weights_items = tuple(weights.items())
+                        fig_pie = cached_portfolio_pie_chart(
+                            weights_items,
                             st.session_state['portfolio_view'],
                             asset_categories,
                             asset_subcategories
@@ -4909,15 +5510,7 @@ def run_etf_system():
                         
                         with summary_col1:
                             st.markdown("#### Category Breakdown")
-                            category_weights = {}
-                            for ticker, weight in weights.items():
-                                cat = asset_categories.get(ticker, 'Unknown')
-                                category_weights[cat] = category_weights.get(cat, 0) + weight
-                            
-                            cat_df = pd.DataFrame({
-                                'Category': list(category_weights.keys()),
-                                'Weight %': [w*100 for w in category_weights.values()]
-                            }).sort_values('Weight %', ascending=False)
+                            cat_df = weight_breakdown(weights_items, asset_categories, 'Category')
                             
                             st.dataframe(
                                 cat_df.style.format({'Weight %': '{:.2f}%'}),
@@ -4972,8 +5565,8 @@ def run_etf_system():
                         
                         if period_months:
                             cutoff_date = portfolio_returns.index[-1] - pd.DateOffset(months=period_months)
-                            period_returns = portfolio_returns[portfolio_returns.index >= cutoff_date]
-                            period_voo = voo_returns[voo_returns.index >= cutoff_date]
+                            period_returns = portfolio_returns.loc[cutoff_date:]
+                            period_voo = voo_returns.loc[cutoff_date:]
                         else:
                             period_returns = portfolio_returns
                             period_voo = voo_returns
@@ -5013,29 +5606,36 @@ def run_etf_system():
                         
                         # Calculate and display metrics for different periods
                         periods_list = ['3M', '6M', '12M', '24M', '36M', 'Total']
-                        metrics_data = {'Period': [], 'Portfolio Return': [], 'VOO Return': [], 'Excess Return': []}
+                        period_names = []
                         
+                        period_cutoffs = []
                         for period_name in periods_list:
                             if period_name == 'Total':
-                                p_ret = (1 + portfolio_returns).prod() - 1
-                                v_ret = (1 + voo_returns).prod() - 1
+                                cutoff = None
                             else:
                                 months = int(period_name.replace('M', ''))
                                 cutoff = portfolio_returns.index[-1] - pd.DateOffset(months=months)
                                 
                                 if cutoff < portfolio_returns.index[0]:
                                     continue
-                                
-                                p_ret = (1 + portfolio_returns[portfolio_returns.index >= cutoff]).prod() - 1
-                                v_ret = (1 + voo_returns[voo_returns.index >= cutoff]).prod() - 1
                             
-                            metrics_data['Period'].append(period_name)
-                            metrics_data['Portfolio Return'].append(f"{p_ret*100:.2f}%")
-                            metrics_data['VOO Return'].append(f"{v_ret*100:.2f}%")
-                            metrics_data['Excess Return'].append(f"{(p_ret - v_ret)*100:.2f}%")
-                        
-                        metrics_df = pd.DataFrame(metrics_data)
-                        st.dataframe(metrics_df, use_container_width=True, hide_index=True)
+                            period_names.append(period_name)
+                            period_cutoffs.append(cutoff)
+                        
+                        # One reverse cumulative product per series serves every period
+                        p_rets = trailing_compound_returns(portfolio_returns, period_cutoffs)
+                        v_rets = trailing_compound_returns(voo_returns, period_cutoffs)
+                        metrics_df = pd.DataFrame({
+                            'Period': period_names,
+                            'Portfolio Return': p_rets,
+                            'VOO Return': v_rets,
+                            'Excess Return': p_rets - v_rets
+                        })
+                        st.dataframe(
+                            metrics_df.style.format('{:.2%}', subset=['Portfolio Return', 'VOO Return', 'Excess Return']),
+                            use_container_width=True,
+                            hide_index=True
+                        )
                         
                         st.markdown("---")
                         
@@ -5115,12 +5715,9 @@ def run_etf_system():
                             key="etf_portfolio_freq"
                         )
                         
-                        if frequency_choice == 'Daily':
-                            analysis_returns = portfolio_returns
-                        elif frequency_choice == 'Weekly':
-                            analysis_returns = portfolio_returns.resample('W').apply(lambda x: (1 + x).prod() - 1)
-                        else:
-                            analysis_returns = portfolio_returns.resample('ME').apply(lambda x: (1 + x).prod() - 1)
+                        analysis_returns = returns_by_frequency(portfolio_returns)[frequency_choice]
+                        # Scalar metrics below reduce the raw values; no index alignment needed
+                        analysis_values = analysis_returns.to_numpy(dtype=np.float64)
                         
                         st.markdown("---")
                         
@@ -5130,11 +5727,11 @@ def run_etf_system():
                         omega_chart_col, omega_gauge_col = st.columns([2, 1])
                         
                         with omega_chart_col:
-                            fig_omega = create_omega_cdf_chart(analysis_returns, threshold=0, frequency=frequency_choice.lower())
+                            fig_omega = create_omega_cdf_chart(analysis_values, threshold=0, frequency=frequency_choice.lower())
                             st.plotly_chart(fig_omega, use_container_width=True)
                         
                         with omega_gauge_col:
-                            omega_val = PortfolioMetrics.omega_ratio(analysis_returns)
+                            omega_val = PortfolioMetrics.omega_ratio(analysis_values)
                             fig_omega_gauge = create_omega_gauge(omega_val, frequency=frequency_choice)
                             st.plotly_chart(fig_omega_gauge, use_container_width=True)
                         
@@ -5146,8 +5743,8 @@ def run_etf_system():
                         rachev_chart_col, rachev_metrics_col = st.columns([2, 1])
                         
                         with rachev_chart_col:
-                            var_val = PortfolioMetrics.var(analysis_returns, 0.95)
-                            cvar_val = PortfolioMetrics.cvar(analysis_returns, 0.95)
+                            var_val = PortfolioMetrics.var(analysis_values, 0.95)
+                            cvar_val = PortfolioMetrics.cvar(analysis_values, 0.95)
                             
                             fig_rachev = create_combined_rachev_var_chart(
                                 analysis_returns, var_val, cvar_val, frequency=frequency_choice.lower()
@@ -5155,7 +5752,7 @@ def run_etf_system():
                             st.plotly_chart(fig_rachev, use_container_width=True)
                         
                         with rachev_metrics_col:
-                            rachev_val = PortfolioMetrics.rachev_ratio(analysis_returns, alpha=0.05)
+                            rachev_val = PortfolioMetrics.rachev_ratio(analysis_values, alpha=0.05)
                             fig_rachev_gauge = create_rachev_gauge(rachev_val, frequency=frequency_choice)
                             st.plotly_chart(fig_rachev_gauge, use_container_width=True)
                         
@@ -5166,26 +5763,17 @@ def run_etf_system():
                         # ═══════════════════════════════════════════════════════════════════
                         
                         st.markdown("### 📊 Sharpe Ratio Analysis")
+                        risk_metrics = portfolio_risk_metrics(portfolio_returns)
                         
                         sharpe_chart_col, sharpe_metrics_col = st.columns([3, 1])
                         
                         with sharpe_chart_col:
-                            fig_sharpe = create_rolling_sharpe_chart(portfolio_returns, window_months=12)
+                            fig_sharpe = cached_rolling_sharpe_chart(portfolio_returns, window_months=12)
                             st.plotly_chart(fig_sharpe, use_container_width=True)
                         
                         with sharpe_metrics_col:
                             # Calculate Sharpe for different periods
-                            for period_name, months in [('12M', 12), ('24M', 24), ('36M', 36), ('Total', None)]:
-                                if months:
-                                    cutoff = portfolio_returns.index[-1] - pd.DateOffset(months=months)
-                                    if cutoff >= portfolio_returns.index[0]:
-                                        period_ret = portfolio_returns[portfolio_returns.index >= cutoff]
-                                    else:
-                                        continue
-                                else:
-                                    period_ret = portfolio_returns
-                                
-                                sharpe = PortfolioMetrics.sharpe_ratio(period_ret)
+                            for period_name, sharpe in risk_metrics['sharpe'].items():
                                 st.metric(f"Sharpe {period_name}", f"{sharpe:.2f}")
                         
                         st.markdown("---")
@@ -5202,21 +5790,11 @@ def run_etf_system():
                         vol_chart_col, vol_metrics_col = st.columns([3, 1])
                         
                         with vol_chart_col:
-                            fig_vol = create_rolling_vol_chart(portfolio_returns, window_months=12)
+                            fig_vol = cached_rolling_vol_chart(portfolio_returns, window_months=12)
                             st.plotly_chart(fig_vol, use_container_width=True)
                         
                         with vol_metrics_col:
-                            for period_name, months in [('12M', 12), ('24M', 24), ('36M', 36), ('Total', None)]:
-                                if months:
-                                    cutoff = portfolio_returns.index[-1] - pd.DateOffset(months=months)
-                                    if cutoff >= portfolio_returns.index[0]:
-                                        period_ret = portfolio_returns[portfolio_returns.index >= cutoff]
-                                    else:
-                                        continue
-                                else:
-                                    period_ret = portfolio_returns
-                                
-                                vol = PortfolioMetrics.annualized_volatility(period_ret)
+                            for period_name, vol in risk_metrics['vol'].items():
                                 st.metric(f"Vol {period_name}", f"{vol*100:.2f}%")
                         
                         st.markdown("---")
@@ -5227,11 +5805,11 @@ def run_etf_system():
                         dd_chart_col, dd_metrics_col = st.columns([3, 1])
                         
                         with dd_chart_col:
-                            fig_underwater, max_dd_info = create_underwater_plot(portfolio_returns)
+                            fig_underwater, max_dd_info = cached_underwater_plot(portfolio_returns)
                             st.plotly_chart(fig_underwater, use_container_width=True)
                         
                         with dd_metrics_col:
-                            mdd = PortfolioMetrics.max_drawdown(portfolio_returns)
+                            mdd = risk_metrics['mdd']
                             st.metric("Max Drawdown", f"{mdd*100:.2f}%")
                             
                             # Display CDaR metric
@@ -5302,10 +5880,7 @@ def run_etf_system():
                     'ETF Ticker': ['VOO', 'QQQ', 'IWM'],
                     'Allocation (%)': [50.0, 30.0, 20.0]
                 })
-                buffer = io.BytesIO()
-                with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
-                    template_df.to_excel(writer, index=False)
-                buffer.seek(0)
+                buffer = excel_template_bytes(template_df)
                 c1, c2 = st.columns([1, 2])
                 with c1:
                     st.download_button("📥 Download Template", buffer, "etf_portfolio_template.xlsx", use_container_width=True)
@@ -5317,13 +5892,9 @@ def run_etf_system():
                     try:
                         pdf = pd.read_excel(uploaded)
                         if 'ETF Ticker' in pdf.columns and 'Allocation (%)' in pdf.columns:
-                            avail = metrics_df.index.tolist()
-                            valid, invalid = {}, []
-                            for _, r in pdf.iterrows():
-                                if r['ETF Ticker'] in avail:
-                                    valid[r['ETF Ticker']] = r['Allocation (%)']
-                                else:
-                                    invalid.append(r['ETF Ticker'])
+                            found = pdf['ETF Ticker'].isin(metrics_df.index).to_numpy()
+                            valid = dict(zip(pdf.loc[found, 'ETF Ticker'], pdf.loc[found, 'Allocation (%)']))
+                            invalid = pdf.loc[~found, 'ETF Ticker'].tolist()
                             if invalid:
                                 st.warning(f"Not found: {', '.join(invalid)}")
                             if valid:
@@ -5512,7 +6083,7 @@ CREATE POLICY "Allow all operations" ON etf_recommended_portfolios
                     if selected_period != 'All':
                         months = period_map[selected_period]
                         cutoff = portfolio_returns.index[-1] - pd.DateOffset(months=months)
-                        portfolio_returns_filtered = portfolio_returns[portfolio_returns.index >= cutoff]
+                        portfolio_returns_filtered = portfolio_returns.loc[cutoff:]
                     else:
                         portfolio_returns_filtered = portfolio_returns
                     
@@ -5557,8 +6128,9 @@ CREATE POLICY "Allow all operations" ON etf_recommended_portfolios
                         st.session_state['etf_rec_portfolio_view'] = 'fund'
                     
                     # Display pie chart
-                    fig_pie = create_portfolio_pie_chart(
-                        weights_series,
+                    weights_items = tuple(weights_series.items())
+                    fig_pie = cached_portfolio_pie_chart(
+                        weights_items,
                         st.session_state['etf_rec_portfolio_view'],
                         etf_classes,
                         etf_categories
@@ -5570,15 +6142,7 @@ CREATE POLICY "Allow all operations" ON etf_recommended_portfolios
                     
                     with summary_col1:
                         st.markdown("#### Class Breakdown")
-                        class_weights = {}
-                        for etf, weight in weights_series.items():
-                            cls = etf_classes.get(etf, 'Unknown')
-                            class_weights[cls] = class_weights.get(cls, 0) + weight
-                        
-                        class_df = pd.DataFrame({
-                            'Class': list(class_weights.keys()),
-                            'Weight %': [w*100 for w in class_weights.values()]
-                        }).sort_values('Weight %', ascending=False)
+                        class_df = weight_breakdown(weights_items, etf_classes, 'Class')
                         
                         st.dataframe(
                             class_df.style.format({'Weight %': '{:.2f}%'}),
@@ -5588,15 +6152,7 @@ CREATE POLICY "Allow all operations" ON etf_recommended_portfolios
                     
                     with summary_col2:
                         st.markdown("#### Category Breakdown")
-                        cat_weights = {}
-                        for etf, weight in weights_series.items():
-                            cat = etf_categories.get(etf, 'Unknown')
-                            cat_weights[cat] = cat_weights.get(cat, 0) + weight
-                        
-                        cat_df = pd.DataFrame({
-                            'Category': list(cat_weights.keys()),
-                            'Weight %': [w*100 for w in cat_weights.values()]
-                        }).sort_values('Weight %', ascending=False)
+                        cat_df = weight_breakdown(weights_items, etf_categories, 'Category')
                         
                         st.dataframe(
                             cat_df.style.format({'Weight %': '{:.2f}%'}),
@@ -5641,7 +6197,7 @@ CREATE POLICY "Allow all operations" ON etf_recommended_portfolios
                     # Filter returns by period
                     if period_map[selected_period] is not None:
                         cutoff = portfolio_returns.index[-1] - pd.DateOffset(months=period_map[selected_period])
-                        port_ret_filtered = portfolio_returns[portfolio_returns.index >= cutoff]
+                        port_ret_filtered = portfolio_returns.loc[cutoff:]
                     else:
                         port_ret_filtered = portfolio_returns
                     
@@ -5728,12 +6284,7 @@ CREATE POLICY "Allow all operations" ON etf_recommended_portfolios
                     
                     freq_label = frequency_choice.lower()
                     
-                    if frequency_choice == 'Daily':
-                        returns_data = portfolio_returns
-                    elif frequency_choice == 'Weekly':
-                        returns_data = portfolio_returns.resample('W').apply(lambda x: (1 + x).prod() - 1)
-                    else:
-                        returns_data = portfolio_returns.resample('ME').apply(lambda x: (1 + x).prod() - 1)
+                    returns_data = returns_by_frequency(portfolio_returns)[frequency_choice]
                     
                     st.markdown("---")
                     
@@ -5786,7 +6337,7 @@ CREATE POLICY "Allow all operations" ON etf_recommended_portfolios
                     sharpe_chart_col, sharpe_metrics_col = st.columns([3, 1])
                     
                     with sharpe_chart_col:
-                        fig_sharpe = create_rolling_sharpe_chart(portfolio_returns, window_months=12)
+                        fig_sharpe = cached_rolling_sharpe_chart(portfolio_returns, window_months=12)
                         st.plotly_chart(fig_sharpe, use_container_width=True)
                     
                     with sharpe_metrics_col:
@@ -5816,7 +6367,7 @@ CREATE POLICY "Allow all operations" ON etf_recommended_portfolios
                     vol_chart_col, vol_metrics_col = st.columns([3, 1])
                     
                     with vol_chart_col:
-                        fig_vol = create_rolling_vol_chart(portfolio_returns, window_months=12)
+                        fig_vol = cached_rolling_vol_chart(portfolio_returns, window_months=12)
                         st.plotly_chart(fig_vol, use_container_width=True)
                     
                     with vol_metrics_col:
@@ -5840,7 +6391,7 @@ CREATE POLICY "Allow all operations" ON etf_recommended_portfolios
                     dd_chart_col, dd_metrics_col = st.columns([3, 1])
                     
                     with dd_chart_col:
-                        fig_underwater, max_dd_info = create_underwater_plot(portfolio_returns)
+                        fig_underwater, max_dd_info = cached_underwater_plot(portfolio_returns)
                         st.plotly_chart(fig_underwater, use_container_width=True)
                     
                     with dd_metrics_col:
@@ -5886,22 +6437,18 @@ CREATE POLICY "Allow all operations" ON etf_recommended_portfolios
                                 bench_ret_aligned = bench_returns.reindex(common_idx)
                                 
                                 if len(common_idx) >= 250:
-                                    copula_results = estimate_rolling_copula_for_chart(
+                                    copula_results = estimate_rolling_copula_cached(
+                                        _series_content_key(port_ret_aligned),
+                                        _series_content_key(bench_ret_aligned),
+                                        250,
                                         port_ret_aligned,
-                                        bench_ret_aligned,
-                                        window=250
+                                        bench_ret_aligned
                                     )
                                     
                                     if copula_results is not None:
-                                        last_kendall = copula_results['kendall_tau'].iloc[-1]
-                                        last_tail_lower = copula_results['tail_lower'].iloc[-1]
-                                        last_tail_upper = copula_results['tail_upper'].iloc[-1]
-                                        last_asymmetry = copula_results['asymmetry_index'].iloc[-1]
-                                        
-                                        avg_kendall = copula_results['kendall_tau'].mean()
-                                        avg_tail_lower = copula_results['tail_lower'].mean()
-                                        avg_tail_upper = copula_results['tail_upper'].mean()
-                                        avg_asymmetry = copula_results['asymmetry_index'].mean()
+                                        last_vals, avg_vals = copula_last_and_average(copula_results)
+                                        last_kendall, last_tail_lower, last_tail_upper, last_asymmetry = last_vals
+                                        avg_kendall, avg_tail_lower, avg_tail_upper, avg_asymmetry = avg_vals
                                         
                                         exposure_data.append({
                                             'Benchmark': f'{bench} - Last Window',
@@ -5957,11 +6504,7 @@ CREATE POLICY "Allow all operations" ON etf_recommended_portfolios
                         
                         if exposure_data:
                             exposure_df = pd.DataFrame(exposure_data)
-                            st.dataframe(
-                                exposure_df.style.format({col: "{:.4f}" for col in exposure_df.columns if col != 'Benchmark'})
-                                .background_gradient(cmap='RdYlGn', subset=[col for col in exposure_df.columns if col != 'Benchmark'], vmin=-1, vmax=1),
-                                use_container_width=True, hide_index=True
-                            )
+                            st.markdown(style_exposure_table(exposure_df), unsafe_allow_html=True)
                             
                             with st.expander("📚 Exposure Metrics Guide"):
                                 st.markdown("""
@@ -6002,39 +6545,28 @@ CREATE POLICY "Allow all operations" ON etf_recommended_portfolios
                             bench_ret_aligned = bench_returns.reindex(common_idx)
                             
                             if len(common_idx) >= 300:
-                                copula_results = estimate_rolling_copula_for_chart(
+                                copula_results = estimate_rolling_copula_cached(
+                                    _series_content_key(port_ret_aligned),
+                                    _series_content_key(bench_ret_aligned),
+                                    250,
                                     port_ret_aligned,
-                                    bench_ret_aligned,
-                                    window=250
+                                    bench_ret_aligned
                                 )
                                 
                                 if copula_results is not None:
-                                    current_kendall = copula_results['kendall_tau'].iloc[-1]
-                                    avg_kendall = copula_results['kendall_tau'].mean()
-                                    current_tail_lower = copula_results['tail_lower'].iloc[-1]
-                                    avg_tail_lower = copula_results['tail_lower'].mean()
-                                    current_tail_upper = copula_results['tail_upper'].iloc[-1]
-                                    avg_tail_upper = copula_results['tail_upper'].mean()
-                                    current_asymmetry = copula_results['asymmetry_index'].iloc[-1]
-                                    avg_asymmetry = copula_results['asymmetry_index'].mean()
+                                    last_vals, avg_vals = copula_last_and_average(copula_results)
+                                    current_kendall, current_tail_lower, current_tail_upper, current_asymmetry = last_vals
+                                    avg_kendall, avg_tail_lower, avg_tail_upper, avg_asymmetry = avg_vals
                                     
                                     st.markdown(f"##### Portfolio Exposure Evolution - {selected_ts_benchmark}")
                                     
-                                    row1_col1, row1_col2 = st.columns(2)
-                                    with row1_col1:
-                                        fig_kendall = create_exposure_time_series_chart(copula_results, 'kendall_tau', current_kendall, avg_kendall, selected_ts_benchmark)
-                                        st.plotly_chart(fig_kendall, use_container_width=True)
-                                    with row1_col2:
-                                        fig_asymmetry = create_exposure_time_series_chart(copula_results, 'asymmetry_index', current_asymmetry, avg_asymmetry, selected_ts_benchmark)
-                                        st.plotly_chart(fig_asymmetry, use_container_width=True)
-                                    
-                                    row2_col1, row2_col2 = st.columns(2)
-                                    with row2_col1:
-                                        fig_tail_lower = create_exposure_time_series_chart(copula_results, 'tail_lower', current_tail_lower, avg_tail_lower, selected_ts_benchmark)
-                                        st.plotly_chart(fig_tail_lower, use_container_width=True)
-                                    with row2_col2:
-                                        fig_tail_upper = create_exposure_time_series_chart(copula_results, 'tail_upper', current_tail_upper, avg_tail_upper, selected_ts_benchmark)
-                                        st.plotly_chart(fig_tail_upper, use_container_width=True)
+                                    fig_exposure = cached_exposure_time_series_grid(
+                                        copula_results,
+                                        dict(zip(COPULA_METRICS, last_vals)),
+                                        dict(zip(COPULA_METRICS, avg_vals)),
+                                        selected_ts_benchmark
+                                    )
+                                    st.plotly_chart(fig_exposure, use_container_width=True)
                                     
                                     st.markdown("##### Summary Statistics")
                                     mc1, mc2, mc3, mc4 = st.columns(4)
@@ -6928,8 +7460,7 @@ CREATE POLICY "Allow all operations" ON etf_recommended_portfolios
             daily_returns = pd.Series(daily_returns_tuple[0], index=pd.to_datetime(daily_returns_tuple[1]))
             if daily_returns is None or len(daily_returns) < window:
                 return None, None
-            rolling_returns = (1 + daily_returns).rolling(window=window).apply(lambda x: x.prod() - 1, raw=True)
-            rolling_returns = rolling_returns.dropna()
+            rolling_returns = rolling_compound_returns(daily_returns, window).dropna()
             if len(rolling_returns) < 10:
                 return None, None
             return tuple(rolling_returns.values), tuple(rolling_returns.index.astype(str))
@@ -7033,10 +7564,7 @@ CREATE POLICY "Allow all operations" ON etf_recommended_portfolios
         if creation_method == "📤 Upload Excel File":
             st.markdown("---")
             template_df = pd.DataFrame({'ETF Ticker': ['VOO', 'QQQ', 'IWM']})
-            buffer = io.BytesIO()
-            with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
-                template_df.to_excel(writer, index=False)
-            buffer.seek(0)
+            buffer = excel_template_bytes(template_df)
             
             c1, c2 = st.columns([1, 2])
             with c1:
@@ -7049,14 +7577,9 @@ CREATE POLICY "Allow all operations" ON etf_recommended_portfolios
                 try:
                     pdf = pd.read_excel(uploaded)
                     if 'ETF Ticker' in pdf.columns:
-                        avail = metrics_df.index.tolist()
-                        valid, invalid = [], []
-                        for _, r in pdf.iterrows():
-                            if r['ETF Ticker'] in avail:
-                                if r['ETF Ticker'] not in valid:
-                                    valid.append(r['ETF Ticker'])
-                            else:
-                                invalid.append(str(r['ETF Ticker']))
+                        found = pdf['ETF Ticker'].isin(metrics_df.index).to_numpy()
+                        valid = list(dict.fromkeys(pdf.loc[found, 'ETF Ticker']))
+                        invalid = pdf.loc[~found, 'ETF Ticker'].astype(str).tolist()
                         if invalid:
                             st.warning(f"Not found: {', '.join(invalid[:10])}")
                         if valid:
@@ -7549,6 +8072,332 @@ CREATE INDEX idx_etf_risk_monitor_funds_user_id ON etf_risk_monitor_funds(user_i
                 - **VaR(5)**: 95th percentile (best 5% threshold) - green dashed line
                 - **Latest Return**: Current period return shown as point on the KDE curve
                 """)
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# DETAILED ANALYSIS FRAGMENTS
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def _render_exposure_timeseries(fund_copula_key, fund_returns_full, bench_map, bench_name,
+                                fund_info=None, title='Fund Exposure Evolution'):
+    """
+    Rolling copula 2x2 grid and summary metrics for one benchmark. Last/average values
+    come from the rolling results, or from the precomputed fund metrics when fund_info
+    is given. Returns False when the history is too short for the rolling window.
+    """
+    copula_results = estimate_rolling_copula_cached(
+        fund_copula_key,
+        (bench_name,) + _series_content_key(bench_map[bench_name]),
+        250,
+        fund_returns_full,
+        bench_map[bench_name]
+    )
+    
+    if copula_results is None:
+        return False
+    
+    # Current and average values
+    info_prefix = {
+        'kendall_tau': 'KENDALL_TAU',
+        'tail_lower': 'TAIL_LOWER',
+        'tail_upper': 'TAIL_UPPER',
+        'asymmetry_index': 'ASYMMETRY'
+    }
+    if fund_info is None:
+        last_vals, avg_vals = copula_last_and_average(copula_results)
+        last_values = dict(zip(COPULA_METRICS, last_vals))
+        avg_values = dict(zip(COPULA_METRICS, avg_vals))
+    else:
+        last_values = {m: fund_info.get(f'{p}_{bench_name}', np.nan) for m, p in info_prefix.items()}
+        avg_values = {m: fund_info.get(f'{p}_AVG_{bench_name}', np.nan) for m, p in info_prefix.items()}
+    
+    # Create 2x2 grid of charts
+    st.markdown(f"##### {title} - {bench_name}")
+    
+    fig_exposure = cached_exposure_time_series_grid(copula_results, last_values, avg_values, bench_name)
+    st.plotly_chart(fig_exposure, use_container_width=True)
+    
+    # Summary metrics below charts
+    st.markdown("##### Summary Statistics")
+    if fund_info is None:
+        summary_spec = (
+            ('Kendall Tau', 'kendall_tau', "Overall correlation between fund and benchmark"),
+            ('Tail Lower', 'tail_lower', "Crash correlation strength"),
+            ('Tail Upper', 'tail_upper', "Boom correlation strength"),
+            ('Asymmetry', 'asymmetry_index', "Crash vs boom bias")
+        )
+    else:
+        # Precomputed metrics: show the last value with its deviation from the average
+        summary_spec = (
+            ('Kendall Tau (Last)', 'kendall_tau', None),
+            ('Lower Tail (Last)', 'tail_lower', None),
+            ('Upper Tail (Last)', 'tail_upper', None),
+            ('Asymmetry (Last)', 'asymmetry_index', None)
+        )
+    
+    for metric_col, (label, metric_name, help_text) in zip(st.columns(4), summary_spec):
+        last_value = float(last_values[metric_name])
+        avg_value = float(avg_values[metric_name])
+        if math.isnan(avg_value):
+            delta = None
+        elif fund_info is None:
+            delta = f"Avg: {avg_value:.4f}"
+        else:
+            delta = f"{(last_value - avg_value):.4f}" if not math.isnan(last_value) else None
+        with metric_col:
+            st.metric(
+                label,
+                f"{last_value:.4f}" if not math.isnan(last_value) else "N/A",
+                delta=delta,
+                help=help_text
+            )
+    
+    return True
+
+
+@st.fragment
+def render_fund_monthly_calendar(fund_returns_full, fund_returns_monthly, bench_map):
+    """Monthly returns calendar - a fragment, so changing benchmark/method reruns only this block."""
+    # Benchmark and comparison method selection
+    cal_col1, cal_col2 = st.columns([1, 1])
+
+    with cal_col1:
+        if bench_map:
+            benchmark_cols = list(bench_map)
+            default_bench_idx = benchmark_cols.index('CDI') if 'CDI' in benchmark_cols else 0
+            selected_calendar_benchmark = st.selectbox(
+                "Select Benchmark for Comparison:",
+                options=benchmark_cols,
+                index=default_bench_idx,
+                key="calendar_benchmark"
+            )
+        else:
+            selected_calendar_benchmark = None
+            st.warning("No benchmarks available")
+
+    with cal_col2:
+        comparison_method = st.selectbox(
+            "Comparison Method:",
+            options=['Relative Performance', 'Percentage Points', 'Benchmark Performance'],
+            index=0,
+            key="comparison_method"
+        )
+
+    if selected_calendar_benchmark and selected_calendar_benchmark in bench_map:
+        # Create monthly returns table
+        benchmark_series = bench_map[selected_calendar_benchmark]
+        monthly_table = create_monthly_returns_table(
+            fund_returns_full,
+            benchmark_series,
+            comparison_method,
+            monthly_fund=fund_returns_monthly
+        )
+
+        # Render as a plotly table (styling computed vectorized)
+        st.plotly_chart(create_monthly_returns_table_figure(monthly_table), use_container_width=True)
+
+        # Add explanation
+        with st.expander("ℹ️ Understanding the Monthly Returns Calendar"):
+            explanation_text = f"""
+            **How to read this table:**
+
+            For each year, {"two" if comparison_method == "Benchmark Performance" else "three"} rows are displayed:
+            - **Fund**: Monthly returns of the investment fund
+            """
+
+            if comparison_method != 'Benchmark Performance':
+                explanation_text += f"- **Benchmark**: Monthly returns of the selected benchmark ({selected_calendar_benchmark})\n"
+
+            explanation_text += f"""- **{comparison_method}**: The comparison metric between fund and benchmark
+
+            **Comparison Methods:**
+            - **Relative Performance**: Ratio showing fund performance relative to benchmark
+              - Same returns: 100%
+              - Fund 2%, Benchmark 1%: 200% (fund returned twice as much)
+              - Fund 0.5%, Benchmark 1%: 50% (fund returned half as much)
+              - When both negative: inverted ratio (smaller loss = better performance)
+              - Example: Fund -1%, Benchmark -2%: 200% (fund lost half, outperformed)
+
+            - **Percentage Points**: Fund return minus benchmark return in absolute terms
+              - Example: +2.5% means fund outperformed by 2.5 percentage points
+
+            - **Benchmark Performance**: Displays the benchmark's monthly returns for reference
+              - The Benchmark row is hidden when this option is selected (redundant)
+
+            **Columns:**
+            - **Year**: The calendar year (shown on the first row of each year group)
+            - **Type**: Fund, Benchmark (if shown), or Comparison metric
+            - **Jan-Dec**: Monthly returns/comparison for each month
+            - **YTD**: Year-to-date accumulated performance
+            - **Total**: Cumulative performance since the beginning of the fund's history
+
+            **Visual Guide:**
+            - Negative values are displayed in **red** for easy identification
+            - Alternating row shading separates year groups
+            - Latest year appears first (reverse chronological order)
+            - The table can display up to 5 years of historical data
+            """
+
+            st.markdown(explanation_text)
+
+
+@st.fragment
+def render_fund_risk_adjusted_section(fund_returns_full, fund_returns_monthly, fund_info):
+    """Omega/Rachev/VaR block - a fragment, so the frequency radio reruns only this block."""
+    # Frequency selection
+    st.markdown("#### Data Frequency Selection")
+    frequency_choice = st.radio(
+        "Select frequency for Omega, Rachev, VaR and CVaR analysis:",
+        options=['Daily', 'Weekly', 'Monthly'],
+        horizontal=True,
+        help="Choose whether to analyze daily, weekly, or monthly returns data"
+    )
+
+    freq_suffix = 'DAILY' if frequency_choice == 'Daily' else ('WEEKLY' if frequency_choice == 'Weekly' else 'MONTHLY')
+    freq_label = frequency_choice.lower()
+
+    # Use appropriate returns data
+    if frequency_choice == 'Daily':
+        returns_data = fund_returns_full
+    elif frequency_choice == 'Weekly':
+        # Convert to weekly returns
+        returns_data = compound_returns_by_period(fund_returns_full, 'W')
+    else:
+        # Monthly returns already compounded by the caller
+        returns_data = fund_returns_monthly
+
+    st.markdown("---")
+
+    # === OMEGA SECTION (Top Row) ===
+    st.markdown("#### Omega Ratio")
+
+    omega_chart_col, omega_gauge_col = st.columns([2, 1])
+
+    with omega_chart_col:
+        # Omega CDF chart
+        fig_omega = create_omega_cdf_chart(returns_data, threshold=0, frequency=freq_label)
+        st.plotly_chart(fig_omega, use_container_width=True)
+
+    with omega_gauge_col:
+        # Omega gauge with selected frequency
+        omega_val = fund_info.get(f'OMEGA_{freq_suffix}', np.nan)
+        if pd.notna(omega_val) and not np.isinf(omega_val):
+            fig_omega_gauge = create_omega_gauge(omega_val, frequency=frequency_choice)
+            st.plotly_chart(fig_omega_gauge, use_container_width=True)
+        else:
+            st.metric(f"Omega Ratio ({frequency_choice})", "N/A")
+
+    st.markdown("---")
+
+    # === RACHEV / VAR / CVAR SECTION (Bottom Row) ===
+    st.markdown("#### Rachev Ratio & Tail Risk")
+
+    rachev_chart_col, rachev_metrics_col = st.columns([2, 1])
+
+    with rachev_chart_col:
+        # Combined chart with selected frequency
+        var_col = 'VAR_95_D' if frequency_choice == 'Daily' else ('VAR_95_W' if frequency_choice == 'Weekly' else 'VAR_95_M')
+        cvar_col = 'CVAR_95_D' if frequency_choice == 'Daily' else ('CVAR_95_W' if frequency_choice == 'Weekly' else 'CVAR_95_M')
+
+        var_val = fund_info.get(var_col, np.nan)
+        cvar_val = fund_info.get(cvar_col, np.nan)
+
+        fig_rachev = create_combined_rachev_var_chart(
+            returns_data, var_val, cvar_val, frequency=freq_label
+        )
+        st.plotly_chart(fig_rachev, use_container_width=True)
+
+    with rachev_metrics_col:
+        # Rachev gauge with selected frequency
+        rachev_val = fund_info.get(f'RACHEV_{freq_suffix}', np.nan)
+        if pd.notna(rachev_val) and not np.isinf(rachev_val):
+            fig_rachev_gauge = create_rachev_gauge(rachev_val, frequency=frequency_choice)
+            st.plotly_chart(fig_rachev_gauge, use_container_width=True)
+        else:
+            st.metric(f"Rachev Ratio ({frequency_choice})", "N/A")
+
+    # Explanation guide
+    with st.expander("📚 Understanding Omega & Rachev Ratios"):
+        st.markdown("""
+        ### Omega Ratio
+
+        **What it measures:** Probability-weighted ratio of gains vs losses above/below a threshold (usually 0%).
+
+        **Formula:** Ω = (Sum of gains above threshold) / (Sum of losses below threshold)
+
+        **Interpretation:**
+        - **Ω < 1.0**: Poor - Losses exceed gains
+        - **Ω 1.0-1.5**: Below average
+        - **Ω 1.5-2.0**: Average/Good
+        - **Ω 2.0-3.0**: Very good
+        - **Ω > 3.0**: Excellent
+        - **Higher is better** - more gains relative to losses
+
+        **Visualization:** The CDF chart shows cumulative probability. Red area (below threshold) represents losses, green area (above threshold) represents gains. The gauge shows performance quality.
+
+        ---
+
+        ### Rachev Ratio (5% Tails)
+
+        **What it measures:** Expected loss in worst 5% scenarios vs expected gain in best 5% scenarios.
+
+        **Formula:** R = E[Loss | worst 5%] / E[Gain | best 5%]
+
+        **Interpretation:**
+        - **R < 0.5**: Excellent - Very asymmetric (small losses, large gains)
+        - **R 0.5-0.75**: Very good
+        - **R 0.75-1.0**: Good/Average (symmetric risk)
+        - **R 1.0-1.5**: Below average (losses exceeding gains)
+        - **R > 1.5**: Poor - High tail risk
+        - **Lower is better** - smaller downside relative to upside
+
+        **Why 5% tails?** Captures significant tail events while maintaining statistical robustness. Focuses on the extreme 5% of returns in each tail.
+
+        **Visualization:** The PDF chart highlights the 5% tails. Red shows expected loss in crashes, green shows expected gain in rallies. The gauge shows risk quality.
+
+        ---
+
+        ### VaR (Value at Risk) & CVaR (Conditional VaR)
+
+        **VaR 95%**: The maximum loss expected 95% of the time (5% worst case threshold)
+
+        **CVaR 95%**: The average loss in the worst 5% of cases (expected shortfall)
+
+        Both metrics help quantify downside risk in monetary terms.
+
+        ---
+
+        ### Daily vs Weekly vs Monthly
+
+        **Daily**: Most granular, captures short-term volatility and daily trading risk. Best for high-frequency trading strategies.
+
+        **Weekly**: Balanced view that smooths out daily noise while still capturing medium-term patterns. Useful for swing trading and tactical allocation.
+
+        **Monthly**: Focuses on longer-term performance patterns, smooths out short-term volatility. Best for strategic asset allocation.
+
+        All three frequencies provide valuable complementary insights into fund behavior at different time scales.
+        """)
+
+
+@st.fragment
+def render_fund_exposure_timeseries(fund_copula_key, fund_returns_full, bench_map):
+    """Fund exposure time series - a fragment, so changing the benchmark reruns only this block."""
+    # Benchmark selection for time series
+    available_ts_benchmarks = ('None',) + _available_benchmarks(tuple(bench_map))
+    selected_fund_ts_benchmark = st.selectbox(
+        "Select Benchmark for Time Series:",
+        options=available_ts_benchmarks,
+        index=0,
+        key="fund_ts_benchmark_selector"
+    )
+
+    if selected_fund_ts_benchmark != 'None' and selected_fund_ts_benchmark in bench_map:
+        with st.spinner(f'Calculating fund exposure time series for {selected_fund_ts_benchmark}...'):
+            if not _render_exposure_timeseries(
+                fund_copula_key, fund_returns_full, bench_map, selected_fund_ts_benchmark
+            ):
+                st.warning("Insufficient data for time series analysis (need at least 275 observations)")
+
+
 def main():
     # Check authentication
     if 'authenticated' not in st.session_state:
@@ -7802,6 +8651,9 @@ def main():
         st.title("📊 DETAILED FUND ANALYSIS")
         st.markdown("---")
         
+        # Benchmark columns materialized once per render - loops below do plain dict lookups
+        bench_map = {c: benchmarks[c] for c in benchmarks.columns} if benchmarks is not None else {}
+        
         # Validate we have the fund name column
         if 'FUNDO DE INVESTIMENTO' not in fund_metrics.columns:
             st.error("❌ Fund name column 'FUNDO DE INVESTIMENTO' not found in data")
@@ -7811,8 +8663,7 @@ def main():
         
         # Fund selection
         fund_names = fund_metrics['FUNDO DE INVESTIMENTO'].tolist()
-        fund_cnpjs = fund_metrics['CNPJ'].tolist()
-        fund_mapping = dict(zip(fund_names, fund_cnpjs))
+        fund_mapping = dict(zip(fund_names, fund_metrics['CNPJ'].tolist()))
         
         selected_fund_name = st.selectbox(
             "Select a fund to analyze:",
@@ -7901,7 +8752,13 @@ def main():
             
             # Store fund returns in session state for later use
             if returns_result is not None:
-                fund_returns_filtered, fund_returns_full = returns_result
+                fund_returns_filtered, fund_returns_full = returns_result.filtered, returns_result.full
+                # Monthly compounding shared by the calendar and the risk section
+                fund_returns_monthly = compound_returns_by_period(fund_returns_full, 'ME')
+                # float32 copy for chart rendering only; metrics keep float64
+                fund_returns_chart = fund_returns_full.astype(np.float32)
+                # Cache key for the rolling copula estimates of this fund
+                fund_copula_key = (selected_fund_cnpj_standard,) + _series_content_key(fund_returns_full)
                 if 'fund_returns_full' not in st.session_state:
                     st.session_state['fund_returns_full'] = {}
                 st.session_state['fund_returns_full'][selected_fund_cnpj_standard] = fund_returns_full
@@ -7921,7 +8778,7 @@ def main():
             
             with col2:
                 if benchmarks is not None:
-                    benchmark_cols = benchmarks.columns.tolist()
+                    benchmark_cols = list(bench_map)
                     # Set CDI and IBOVESPA as defaults if available
                     default_benches = []
                     if 'CDI' in benchmark_cols:
@@ -7939,17 +8796,16 @@ def main():
                 else:
                     selected_benchmarks = []
             
-            returns_result = get_fund_returns(fund_details, selected_fund_cnpj_standard, period_map[selected_period])
-            
             if returns_result is not None:
-                fund_returns_filtered, fund_returns_full = returns_result
+                # Reuse the full series loaded above; only slice the selected period
+                fund_returns_filtered = filter_returns_by_period(fund_returns_chart, period_map[selected_period])
                 
                 # Benchmark dict
                 benchmark_dict = {}
                 if benchmarks is not None:
                     for bench in selected_benchmarks:
-                        if bench in benchmarks.columns:
-                            benchmark_dict[bench] = benchmarks[bench]
+                        if bench in bench_map:
+                            benchmark_dict[bench] = bench_map[bench].astype(np.float32)
                 
                 # Cumulative returns chart
                 fig_returns = create_returns_chart(
@@ -7963,89 +8819,7 @@ def main():
                 # Returns comparison table
                 st.markdown("#### Monthly Returns Calendar")
                 
-                # Benchmark and comparison method selection
-                cal_col1, cal_col2 = st.columns([1, 1])
-                
-                with cal_col1:
-                    if benchmarks is not None:
-                        benchmark_cols = benchmarks.columns.tolist()
-                        default_bench_idx = benchmark_cols.index('CDI') if 'CDI' in benchmark_cols else 0
-                        selected_calendar_benchmark = st.selectbox(
-                            "Select Benchmark for Comparison:",
-                            options=benchmark_cols,
-                            index=default_bench_idx,
-                            key="calendar_benchmark"
-                        )
-                    else:
-                        selected_calendar_benchmark = None
-                        st.warning("No benchmarks available")
-                
-                with cal_col2:
-                    comparison_method = st.selectbox(
-                        "Comparison Method:",
-                        options=['Relative Performance', 'Percentage Points', 'Benchmark Performance'],
-                        index=0,
-                        key="comparison_method"
-                    )
-                
-                if selected_calendar_benchmark and selected_calendar_benchmark in benchmarks.columns:
-                    # Create monthly returns table
-                    benchmark_series = benchmarks[selected_calendar_benchmark]
-                    monthly_table = create_monthly_returns_table(
-                        fund_returns_full,
-                        benchmark_series,
-                        comparison_method
-                    )
-                    
-                    # Style the table as HTML
-                    styled_html = style_monthly_returns_table(monthly_table, comparison_method)
-                    
-                    # Display HTML table
-                    st.markdown(styled_html, unsafe_allow_html=True)
-                    
-                    # Add explanation
-                    with st.expander("ℹ️ Understanding the Monthly Returns Calendar"):
-                        explanation_text = f"""
-                        **How to read this table:**
-                        
-                        For each year, {"two" if comparison_method == "Benchmark Performance" else "three"} rows are displayed:
-                        - **Fund**: Monthly returns of the investment fund
-                        """
-                        
-                        if comparison_method != 'Benchmark Performance':
-                            explanation_text += f"- **Benchmark**: Monthly returns of the selected benchmark ({selected_calendar_benchmark})\n"
-                        
-                        explanation_text += f"""- **{comparison_method}**: The comparison metric between fund and benchmark
-                        
-                        **Comparison Methods:**
-                        - **Relative Performance**: Ratio showing fund performance relative to benchmark
-                          - Same returns: 100%
-                          - Fund 2%, Benchmark 1%: 200% (fund returned twice as much)
-                          - Fund 0.5%, Benchmark 1%: 50% (fund returned half as much)
-                          - When both negative: inverted ratio (smaller loss = better performance)
-                          - Example: Fund -1%, Benchmark -2%: 200% (fund lost half, outperformed)
-                        
-                        - **Percentage Points**: Fund return minus benchmark return in absolute terms
-                          - Example: +2.5% means fund outperformed by 2.5 percentage points
-                        
-                        - **Benchmark Performance**: Displays the benchmark's monthly returns for reference
-                          - The Benchmark row is hidden when this option is selected (redundant)
-                        
-                        **Columns:**
-                        - **Year**: The calendar year (merged cell for all rows in that year)
-                        - **Type**: Fund, Benchmark (if shown), or Comparison metric
-                        - **Jan-Dec**: Monthly returns/comparison for each month
-                        - **YTD**: Year-to-date accumulated performance
-                        - **Total**: Cumulative performance since the beginning of the fund's history
-                        
-                        **Visual Guide:**
-                        - Negative values are displayed in **red** for easy identification
-                        - Bold gold borders separate year groups and column sections
-                        - Latest year appears first (reverse chronological order)
-                        - The table can display up to 5 years of historical data
-                        """
-                        
-                        st.markdown(explanation_text)
+                render_fund_monthly_calendar(fund_returns_full, fund_returns_monthly, bench_map)
             else:
                 st.warning("⚠️ Fund time series data not available. Please upload Fund Details file.")
             
@@ -8058,141 +8832,7 @@ def main():
             st.markdown("### ⚖️ Risk-Adjusted Performance")
             
             if returns_result is not None:
-                fund_returns_filtered, fund_returns_full = returns_result
-                
-                # Frequency selection
-                st.markdown("#### Data Frequency Selection")
-                frequency_choice = st.radio(
-                    "Select frequency for Omega, Rachev, VaR and CVaR analysis:",
-                    options=['Daily', 'Weekly', 'Monthly'],
-                    horizontal=True,
-                    help="Choose whether to analyze daily, weekly, or monthly returns data"
-                )
-
-                freq_suffix = 'DAILY' if frequency_choice == 'Daily' else ('WEEKLY' if frequency_choice == 'Weekly' else 'MONTHLY')
-                freq_label = frequency_choice.lower()
-
-                # Use appropriate returns data
-                if frequency_choice == 'Daily':
-                    returns_data = fund_returns_full
-                elif frequency_choice == 'Weekly':
-                    # Convert to weekly returns
-                    returns_data = fund_returns_full.resample('W').apply(lambda x: (1 + x).prod() - 1)
-                else:
-                    # Convert to monthly returns
-                    returns_data = fund_returns_full.resample('ME').apply(lambda x: (1 + x).prod() - 1)
-                
-                st.markdown("---")
-                
-                # === OMEGA SECTION (Top Row) ===
-                st.markdown("#### Omega Ratio")
-                
-                omega_chart_col, omega_gauge_col = st.columns([2, 1])
-                
-                with omega_chart_col:
-                    # Omega CDF chart
-                    fig_omega = create_omega_cdf_chart(returns_data, threshold=0, frequency=freq_label)
-                    st.plotly_chart(fig_omega, use_container_width=True)
-                
-                with omega_gauge_col:
-                    # Omega gauge with selected frequency
-                    omega_val = fund_info.get(f'OMEGA_{freq_suffix}', np.nan)
-                    if pd.notna(omega_val) and not np.isinf(omega_val):
-                        fig_omega_gauge = create_omega_gauge(omega_val, frequency=frequency_choice)
-                        st.plotly_chart(fig_omega_gauge, use_container_width=True)
-                    else:
-                        st.metric(f"Omega Ratio ({frequency_choice})", "N/A")
-                
-                st.markdown("---")
-                
-                # === RACHEV / VAR / CVAR SECTION (Bottom Row) ===
-                st.markdown("#### Rachev Ratio & Tail Risk")
-                
-                rachev_chart_col, rachev_metrics_col = st.columns([2, 1])
-                
-                with rachev_chart_col:
-                    # Combined chart with selected frequency
-                    var_col = 'VAR_95_D' if frequency_choice == 'Daily' else ('VAR_95_W' if frequency_choice == 'Weekly' else 'VAR_95_M')
-                    cvar_col = 'CVAR_95_D' if frequency_choice == 'Daily' else ('CVAR_95_W' if frequency_choice == 'Weekly' else 'CVAR_95_M')
-                    
-                    var_val = fund_info.get(var_col, np.nan)
-                    cvar_val = fund_info.get(cvar_col, np.nan)
-                    
-                    fig_rachev = create_combined_rachev_var_chart(
-                        returns_data, var_val, cvar_val, frequency=freq_label
-                    )
-                    st.plotly_chart(fig_rachev, use_container_width=True)
-                
-                with rachev_metrics_col:
-                    # Rachev gauge with selected frequency
-                    rachev_val = fund_info.get(f'RACHEV_{freq_suffix}', np.nan)
-                    if pd.notna(rachev_val) and not np.isinf(rachev_val):
-                        fig_rachev_gauge = create_rachev_gauge(rachev_val, frequency=frequency_choice)
-                        st.plotly_chart(fig_rachev_gauge, use_container_width=True)
-                    else:
-                        st.metric(f"Rachev Ratio ({frequency_choice})", "N/A")
-                
-                # Explanation guide
-                with st.expander("📚 Understanding Omega & Rachev Ratios"):
-                    st.markdown("""
-                    ### Omega Ratio
-                    
-                    **What it measures:** Probability-weighted ratio of gains vs losses above/below a threshold (usually 0%).
-                    
-                    **Formula:** Ω = (Sum of gains above threshold) / (Sum of losses below threshold)
-                    
-                    **Interpretation:**
-                    - **Ω < 1.0**: Poor - Losses exceed gains
-                    - **Ω 1.0-1.5**: Below average
-                    - **Ω 1.5-2.0**: Average/Good
-                    - **Ω 2.0-3.0**: Very good
-                    - **Ω > 3.0**: Excellent
-                    - **Higher is better** - more gains relative to losses
-                    
-                    **Visualization:** The CDF chart shows cumulative probability. Red area (below threshold) represents losses, green area (above threshold) represents gains. The gauge shows performance quality.
-                    
-                    ---
-                    
-                    ### Rachev Ratio (5% Tails)
-                    
-                    **What it measures:** Expected loss in worst 5% scenarios vs expected gain in best 5% scenarios.
-                    
-                    **Formula:** R = E[Loss | worst 5%] / E[Gain | best 5%]
-                    
-                    **Interpretation:**
-                    - **R < 0.5**: Excellent - Very asymmetric (small losses, large gains)
-                    - **R 0.5-0.75**: Very good
-                    - **R 0.75-1.0**: Good/Average (symmetric risk)
-                    - **R 1.0-1.5**: Below average (losses exceeding gains)
-                    - **R > 1.5**: Poor - High tail risk
-                    - **Lower is better** - smaller downside relative to upside
-                    
-                    **Why 5% tails?** Captures significant tail events while maintaining statistical robustness. Focuses on the extreme 5% of returns in each tail.
-                    
-                    **Visualization:** The PDF chart highlights the 5% tails. Red shows expected loss in crashes, green shows expected gain in rallies. The gauge shows risk quality.
-                    
-                    ---
-                    
-                    ### VaR (Value at Risk) & CVaR (Conditional VaR)
-                    
-                    **VaR 95%**: The maximum loss expected 95% of the time (5% worst case threshold)
-                    
-                    **CVaR 95%**: The average loss in the worst 5% of cases (expected shortfall)
-                    
-                    Both metrics help quantify downside risk in monetary terms.
-                    
-                    ---
-                    
-                    ### Daily vs Weekly vs Monthly
-
-                    **Daily**: Most granular, captures short-term volatility and daily trading risk. Best for high-frequency trading strategies.
-
-                    **Weekly**: Balanced view that smooths out daily noise while still capturing medium-term patterns. Useful for swing trading and tactical allocation.
-
-                    **Monthly**: Focuses on longer-term performance patterns, smooths out short-term volatility. Best for strategic asset allocation.
-
-                    All three frequencies provide valuable complementary insights into fund behavior at different time scales.
-                    """)
+                render_fund_risk_adjusted_section(fund_returns_chart, fund_returns_monthly, fund_info)
             else:
                 st.info("Upload Fund Details to see risk-adjusted performance visualizations")
             
@@ -8203,15 +8843,13 @@ def main():
             # ═══════════════════════════════════════════════════════════════════
             
             if returns_result is not None:
-                fund_returns_filtered, fund_returns_full = returns_result
-                
                 st.markdown("### 📊 Sharpe Ratio Analysis")
                 
                 sharpe_chart_col, sharpe_metrics_col = st.columns([3, 1])
                 
                 with sharpe_chart_col:
                     # Rolling Sharpe chart
-                    fig_sharpe = create_rolling_sharpe_chart(fund_returns_full, window_months=12)
+                    fig_sharpe = cached_rolling_sharpe_chart(fund_returns_chart, window_months=12)
                     st.plotly_chart(fig_sharpe, use_container_width=True)
                 
                 with sharpe_metrics_col:
@@ -8237,8 +8875,6 @@ def main():
             st.markdown("### 🎯 Risk Metrics Dashboard")
             
             if returns_result is not None:
-                fund_returns_filtered, fund_returns_full = returns_result
-                
                 # Volatility section
                 st.markdown("#### Volatility Analysis")
                 
@@ -8246,7 +8882,7 @@ def main():
                 
                 with vol_chart_col:
                     # Rolling volatility chart
-                    fig_vol = create_rolling_vol_chart(fund_returns_full, window_months=12)
+                    fig_vol = cached_rolling_vol_chart(fund_returns_chart, window_months=12)
                     st.plotly_chart(fig_vol, use_container_width=True)
                 
                 with vol_metrics_col:
@@ -8272,7 +8908,7 @@ def main():
                 
                 with dd_chart_col:
                     # Underwater plot
-                    fig_underwater, max_dd_info = create_underwater_plot(fund_returns_full)
+                    fig_underwater, max_dd_info = cached_underwater_plot(fund_returns_full)
                     st.plotly_chart(fig_underwater, use_container_width=True)
                 
                 with dd_metrics_col:
@@ -8300,7 +8936,7 @@ def main():
             st.markdown("### 🌍 Benchmark Exposures")
             
             if benchmarks is not None and fund_details is not None and returns_result is not None:
-                available_benchmarks = [b for b in ['CDI', 'USDBRL', 'GOLD', 'IBOVESPA', 'SP500', 'BITCOIN'] if b in benchmarks.columns]
+                available_benchmarks = _available_benchmarks(tuple(bench_map))
                 default_exposure = []
                 if 'CDI' in available_benchmarks:
                     default_exposure.append('CDI')
@@ -8315,361 +8951,151 @@ def main():
                 )
                 
                 if selected_exposure_benches:
-                    exposure_data = []
+                    # Preallocated columns: at most two rows (last window + average) per benchmark
+                    n_rows = 2 * len(selected_exposure_benches)
+                    exp_labels = np.empty(n_rows, dtype=object)
+                    exp_kendall = np.empty(n_rows)
+                    exp_tail_lower = np.empty(n_rows)
+                    exp_tail_upper = np.empty(n_rows)
+                    exp_asymmetry = np.empty(n_rows)
+                    row = 0
                     
-                    for bench in selected_exposure_benches:
-                        # Calculate rolling copula metrics to match time series analysis
-                        with st.spinner(f'Calculating exposure for {bench}...'):
-                            copula_results = estimate_rolling_copula_for_chart(
-                                fund_returns_full,
-                                benchmarks[bench],
-                                window=250
-                            )
-                            
-                            if copula_results is not None:
-                                # Last window values (most recent)
-                                last_kendall = copula_results['kendall_tau'].iloc[-1]
-                                last_tail_lower = copula_results['tail_lower'].iloc[-1]
-                                last_tail_upper = copula_results['tail_upper'].iloc[-1]
-                                last_asymmetry = copula_results['asymmetry_index'].iloc[-1]
-                                
-                                # Average values across all windows
-                                avg_kendall = copula_results['kendall_tau'].mean()
-                                avg_tail_lower = copula_results['tail_lower'].mean()
-                                avg_tail_upper = copula_results['tail_upper'].mean()
-                                avg_asymmetry = copula_results['asymmetry_index'].mean()
-                                
-                                # Add last window row
-                                exposure_data.append({
-                                    'Benchmark': f'{bench} - Last Window',
-                                    'Kendall Tau': last_kendall,
-                                    'Tail Lower': last_tail_lower,
-                                    'Tail Upper': last_tail_upper,
-                                    'Asymmetry': last_asymmetry
-                                })
-                                
-                                # Add average row
-                                exposure_data.append({
-                                    'Benchmark': f'{bench} - Average',
-                                    'Kendall Tau': avg_kendall,
-                                    'Tail Lower': avg_tail_lower,
-                                    'Tail Upper': avg_tail_upper,
-                                    'Asymmetry': avg_asymmetry
-                                })
-                            else:
-                                # Insufficient data - use full data calculation as fallback
-                                bench_returns = benchmarks[bench].reindex(fund_returns_full.index, method='ffill').fillna(0)
-                                
-                                u = to_empirical_cdf(fund_returns_full)
-                                v = to_empirical_cdf(bench_returns)
-                                
-                                tau = stats.kendalltau(u.values, v.values)[0]
-                                
-                                theta_lower, _ = estimate_gumbel_270_parameter(u.values, v.values)
-                                lambda_lower, _ = gumbel_270_tail_dependence(theta_lower)
-                                
-                                theta_upper, _ = estimate_gumbel_180_parameter(u.values, v.values)
-                                _, lambda_upper = gumbel_180_tail_dependence(theta_upper)
-                                
-                                asymmetry = (lambda_lower - lambda_upper) / (lambda_lower + lambda_upper) if (lambda_lower + lambda_upper) > 0 else 0
-                                
-                                exposure_data.append({
-                                    'Benchmark': f'{bench} - Full Period',
-                                    'Kendall Tau': tau,
-                                    'Tail Lower': lambda_lower,
-                                    'Tail Upper': lambda_upper,
-                                    'Asymmetry': asymmetry
-                                })
+                    # Calculate rolling copula metrics to match time series analysis
+                    with st.spinner('Calculating benchmark exposures...'):
+                        copula_by_bench = estimate_rolling_copula_by_benchmark_cached(
+                            fund_copula_key,
+                            tuple((b,) + _series_content_key(bench_map[b]) for b in selected_exposure_benches),
+                            250,
+                            fund_returns_full,
+                            bench_map
+                        )
+                    
+                    # Fund ECDF and benchmarks aligned to fund dates for the full-period fallback,
+                    # shared by all benchmarks
+                    u_full = stats.rankdata(returns_result.full_arr) / (len(returns_result.full_arr) + 1)
+                    B = align_ffill(
+                        benchmarks[selected_exposure_benches].to_numpy(dtype=np.float64),
+                        benchmarks.index.as_unit('ns').asi8,
+                        returns_result.full_idx_i8
+                    )
+                    bench_idx = {c: i for i, c in enumerate(selected_exposure_benches)}
+                    
+                    # Fallback benchmarks: one numba pass over all of them, else threads
+                    fallback_benches = [b for b in selected_exposure_benches if copula_by_bench[b] is None]
+                    if NUMBA_AVAILABLE and fallback_benches:
+                        fallback_metrics = full_period_copula_numba(
+                            u_full,
+                            np.ascontiguousarray(B[:, [bench_idx[b] for b in fallback_benches]].T)
+                        )
+                        fallback_rows = {
+                            b: tuple(metric[k] for metric in fallback_metrics) for k, b in enumerate(fallback_benches)
+                        }
+                    elif len(fallback_benches) > 1:
+                        n_jobs = min(len(fallback_benches), os.cpu_count() or 1)
+                        fallback_rows = dict(joblib.Parallel(n_jobs=n_jobs, prefer='threads')(
+                            joblib.delayed(_compute_exposure_row)(b, u_full, B[:, bench_idx[b]])
+                            for b in fallback_benches
+                        ))
+                    else:
+                        fallback_rows = dict(
+                            _compute_exposure_row(b, u_full, B[:, bench_idx[b]]) for b in fallback_benches
+                        )
                     
-                    exposure_df = pd.DataFrame(exposure_data)
+                    for bench in selected_exposure_benches:
+                        copula_results = copula_by_bench[bench]
+                        
+                        if copula_results is not None:
+                            # Last window (most recent) and average across all windows
+                            last_vals, avg_vals = copula_last_and_average(copula_results)
+                            
+                            exp_labels[row] = f'{bench} - Last Window'
+                            exp_labels[row + 1] = f'{bench} - Average'
+                            exp_kendall[row:row + 2] = last_vals[0], avg_vals[0]
+                            exp_tail_lower[row:row + 2] = last_vals[1], avg_vals[1]
+                            exp_tail_upper[row:row + 2] = last_vals[2], avg_vals[2]
+                            exp_asymmetry[row:row + 2] = last_vals[3], avg_vals[3]
+                            row += 2
+                        else:
+                            # Insufficient data - use full data calculation as fallback
+                            tau, lambda_lower, lambda_upper, asymmetry = fallback_rows[bench]
+                            
+                            exp_labels[row] = f'{bench} - Full Period'
+                            exp_kendall[row] = tau
+                            exp_tail_lower[row] = lambda_lower
+                            exp_tail_upper[row] = lambda_upper
+                            exp_asymmetry[row] = asymmetry
+                            row += 1
+                    
+                    exposure_df = pd.DataFrame({
+                        'Benchmark': exp_labels[:row],
+                        'Kendall Tau': exp_kendall[:row],
+                        'Tail Lower': exp_tail_lower[:row],
+                        'Tail Upper': exp_tail_upper[:row],
+                        'Asymmetry': exp_asymmetry[:row]
+                    })
                     
                     # Color-coded gradient
-                    st.dataframe(
-                        exposure_df.style.format(
-                            {col: "{:.4f}" for col in exposure_df.columns if col != 'Benchmark'}
-                        ).background_gradient(
-                            cmap='RdYlGn',
-                            subset=[col for col in exposure_df.columns if col != 'Benchmark'],
-                            vmin=-1, vmax=1
-                        ),
-                        use_container_width=True,
-                        hide_index=True
-                    )
+                    st.markdown(style_exposure_table(exposure_df), unsafe_allow_html=True)
                     
                     with st.expander("📚 Exposure Metrics Guide"):
                         st.markdown("""
                         **Kendall Tau**: Overall correlation (-1 to +1)
                         - Positive: moves together | Zero: independent | Negative: moves opposite
                         
-                        **Tail Lower**: Crash correlation (0 to 1)
-                        - High: fund crashes together with benchmark
-                        
-                        **Tail Upper**: Boom correlation (0 to 1)
-                        - High: fund rallies together with benchmark
-                        
-                        **Asymmetry**: Crash vs Boom bias (-1 to +1)
-                        - Positive: stronger crash correlation | Negative: stronger boom correlation
-                        """)
-                else:
-                    st.info("Select at least one benchmark to view exposures")
-            else:
-                st.warning("⚠️ Benchmark data and fund details are required for exposure analysis")
-            
-            st.markdown("---")
-            
-            # ═══════════════════════════════════════════════════════════════════
-            # EXPOSURE TIME SERIES ANALYSIS FOR INDIVIDUAL FUND
-            # ═══════════════════════════════════════════════════════════════════
-            
-            st.markdown("### 📈 Fund Exposure Time Series Analysis")
-            st.info("💡 Select a benchmark below to visualize the evolution of fund exposure metrics over time")
-            
-            if benchmarks is not None and fund_details is not None and returns_result is not None:
-                # Benchmark selection for time series
-                available_ts_benchmarks = ['None'] + [b for b in ['CDI', 'USDBRL', 'GOLD', 'IBOVESPA', 'SP500', 'BITCOIN'] if b in benchmarks.columns]
-                selected_fund_ts_benchmark = st.selectbox(
-                    "Select Benchmark for Time Series:",
-                    options=available_ts_benchmarks,
-                    index=0,
-                    key="fund_ts_benchmark_selector"
-                )
-                
-                if selected_fund_ts_benchmark != 'None' and selected_fund_ts_benchmark in benchmarks.columns:
-                    with st.spinner(f'Calculating fund exposure time series for {selected_fund_ts_benchmark}...'):
-                        # Calculate rolling copula metrics for fund
-                        copula_results = estimate_rolling_copula_for_chart(
-                            fund_returns_full,
-                            benchmarks[selected_fund_ts_benchmark],
-                            window=250
-                        )
-                        
-                        if copula_results is not None:
-                            # Calculate current and average values
-                            current_kendall = copula_results['kendall_tau'].iloc[-1]
-                            avg_kendall = copula_results['kendall_tau'].mean()
-                            
-                            current_tail_lower = copula_results['tail_lower'].iloc[-1]
-                            avg_tail_lower = copula_results['tail_lower'].mean()
-                            
-                            current_tail_upper = copula_results['tail_upper'].iloc[-1]
-                            avg_tail_upper = copula_results['tail_upper'].mean()
-                            
-                            current_asymmetry = copula_results['asymmetry_index'].iloc[-1]
-                            avg_asymmetry = copula_results['asymmetry_index'].mean()
-                            
-                            # Create 2x2 grid of charts
-                            st.markdown(f"##### Fund Exposure Evolution - {selected_fund_ts_benchmark}")
-                            
-                            # Row 1: Kendall Tau and Asymmetry
-                            row1_col1, row1_col2 = st.columns(2)
-                            
-                            with row1_col1:
-                                fig_kendall = create_exposure_time_series_chart(
-                                    copula_results,
-                                    'kendall_tau',
-                                    current_kendall,
-                                    avg_kendall,
-                                    selected_fund_ts_benchmark
-                                )
-                                st.plotly_chart(fig_kendall, use_container_width=True)
-                            
-                            with row1_col2:
-                                fig_asymmetry = create_exposure_time_series_chart(
-                                    copula_results,
-                                    'asymmetry_index',
-                                    current_asymmetry,
-                                    avg_asymmetry,
-                                    selected_fund_ts_benchmark
-                                )
-                                st.plotly_chart(fig_asymmetry, use_container_width=True)
-                            
-                            # Row 2: Tail Lower and Tail Upper
-                            row2_col1, row2_col2 = st.columns(2)
-                            
-                            with row2_col1:
-                                fig_tail_lower = create_exposure_time_series_chart(
-                                    copula_results,
-                                    'tail_lower',
-                                    current_tail_lower,
-                                    avg_tail_lower,
-                                    selected_fund_ts_benchmark
-                                )
-                                st.plotly_chart(fig_tail_lower, use_container_width=True)
-                            
-                            with row2_col2:
-                                fig_tail_upper = create_exposure_time_series_chart(
-                                    copula_results,
-                                    'tail_upper',
-                                    current_tail_upper,
-                                    avg_tail_upper,
-                                    selected_fund_ts_benchmark
-                                )
-                                st.plotly_chart(fig_tail_upper, use_container_width=True)
-                            
-                            # Summary metrics below charts
-                            st.markdown("##### Summary Statistics")
-                            metric_col1, metric_col2, metric_col3, metric_col4 = st.columns(4)
-                            
-                            with metric_col1:
-                                st.metric(
-                                    "Kendall Tau",
-                                    f"{current_kendall:.4f}",
-                                    delta=f"Avg: {avg_kendall:.4f}",
-                                    help="Overall correlation between fund and benchmark"
-                                )
-                            
-                            with metric_col2:
-                                st.metric(
-                                    "Tail Lower",
-                                    f"{current_tail_lower:.4f}",
-                                    delta=f"Avg: {avg_tail_lower:.4f}",
-                                    help="Crash correlation strength"
-                                )
-                            
-                            with metric_col3:
-                                st.metric(
-                                    "Tail Upper",
-                                    f"{current_tail_upper:.4f}",
-                                    delta=f"Avg: {avg_tail_upper:.4f}",
-                                    help="Boom correlation strength"
-                                )
-                            
-                            with metric_col4:
-                                st.metric(
-                                    "Asymmetry",
-                                    f"{current_asymmetry:.4f}",
-                                    delta=f"Avg: {avg_asymmetry:.4f}",
-                                    help="Crash vs boom bias"
-                                )
-                        else:
-                            st.warning("Insufficient data for time series analysis (need at least 275 observations)")
-            else:
-                st.warning("⚠️ Benchmark data and fund details are required for time series exposure analysis")
-            
-                # ═══════════════════════════════════════════════════════════════
-                # EXPOSURE TIME SERIES CHARTS (NEW SECTION)
-                # ═══════════════════════════════════════════════════════════════
-                
-                st.markdown("---")
-                st.markdown("#### 📈 Exposure Time Series Analysis")
-                st.info("💡 Select a benchmark below to visualize the evolution of exposure metrics over time")
-                
-                # Benchmark selection for time series
-                selected_ts_benchmark = st.selectbox(
-                    "Select Benchmark for Time Series:",
-                    options=['None'] + available_benchmarks,
-                    index=0,
-                    key="ts_benchmark_selector"
-                )
-                
-                if selected_ts_benchmark != 'None' and selected_ts_benchmark in benchmarks.columns:
-                    # Check if we have fund returns
-                    if returns_result is not None:
-                        fund_returns_filtered, fund_returns_full = returns_result
-                        
-                        with st.spinner(f'Calculating exposure time series for {selected_ts_benchmark}...'):
-                            # Calculate rolling copula metrics
-                            copula_results = estimate_rolling_copula_for_chart(
-                                fund_returns_full,
-                                benchmarks[selected_ts_benchmark],
-                                window=250
-                            )
-                            
-                            if copula_results is not None:
-                                # Get last and average values from fund_info
-                                last_kendall = fund_info.get(f'KENDALL_TAU_{selected_ts_benchmark}', np.nan)
-                                avg_kendall = fund_info.get(f'KENDALL_TAU_AVG_{selected_ts_benchmark}', np.nan)
-                                
-                                last_tail_lower = fund_info.get(f'TAIL_LOWER_{selected_ts_benchmark}', np.nan)
-                                avg_tail_lower = fund_info.get(f'TAIL_LOWER_AVG_{selected_ts_benchmark}', np.nan)
-                                
-                                last_tail_upper = fund_info.get(f'TAIL_UPPER_{selected_ts_benchmark}', np.nan)
-                                avg_tail_upper = fund_info.get(f'TAIL_UPPER_AVG_{selected_ts_benchmark}', np.nan)
-                                
-                                last_asymmetry = fund_info.get(f'ASYMMETRY_{selected_ts_benchmark}', np.nan)
-                                avg_asymmetry = fund_info.get(f'ASYMMETRY_AVG_{selected_ts_benchmark}', np.nan)
-                                
-                                # Create 2x2 grid of charts
-                                st.markdown(f"##### Exposure Evolution - {selected_ts_benchmark}")
-                                
-                                # Row 1: Kendall Tau and Asymmetry
-                                row1_col1, row1_col2 = st.columns(2)
-                                
-                                with row1_col1:
-                                    fig_kendall = create_exposure_time_series_chart(
-                                        copula_results,
-                                        'kendall_tau',
-                                        last_kendall,
-                                        avg_kendall,
-                                        selected_ts_benchmark
-                                    )
-                                    st.plotly_chart(fig_kendall, use_container_width=True)
-                                
-                                with row1_col2:
-                                    fig_asymmetry = create_exposure_time_series_chart(
-                                        copula_results,
-                                        'asymmetry_index',
-                                        last_asymmetry,
-                                        avg_asymmetry,
-                                        selected_ts_benchmark
-                                    )
-                                    st.plotly_chart(fig_asymmetry, use_container_width=True)
-                                
-                                # Row 2: Lower Tail and Upper Tail
-                                row2_col1, row2_col2 = st.columns(2)
-                                
-                                with row2_col1:
-                                    fig_tail_lower = create_exposure_time_series_chart(
-                                        copula_results,
-                                        'tail_lower',
-                                        last_tail_lower,
-                                        avg_tail_lower,
-                                        selected_ts_benchmark
-                                    )
-                                    st.plotly_chart(fig_tail_lower, use_container_width=True)
-                                
-                                with row2_col2:
-                                    fig_tail_upper = create_exposure_time_series_chart(
-                                        copula_results,
-                                        'tail_upper',
-                                        last_tail_upper,
-                                        avg_tail_upper,
-                                        selected_ts_benchmark
-                                    )
-                                    st.plotly_chart(fig_tail_upper, use_container_width=True)
-                                
-                                # Summary metrics
-                                st.markdown("##### Summary Statistics")
-                                summary_col1, summary_col2, summary_col3, summary_col4 = st.columns(4)
-                                
-                                with summary_col1:
-                                    st.metric(
-                                        "Kendall Tau (Last)",
-                                        f"{last_kendall:.4f}" if pd.notna(last_kendall) else "N/A",
-                                        delta=f"{(last_kendall - avg_kendall):.4f}" if pd.notna(last_kendall) and pd.notna(avg_kendall) else None
-                                    )
-                                
-                                with summary_col2:
-                                    st.metric(
-                                        "Lower Tail (Last)",
-                                        f"{last_tail_lower:.4f}" if pd.notna(last_tail_lower) else "N/A",
-                                        delta=f"{(last_tail_lower - avg_tail_lower):.4f}" if pd.notna(last_tail_lower) and pd.notna(avg_tail_lower) else None
-                                    )
-                                
-                                with summary_col3:
-                                    st.metric(
-                                        "Upper Tail (Last)",
-                                        f"{last_tail_upper:.4f}" if pd.notna(last_tail_upper) else "N/A",
-                                        delta=f"{(last_tail_upper - avg_tail_upper):.4f}" if pd.notna(last_tail_upper) and pd.notna(avg_tail_upper) else None
-                                    )
-                                
-                                with summary_col4:
-                                    st.metric(
-                                        "Asymmetry (Last)",
-                                        f"{last_asymmetry:.4f}" if pd.notna(last_asymmetry) else "N/A",
-                                        delta=f"{(last_asymmetry - avg_asymmetry):.4f}" if pd.notna(last_asymmetry) and pd.notna(avg_asymmetry) else None
-                                    )
-                                
+                        **Tail Lower**: Crash correlation (0 to 1)
+                        - High: fund crashes together with benchmark
+                        
+                        **Tail Upper**: Boom correlation (0 to 1)
+                        - High: fund rallies together with benchmark
+                        
+                        **Asymmetry**: Crash vs Boom bias (-1 to +1)
+                        - Positive: stronger crash correlation | Negative: stronger boom correlation
+                        """)
+                else:
+                    st.info("Select at least one benchmark to view exposures")
+            else:
+                st.warning("⚠️ Benchmark data and fund details are required for exposure analysis")
+            
+            st.markdown("---")
+            
+            # ═══════════════════════════════════════════════════════════════════
+            # EXPOSURE TIME SERIES ANALYSIS FOR INDIVIDUAL FUND
+            # ═══════════════════════════════════════════════════════════════════
+            
+            st.markdown("### 📈 Fund Exposure Time Series Analysis")
+            st.info("💡 Select a benchmark below to visualize the evolution of fund exposure metrics over time")
+            
+            if benchmarks is not None and fund_details is not None and returns_result is not None:
+                render_fund_exposure_timeseries(fund_copula_key, fund_returns_full, bench_map)
+            else:
+                st.warning("⚠️ Benchmark data and fund details are required for time series exposure analysis")
+            
+                # ═══════════════════════════════════════════════════════════════
+                # EXPOSURE TIME SERIES CHARTS (NEW SECTION)
+                # ═══════════════════════════════════════════════════════════════
+                
+                st.markdown("---")
+                st.markdown("#### 📈 Exposure Time Series Analysis")
+                st.info("💡 Select a benchmark below to visualize the evolution of exposure metrics over time")
+                
+                # Benchmark selection for time series
+                selected_ts_benchmark = st.selectbox(
+                    "Select Benchmark for Time Series:",
+                    options=('None',) + available_benchmarks,
+                    index=0,
+                    key="ts_benchmark_selector"
+                )
+                
+                if selected_ts_benchmark != 'None' and selected_ts_benchmark in bench_map:
+                    # Check if we have fund returns
+                    if returns_result is not None:
+                        with st.spinner(f'Calculating exposure time series for {selected_ts_benchmark}...'):
+                            rendered = _render_exposure_timeseries(
+                                fund_copula_key, fund_returns_full, bench_map, selected_ts_benchmark,
+                                fund_info=fund_info, title='Exposure Evolution'
+                            )
+                            
+                            if rendered:
                                 # Interpretation guide
                                 with st.expander("📖 How to Read These Charts"):
                                     st.markdown("""
@@ -8749,32 +9175,13 @@ def main():
         
         st.markdown("#### 📊 Select Columns to Display")
         
-        # Define column categories for easier selection
-        basic_info_cols = ['FUNDO DE INVESTIMENTO', 'CNPJ', 'GESTOR', 'CATEGORIA BTG', 
-                          'SUBCATEGORIA BTG', 'STATUS', 'VL_PATRIM_LIQ', 'NR_COTST', 'TRIBUTAÇÃO', 'LIQUIDEZ', 'SUITABILITY']
-        # Filter to only existing columns
-        basic_info_cols = [col for col in basic_info_cols if col in fund_metrics.columns]
-        
-        return_cols = [col for col in fund_metrics.columns if 'RETURN' in col] + \
-                      [col for col in fund_metrics.columns if 'EXCESS' in col]
-        
-        risk_cols = ['VOL_12M', 'VOL_24M', 'VOL_36M', 'VOL_TOTAL', 
-                    'SHARPE_12M', 'SHARPE_24M', 'SHARPE_36M', 'SHARPE_TOTAL',
-                    'MDD', 'CDAR_95', 'MDD_DAYS']
-        # Filter to only existing columns
-        risk_cols = [col for col in risk_cols if col in fund_metrics.columns]
-        
-        advanced_cols = ['OMEGA_DAILY', 'OMEGA_MONTHLY', 'OMEGA_WEEKLY', 'RACHEV_DAILY', 'RACHEV_MONTHLY', 'RACHEV_WEEKLY',
-                        'VAR_95_D', 'VAR_95_M', 'CVAR_95_D', 'CVAR_95_M']
-        # Filter to only existing columns
-        advanced_cols = [col for col in advanced_cols if col in fund_metrics.columns]
-        
-        exposure_cols = [col for col in fund_metrics.columns if any(x in col for x in 
-                        ['KENDALL_TAU', 'TAIL_LOWER', 'TAIL_UPPER', 'ASYMMETRY'])]
-        
-        monthly_cols = ['M_ABOVE_0', 'M_ABOVE_BCHMK', 'BEST_MONTH', 'WORST_MONTH']
-        # Filter to only existing columns
-        monthly_cols = [col for col in monthly_cols if col in fund_metrics.columns]
+        # Define column categories for easier selection (only existing columns)
+        column_categories = _categorize_columns(tuple(fund_metrics.columns))
+        basic_info_cols = column_categories['basic']
+        return_cols = column_categories['return']
+        risk_cols = column_categories['risk']
+        advanced_cols = column_categories['advanced']
+        exposure_cols = column_categories['exposure']
         
         # Set safe defaults
         default_basic = [col for col in ['FUNDO DE INVESTIMENTO', 'CATEGORIA BTG', 'SUBCATEGORIA BTG', 'STATUS','VL_PATRIM_LIQ', 'NR_COTST'] if col in basic_info_cols]
@@ -8853,26 +9260,14 @@ def main():
         
         # Clean Liquidez column if present - extract numeric days from D+N format
         if 'LIQUIDEZ' in display_df.columns:
-            def extract_liquidez_days(liquidez_str):
-                """Extract numeric days from D+N format"""
-                if pd.isna(liquidez_str) or liquidez_str == 'N/A' or liquidez_str == 'n/a':
-                    return np.nan
-                try:
-                    # Convert to string and clean
-                    liquidez_str = str(liquidez_str).strip().upper()
-                    # Extract number after D+ or D +
-                    if 'D+' in liquidez_str or 'D +' in liquidez_str:
-                        # Remove D+ or D + prefix and extract number
-                        num_str = liquidez_str.replace('D+', '').replace('D +', '').strip()
-                        return float(num_str)
-                    else:
-                        # Try to convert directly to float
-                        return float(liquidez_str)
-                except:
-                    return np.nan
-            
-            # Create numeric version of Liquidez
-            display_df['LIQUIDEZ_DAYS'] = display_df['LIQUIDEZ'].apply(extract_liquidez_days)
+            # Create numeric version of Liquidez (vectorized): strip D+ / D + prefix, then parse
+            liquidez = display_df['LIQUIDEZ'].astype(str).str.strip().str.upper()
+            has_prefix = liquidez.str.contains('D+', regex=False) | liquidez.str.contains('D +', regex=False)
+            days_str = liquidez.where(
+                ~has_prefix,
+                liquidez.str.replace('D+', '', regex=False).str.replace('D +', '', regex=False).str.strip()
+            )
+            display_df['LIQUIDEZ_DAYS'] = pd.to_numeric(days_str, errors='coerce').astype(float)
             
             # If Liquidez was selected, add the numeric version to the dataframe
             # and update column lists
@@ -8891,23 +9286,22 @@ def main():
         with st.expander("📈 Numerical Filters (Min/Max Ranges)", expanded=True):
             if numerical_cols:
                 filter_cols = st.columns(3)
+                # Min/max of every numerical column in one pass (NaNs skipped)
+                col_stats = display_df[numerical_cols].agg(['min', 'max'])
                 
                 for idx, col in enumerate(numerical_cols):
                     with filter_cols[idx % 3]:
                         # Get min/max values
-                        col_data = display_df[col].dropna()
-                        if len(col_data) > 0:
-                            global_min = float(col_data.min())
-                            global_max = float(col_data.max())
+                        global_min = float(col_stats.at['min', col])
+                        global_max = float(col_stats.at['max', col])
+                        if not (np.isnan(global_min) and np.isnan(global_max)):
                             
-                            # Centered column name
-                            st.markdown(f"<h6 style='text-align: center; color: #D4AF37'>{col}</h6>", unsafe_allow_html=True)
+                            # Centered column name with Min/Max labels
+                            st.markdown(RANGE_FILTER_HEADER.format(col=col), unsafe_allow_html=True)
                             
-                            # Text inputs for min/max with centered labels
                             num_col1, num_col2 = st.columns(2)
                             
                             with num_col1:
-                                st.markdown("<p style='text-align: center; margin-bottom: -10px;'>Min</p>", unsafe_allow_html=True)
                                 min_val = st.number_input(
                                     f"Min_{col}",
                                     min_value=global_min,
@@ -8918,7 +9312,6 @@ def main():
                                 )
                             
                             with num_col2:
-                                st.markdown("<p style='text-align: center; margin-bottom: -10px;'>Max</p>", unsafe_allow_html=True)
                                 max_val = st.number_input(
                                     f"Max_{col}",
                                     min_value=global_min,
@@ -8942,9 +9335,8 @@ def main():
                 st.info("No numerical columns selected")
 
         # Apply numerical filters to get intermediate filtered dataframe
-        num_filtered_df = display_df.copy()
-        for col, (min_val, max_val) in active_filters.items():
-            num_filtered_df = num_filtered_df[(num_filtered_df[col] >= min_val) & (num_filtered_df[col] <= max_val)]
+        mask = range_filter_mask(display_df, active_filters)
+        num_filtered_df = display_df if mask.all() else display_df[mask]
 
         # Now apply categorical filters with options from numerically filtered data
         categorical_filters = {}
@@ -8967,7 +9359,8 @@ def main():
                                 label_visibility="collapsed"
                             )
                             
-                            if selected_vals != unique_vals:
+                            # Order-insensitive: re-selecting every option is not a filter
+                            if len(selected_vals) != len(unique_vals) or set(selected_vals) != set(unique_vals):
                                 categorical_filters[col] = selected_vals
                         else:
                             st.markdown(f"<h6 style='text-align: center; color: #D4AF37'>{col}</h6>", unsafe_allow_html=True)
@@ -8975,12 +9368,9 @@ def main():
             else:
                 st.info("No categorical columns selected")
 
-        # Apply all filters
-        filtered_df = num_filtered_df.copy()
-
-        # Apply categorical filters
-        for col, values in categorical_filters.items():
-            filtered_df = filtered_df[filtered_df[col].isin(values)]
+        # Apply categorical filters on top of the numerical mask
+        apply_category_filters(mask, display_df, categorical_filters)
+        filtered_df = display_df if mask.all() else display_df[mask]
 
         st.markdown("---")
         
@@ -8991,39 +9381,42 @@ def main():
         st.markdown(f"#### 📈 Results: {len(filtered_df)} funds match your criteria")
         
         if len(filtered_df) > 0:
-            # Format numerical columns for better display
-            display_filtered = filtered_df.copy()
+            # Column display formats; the data itself stays numeric so sorting still works
+            display_formats = {}
             
             # Format return columns as percentages
-            for col in display_filtered.columns:
-                if 'RETURN' in col or 'VOL' in col or 'SHARPE' in col or 'MDD' in col or \
-                   'OMEGA' in col or 'RACHEV' in col or 'VAR' in col or 'CVAR' in col or \
-                   'KENDALL' in col or 'TAIL' in col or 'ASYMMETRY' in col or 'CDAR' in col or\
-                   'M_ABOVE' in col or 'BEST_MONTH' in col or 'WORST_MONTH' in col or \
-                   'EXCESS' in col:
-                    if display_filtered[col].dtype in [np.float64, np.float32]:
-                        # Check if values are in decimal format (0.xx) or already percentage (xx.xx)
-                        sample_val = display_filtered[col].dropna().iloc[0] if len(display_filtered[col].dropna()) > 0 else 0
-                        if abs(sample_val) < 10:  # Likely decimal format
-                            if 'SHARPE' not in col and 'OMEGA' not in col and 'RACHEV' not in col and 'KENDALL' not in col and 'ASYMMETRY' not in col:
-                                display_filtered[col] = display_filtered[col].apply(lambda x: f"{x*100:.2f}%" if pd.notna(x) else "N/A")
-                            else:
-                                display_filtered[col] = display_filtered[col].apply(lambda x: f"{x:.2f}" if pd.notna(x) else "N/A")
+            pct_cols, ratio_cols = _classify_metric_columns(tuple(filtered_df.columns))
+            float_cols = [col for col in pct_cols if filtered_df[col].dtype in [np.float64, np.float32]]
+            if float_cols:
+                # Check if values are in decimal format (0.xx) or already percentage (xx.xx),
+                # probing the first non-null value of every column in one pass over the block
+                block = filtered_df[float_cols].to_numpy(dtype=np.float64)
+                valid = ~np.isnan(block)
+                first_vals = block[valid.argmax(axis=0), np.arange(block.shape[1])]
+                sample_vals = np.where(valid.any(axis=0), first_vals, 0.0)
+                for col, sample_val in zip(float_cols, sample_vals):
+                    if abs(sample_val) < 10:  # Likely decimal format
+                        display_formats[col] = "%.2f" if col in ratio_cols else "percent"
             
             # Format AUM
-            if 'VL_PATRIM_LIQ' in display_filtered.columns:
-                display_filtered['VL_PATRIM_LIQ'] = display_filtered['VL_PATRIM_LIQ'].apply(
-                    lambda x: f"R$ {x:,.2f}" if pd.notna(x) else "N/A"
-                )
+            if 'VL_PATRIM_LIQ' in filtered_df.columns:
+                display_formats['VL_PATRIM_LIQ'] = "R$ %,.2f"
             
             # Format shareholders
-            if 'NR_COTST' in display_filtered.columns:
-                display_filtered['NR_COTST'] = display_filtered['NR_COTST'].apply(
-                    lambda x: f"{int(x):,}" if pd.notna(x) else "N/A"
-                )
+            if 'NR_COTST' in filtered_df.columns:
+                display_formats['NR_COTST'] = "%,d"
             
-            # Display the dataframe
-            st.dataframe(display_filtered, use_container_width=True, height=600)
+            # Display the dataframe. Formatting goes through column_config rather than a
+            # Styler, which stringifies every cell and is refused above 262144 cells.
+            st.dataframe(
+                filtered_df,
+                column_config={
+                    col: st.column_config.NumberColumn(format=fmt)
+                    for col, fmt in display_formats.items()
+                },
+                use_container_width=True,
+                height=600
+            )
             
             # Export option
             st.markdown("---")
@@ -9032,7 +9425,7 @@ def main():
             export_col1, export_col2 = st.columns(2)
             
             with export_col1:
-                csv = filtered_df.to_csv(index=False).encode('utf-8')
+                csv = dataframe_csv_bytes(filtered_df)
                 st.download_button(
                     label="📥 Download as CSV",
                     data=csv,
@@ -9052,11 +9445,10 @@ def main():
                         funds_to_export = filtered_df['FUNDO DE INVESTIMENTO'].tolist()
                         
                         # Add to portfolio construction list (merge, not replace)
-                        new_funds = 0
-                        for fund in funds_to_export:
-                            if fund not in st.session_state['selected_portfolio_funds']:
-                                st.session_state['selected_portfolio_funds'].append(fund)
-                                new_funds += 1
+                        existing = set(st.session_state['selected_portfolio_funds'])
+                        new_funds_list = [f for f in dict.fromkeys(funds_to_export) if f not in existing]
+                        st.session_state['selected_portfolio_funds'].extend(new_funds_list)
+                        new_funds = len(new_funds_list)
                         
                         st.success(f"✅ Exported {new_funds} new funds to Portfolio Construction (Total: {len(st.session_state['selected_portfolio_funds'])} funds)")
                         st.info("💡 Navigate to the 'Portfolio Construction' tab to see your selection")
@@ -9067,8 +9459,7 @@ def main():
             with st.expander("📊 Summary Statistics"):
                 st.markdown("**Numerical Columns Summary**")
                 if numerical_cols:
-                    summary_stats = filtered_df[numerical_cols].describe().T
-                    summary_stats = summary_stats[['mean', 'std', 'min', '25%', '50%', '75%', 'max']]
+                    summary_stats = summary_statistics(filtered_df[numerical_cols])
                     st.dataframe(summary_stats.style.format("{:.4f}"), use_container_width=True)
         else:
             st.warning("⚠️ No funds match your filter criteria. Try adjusting the filters.")
@@ -9112,10 +9503,7 @@ def main():
             template_df = pd.DataFrame({
                 'Fund Name': ['Fund Name 1', 'Fund Name 2', 'Fund Name 3']
             })
-            buffer = io.BytesIO()
-            with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
-                template_df.to_excel(writer, index=False)
-            buffer.seek(0)
+            buffer = excel_template_bytes(template_df)
             
             tc1, tc2 = st.columns([1, 2])
             with tc1:
@@ -9135,14 +9523,14 @@ def main():
                 try:
                     uploaded_df = pd.read_excel(uploaded_funds)
                     if 'Fund Name' in uploaded_df.columns:
-                        available_funds = fund_metrics['FUNDO DE INVESTIMENTO'].tolist()
+                        available_funds = set(fund_metrics['FUNDO DE INVESTIMENTO'].tolist())
+                        existing = set(st.session_state['selected_portfolio_funds'])
                         valid_funds = []
                         invalid_funds = []
                         
-                        for _, row in uploaded_df.iterrows():
-                            fund_name = row['Fund Name']
+                        for fund_name in uploaded_df['Fund Name'].to_numpy():
                             if fund_name in available_funds:
-                                if fund_name not in st.session_state['selected_portfolio_funds']:
+                                if fund_name not in existing:
                                     valid_funds.append(fund_name)
                             else:
                                 invalid_funds.append(fund_name)
@@ -9166,9 +9554,10 @@ def main():
             with col1:
                 # Fund selector
                 available_funds = fund_metrics['FUNDO DE INVESTIMENTO'].tolist()
+                selected_set = set(st.session_state['selected_portfolio_funds'])
                 selected_fund = st.selectbox(
                     "Choose a fund to add:",
-                    options=[f for f in available_funds if f not in st.session_state['selected_portfolio_funds']],
+                    options=[f for f in available_funds if f not in selected_set],
                     key="fund_selector_portfolio"
                 )
             
@@ -9188,10 +9577,10 @@ def main():
             display_df = selected_df[['FUNDO DE INVESTIMENTO', 'CATEGORIA BTG', 'SUBCATEGORIA BTG', 'STATUS']].copy()
             
             # Add remove buttons
-            for idx, row in display_df.iterrows():
-                fund_name = row['FUNDO DE INVESTIMENTO']
-                status = row.get('STATUS', 'N/A')
-                
+            for fund_name, category, subcategory, status in zip(
+                display_df['FUNDO DE INVESTIMENTO'].to_numpy(), display_df['CATEGORIA BTG'].to_numpy(),
+                display_df['SUBCATEGORIA BTG'].to_numpy(), display_df['STATUS'].to_numpy()
+            ):
                 col1, col2, col3, col4, col5 = st.columns([3, 2, 2, 1, 1])
                 
                 with col1:
@@ -9201,9 +9590,9 @@ def main():
                     else:
                         st.text(fund_name)
                 with col2:
-                    st.text(row['CATEGORIA BTG'])
+                    st.text(category)
                 with col3:
-                    st.text(row['SUBCATEGORIA BTG'])
+                    st.text(subcategory)
                 with col4:
                     # Display status with color
                     if status == 'Fechado':
@@ -9388,17 +9777,16 @@ def main():
                 # Get unique funds in selection
                 if st.session_state['selected_portfolio_funds']:
                     # Create editable dataframe
-                    individual_fund_data = []
-                    for fund in st.session_state['selected_portfolio_funds']:
-                        existing = st.session_state['individual_fund_constraints'].get(fund, {})
-                        individual_fund_data.append({
-                            'Fund': fund,
-                            'Min Weight (%)': existing.get('min', min_weight_global * 100),
-                            'Max Weight (%)': existing.get('max', max_weight_global * 100),
-                            'Active': fund in st.session_state['individual_fund_constraints']
-                        })
-                    
-                    individual_fund_df = pd.DataFrame(individual_fund_data)
+                    funds = st.session_state['selected_portfolio_funds']
+                    cons = st.session_state['individual_fund_constraints']
+                    individual_fund_df = pd.DataFrame({
+                        'Fund': funds,
+                        'Min Weight (%)': np.fromiter((cons.get(f, {}).get('min', min_weight_global * 100) for f in funds),
+                                                      dtype=np.float64, count=len(funds)),
+                        'Max Weight (%)': np.fromiter((cons.get(f, {}).get('max', max_weight_global * 100) for f in funds),
+                                                      dtype=np.float64, count=len(funds)),
+                        'Active': np.fromiter((f in cons for f in funds), dtype=bool, count=len(funds))
+                    })
                     
                     st.markdown("**Edit Individual Fund Constraints:**")
                     st.caption("💡 Check 'Active' to override global constraints for a specific fund")
@@ -9430,13 +9818,13 @@ def main():
                     )
                     
                     # Update session state
-                    st.session_state['individual_fund_constraints'] = {}
-                    for _, row in edited_fund_df.iterrows():
-                        if row['Active']:
-                            st.session_state['individual_fund_constraints'][row['Fund']] = {
-                                'min': row['Min Weight (%)'],
-                                'max': row['Max Weight (%)']
-                            }
+                    active_rows = edited_fund_df[edited_fund_df['Active'].astype(bool).to_numpy()]
+                    st.session_state['individual_fund_constraints'] = {
+                        name: {'min': lo, 'max': hi}
+                        for name, lo, hi in zip(active_rows['Fund'].to_numpy(),
+                                                active_rows['Min Weight (%)'].to_numpy(dtype=np.float64).tolist(),
+                                                active_rows['Max Weight (%)'].to_numpy(dtype=np.float64).tolist())
+                    }
                     
                     # Show summary
                     active_count = len(st.session_state['individual_fund_constraints'])
@@ -9478,20 +9866,22 @@ def main():
                     unique_categories = selected_df['CATEGORIA BTG'].unique().tolist()
                     
                     # Create editable dataframe
-                    individual_cat_data = []
-                    for category in sorted(unique_categories):
-                        existing = st.session_state['individual_category_constraints'].get(category, {})
-                        individual_cat_data.append({
-                            'Category': category,
-                            'Min Weight (%)': existing.get('min', 0.0),
-                            'Max Weight (%)': existing.get('max', max_per_category_global * 100 if max_per_category_global else 100.0),
-                            'Active': category in st.session_state['individual_category_constraints']
-                        })
-                    
-                    individual_cat_df = pd.DataFrame(individual_cat_data)
+                    categories = sorted(unique_categories)
+                    cons = st.session_state['individual_category_constraints']
+                    default_max = max_per_category_global * 100 if max_per_category_global else 100.0
+                    individual_cat_df = pd.DataFrame({
+                        'Category': categories,
+                        'Min Weight (%)': np.fromiter((cons.get(c, {}).get('min', 0.0) for c in categories),
+                                                      dtype=np.float64, count=len(categories)),
+                        'Max Weight (%)': np.fromiter((cons.get(c, {}).get('max', default_max) for c in categories),
+                                                      dtype=np.float64, count=len(categories)),
+                        'Active': np.fromiter((c in cons for c in categories), dtype=bool, count=len(categories))
+                    })
                     
                     st.markdown("**Edit Individual Category Constraints:**")
                     st.caption("💡 Check 'Active' to override global constraints for a specific category")
+                    individual_cat_df = constraint_editor_rows(individual_cat_df, 'Category', "Categories",
+                                                               key="individual_category_picker")
                     
                     # Display editable table
                     edited_cat_df = st.data_editor(
@@ -9520,13 +9910,13 @@ def main():
                     )
                     
                     # Update session state
-                    st.session_state['individual_category_constraints'] = {}
-                    for _, row in edited_cat_df.iterrows():
-                        if row['Active']:
-                            st.session_state['individual_category_constraints'][row['Category']] = {
-                                'min': row['Min Weight (%)'],
-                                'max': row['Max Weight (%)']
-                            }
+                    active_rows = edited_cat_df[edited_cat_df['Active'].astype(bool).to_numpy()]
+                    st.session_state['individual_category_constraints'] = {
+                        name: {'min': lo, 'max': hi}
+                        for name, lo, hi in zip(active_rows['Category'].to_numpy(),
+                                                active_rows['Min Weight (%)'].to_numpy(dtype=np.float64).tolist(),
+                                                active_rows['Max Weight (%)'].to_numpy(dtype=np.float64).tolist())
+                    }
                     
                     # Show summary
                     active_cat_count = len(st.session_state['individual_category_constraints'])
@@ -9546,27 +9936,19 @@ def main():
         if st.button("🚀 RUN PORTFOLIO OPTIMIZATION", use_container_width=True, type="primary"):
             
             with st.spinner("Preparing data..."):
-                # Get CNPJs for selected funds
-                selected_cnpjs = []
-                for fund_name in st.session_state['selected_portfolio_funds']:
-                    cnpj = fund_metrics[fund_metrics['FUNDO DE INVESTIMENTO'] == fund_name]['CNPJ'].iloc[0]
-                    selected_cnpjs.append(standardize_cnpj(cnpj))
-                
-                # Get returns for all selected funds
-                fund_returns_dict = {}
-                valid_funds = []
-                fund_start_dates = {}
-                
-                for cnpj, fund_name in zip(selected_cnpjs, st.session_state['selected_portfolio_funds']):
-                    returns_result = get_fund_returns(fund_details, cnpj, period_months=None)
-                    if returns_result is not None:
-                        _, full_returns = returns_result
-                        if len(full_returns) >= min_history_days:
-                            fund_returns_dict[fund_name] = full_returns
-                            valid_funds.append(fund_name)
-                            fund_start_dates[fund_name] = full_returns.first_valid_index()
-                        else:
-                            st.warning(f"⚠️ Excluding {fund_name}: Insufficient history ({len(full_returns)} days < {min_history_days})")
+                # Returns, alignment and metadata are cached per selection: a repeated run
+                # only pays for the optimizer itself
+                all_returns_df, fund_start_dates, excluded_funds, fund_categories, fund_subcategories = prepare_optimizer_inputs(
+                    tuple(st.session_state['selected_portfolio_funds']),
+                    min_history_days,
+                    fund_metrics,
+                    _series_content_key(fund_details),
+                    fund_details
+                )
+                valid_funds = list(fund_start_dates)
+                
+                for fund_name, n_days in excluded_funds:
+                    st.warning(f"⚠️ Excluding {fund_name}: Insufficient history ({n_days} days < {min_history_days})")
                 
                 if len(valid_funds) < 3:
                     st.error("❌ Insufficient valid funds after history filtering. Please select more funds or reduce minimum history requirement.")
@@ -9574,19 +9956,12 @@ def main():
                 
                 st.success(f"✅ {len(valid_funds)} funds meet individual minimum history requirement")
                 
-                # Align all returns to common date range
-                all_returns_df = pd.DataFrame(fund_returns_dict)
-                
                 # Find youngest fund (latest start date)
                 youngest_start = max(fund_start_dates.values())
                 
                 # Show alignment info
                 st.info(f"📅 Youngest fund starts: {youngest_start.date()}")
                 
-                # Trim to common period
-                all_returns_df = all_returns_df.loc[youngest_start:]
-                all_returns_df = all_returns_df.fillna(0)
-                
                 # FIXED: Check if aligned period meets minimum requirement
                 aligned_length = len(all_returns_df)
                 
@@ -9612,28 +9987,13 @@ def main():
                 st.success(f"✅ Aligned period: {aligned_length} days (meets {min_history_days} requirement)")
                 
                 # Get CDI benchmark for aligned period
-                cdi_returns = benchmarks['CDI'].reindex(all_returns_df.index, method='ffill').fillna(0)
+                cdi_returns = aligned_benchmark(benchmarks['CDI'], all_returns_df.index)
                 
                 st.success(f"✅ Data prepared: {len(all_returns_df)} days, {all_returns_df.shape[1]} funds")
             
             # Run DRO Optimization
             st.markdown("---")
             st.markdown("### 🎯 Running Wasserstein DRO Optimization")
-
-            # In fund_analytics_app_v2.py, in the optimization section:
-
-            # Build fund_categories dictionary
-            fund_categories = {}
-            for fund_name in all_returns_df.columns:
-                fund_row = fund_metrics[fund_metrics['FUNDO DE INVESTIMENTO'] == fund_name]
-                if len(fund_row) > 0:
-                    fund_categories[fund_name] = fund_row['CATEGORIA BTG'].iloc[0]
-
-            fund_subcategories = {}
-            for fund_name in all_returns_df.columns:
-                fund_row = fund_metrics[fund_metrics['FUNDO DE INVESTIMENTO'] == fund_name]
-                if len(fund_row) > 0:
-                    fund_subcategories[fund_name] = fund_row['SUBCATEGORIA BTG'].iloc[0]
             
             try:
                 # Initialize DRO optimizer with V2 configuration
@@ -9736,22 +10096,6 @@ def main():
                     with st.expander("📋 Optimization Log"):
                         for log_entry in result.optimization_log:
                             st.text(log_entry)
-
-                    metrics = result['metrics']
-                    metric_col1, metric_col2, metric_col3, metric_col4 = st.columns(4)
-                    
-                    with metric_col4:
-                        sharpe = (metrics['annual_return'] / metrics['annual_volatility']) if metrics['annual_volatility'] > 0 else 0
-                        st.metric("Sharpe Ratio", f"{sharpe:.2f}")
-                        st.metric("CVaR (95%)", f"{metrics['cvar_95']*100:.2f}%")
-                    
-                    st.info("📌 Scroll down to see detailed portfolio analysis including returns, risk metrics, and benchmark exposures.")
-                    
-                    # Show optimization log
-                    if 'optimization_log' in result:
-                        with st.expander("📋 Optimization Log", expanded=True):
-                            for log_entry in result['optimization_log']:
-                                st.text(log_entry)
                 
             except Exception as e:
                 st.error(f"❌ Error during optimization: {str(e)}")
@@ -9796,8 +10140,9 @@ def main():
                 st.session_state['portfolio_view'] = 'fund'
             
             # Display selected view
-            fig_pie = create_portfolio_pie_chart(
-                weights,
+            weights_items = tuple(weights.items())
+            fig_pie = cached_portfolio_pie_chart(
+                weights_items,
                 st.session_state['portfolio_view'],
                 fund_categories,
                 fund_subcategories
@@ -9809,15 +10154,7 @@ def main():
             
             with summary_col1:
                 st.markdown("#### Category Breakdown")
-                category_weights = {}
-                for fund, weight in weights.items():
-                    cat = fund_categories.get(fund, 'Unknown')
-                    category_weights[cat] = category_weights.get(cat, 0) + weight
-                
-                cat_df = pd.DataFrame({
-                    'Category': list(category_weights.keys()),
-                    'Weight %': [w*100 for w in category_weights.values()]
-                }).sort_values('Weight %', ascending=False)
+                cat_df = weight_breakdown(weights_items, fund_categories, 'Category')
                 
                 st.dataframe(
                     cat_df.style.format({'Weight %': '{:.2f}%'}),
@@ -9827,15 +10164,7 @@ def main():
             
             with summary_col2:
                 st.markdown("#### Subcategory Breakdown")
-                subcat_weights = {}
-                for fund, weight in weights.items():
-                    subcat = fund_subcategories.get(fund, 'Unknown')
-                    subcat_weights[subcat] = subcat_weights.get(subcat, 0) + weight
-                
-                subcat_df = pd.DataFrame({
-                    'Subcategory': list(subcat_weights.keys()),
-                    'Weight %': [w*100 for w in subcat_weights.values()]
-                }).sort_values('Weight %', ascending=False)
+                subcat_df = weight_breakdown(weights_items, fund_subcategories, 'Subcategory')
                 
                 st.dataframe(
                     subcat_df.style.format({'Weight %': '{:.2f}%'}),
@@ -9859,32 +10188,13 @@ def main():
             # Liquidity Breakdown
             st.markdown("#### Liquidity Breakdown")
             
-            liquidity_weights = {}
-            total_liquidity_days = 0
-            weights_dict = weights if isinstance(weights, dict) else weights.to_dict()
-            total_weight = sum(weights_dict.values())
-            
-            for fund_name, weight in weights_dict.items():
-                fund_row = fund_metrics[fund_metrics['FUNDO DE INVESTIMENTO'] == fund_name]
-                if len(fund_row) > 0 and 'LIQUIDEZ' in fund_row.columns:
-                    liquidity = fund_row['LIQUIDEZ'].iloc[0]
-                    if pd.notna(liquidity):
-                        norm_weight = weight / total_weight if total_weight > 0 else 0
-                        liquidity_weights[liquidity] = liquidity_weights.get(liquidity, 0) + norm_weight
-                        # Extract days from "D+X" format for average calculation
-                        try:
-                            days = int(str(liquidity).replace('D+', '').strip())
-                            total_liquidity_days += days * norm_weight
-                        except (ValueError, AttributeError):
-                            pass
-            
-            if liquidity_weights:
-                # Sort by liquidity days (extract number from "D+X" format)
-                sorted_liquidity = sorted(liquidity_weights.keys(), 
-                    key=lambda x: int(str(x).replace('D+', '').strip()) if str(x).replace('D+', '').strip().isdigit() else 9999)
-                
-                # Create single-row dataframe with liquidity levels as columns
-                liquidity_row = {liq: f"{liquidity_weights[liq]*100:.2f}%" for liq in sorted_liquidity}
+            liquidity_weights, total_liquidity_days = liquidity_breakdown(
+                weights_items, fund_liquidity_map(fund_metrics), sum(w for _, w in weights_items)
+            )
+            
+            if len(liquidity_weights) > 0:
+                # Create single-row dataframe with liquidity levels as columns (sorted by days)
+                liquidity_row = {liq: f"{w*100:.2f}%" for liq, w in liquidity_weights.items()}
                 liquidity_df = pd.DataFrame([liquidity_row])
                 
                 liq_col1, liq_col2 = st.columns([3, 1])
@@ -9910,70 +10220,49 @@ def main():
             
             if period_months:
                 cutoff_date = portfolio_returns.index[-1] - pd.DateOffset(months=period_months)
-                period_returns = portfolio_returns[portfolio_returns.index >= cutoff_date]
-                period_cdi = cdi_returns[cdi_returns.index >= cutoff_date]
+                period_returns = portfolio_returns.loc[cutoff_date:]
+                period_cdi = cdi_returns.loc[cutoff_date:]
             else:
                 period_returns = portfolio_returns
                 period_cdi = cdi_returns
             
             # Cumulative returns chart
-            portfolio_cum = calculate_cumulative_returns(period_returns) * 100
-            cdi_cum = calculate_cumulative_returns(period_cdi) * 100
-            
-            fig_returns = go.Figure()
-            
-            fig_returns.add_trace(go.Scatter(
-                x=portfolio_cum.index,
-                y=portfolio_cum.values,
-                name='Portfolio',
-                line=dict(color='#D4AF37', width=3),
-                hovertemplate='%{y:.2f}%<extra></extra>'
-            ))
-            
-            fig_returns.add_trace(go.Scatter(
-                x=cdi_cum.index,
-                y=cdi_cum.values,
-                name='CDI',
-                line=dict(color='#00CED1', width=2),
-                hovertemplate='%{y:.2f}%<extra></extra>'
-            ))
-            
-            fig_returns.update_layout(
-                title=f'Cumulative Returns - {selected_period}',
-                xaxis_title='Date',
-                yaxis_title='Cumulative Return (%)',
-                template=PLOTLY_TEMPLATE,
-                hovermode='x unified',
-                height=500
-            )
+            fig_returns = portfolio_cumulative_chart(period_returns, period_cdi, selected_period)
             
             st.plotly_chart(fig_returns, use_container_width=True)
             
             # Calculate and display metrics for different periods
             periods_list = ['3M', '6M', '12M', '24M', '36M', 'Total']
-            metrics_data = {'Period': [], 'Portfolio Return': [], 'CDI Return': [], 'Excess Return': []}
+            period_names = []
             
+            period_cutoffs = []
             for period_name in periods_list:
                 if period_name == 'Total':
-                    p_ret = (1 + portfolio_returns).prod() - 1
-                    c_ret = (1 + cdi_returns).prod() - 1
+                    cutoff = None
                 else:
                     months = int(period_name.replace('M', ''))
                     cutoff = portfolio_returns.index[-1] - pd.DateOffset(months=months)
                     
                     if cutoff < portfolio_returns.index[0]:
                         continue
-                    
-                    p_ret = (1 + portfolio_returns[portfolio_returns.index >= cutoff]).prod() - 1
-                    c_ret = (1 + cdi_returns[cdi_returns.index >= cutoff]).prod() - 1
                 
-                metrics_data['Period'].append(period_name)
-                metrics_data['Portfolio Return'].append(f"{p_ret*100:.2f}%")
-                metrics_data['CDI Return'].append(f"{c_ret*100:.2f}%")
-                metrics_data['Excess Return'].append(f"{(p_ret / c_ret)*100:.2f}%")
-            
-            metrics_df = pd.DataFrame(metrics_data)
-            st.dataframe(metrics_df, use_container_width=True, hide_index=True)
+                period_names.append(period_name)
+                period_cutoffs.append(cutoff)
+            
+            # One reverse cumulative product per series serves every period
+            p_rets = trailing_compound_returns(portfolio_returns, period_cutoffs)
+            c_rets = trailing_compound_returns(cdi_returns, period_cutoffs)
+            metrics_df = pd.DataFrame({
+                'Period': period_names,
+                'Portfolio Return': p_rets,
+                'CDI Return': c_rets,
+                'Excess Return': p_rets / c_rets
+            })
+            st.dataframe(
+                metrics_df.style.format('{:.2%}', subset=['Portfolio Return', 'CDI Return', 'Excess Return']),
+                use_container_width=True,
+                hide_index=True
+            )
             
             st.markdown("---")
             
@@ -9991,16 +10280,13 @@ def main():
                 key="portfolio_comparison_method"
             )
             
-            # Create monthly returns table
-            monthly_table = create_monthly_returns_table(
+            # Create monthly returns table and style it as HTML
+            monthly_table, styled_html = portfolio_monthly_calendar(
                 portfolio_returns,
                 cdi_returns,
                 comparison_method
             )
             
-            # Style the table as HTML
-            styled_html = style_monthly_returns_table(monthly_table, comparison_method)
-            
             # Display HTML table
             st.markdown(styled_html, unsafe_allow_html=True)
             
@@ -10053,12 +10339,9 @@ def main():
                 key="portfolio_freq"
             )
             
-            if frequency_choice == 'Daily':
-                analysis_returns = portfolio_returns
-            elif frequency_choice == 'Weekly':
-                analysis_returns = portfolio_returns.resample('W').apply(lambda x: (1 + x).prod() - 1)
-            else:
-                analysis_returns = portfolio_returns.resample('ME').apply(lambda x: (1 + x).prod() - 1)
+            analysis_returns = returns_by_frequency(portfolio_returns)[frequency_choice]
+            # Scalar metrics below reduce the raw values; no index alignment needed
+            analysis_values = analysis_returns.to_numpy(dtype=np.float64)
             
             st.markdown("---")
             
@@ -10068,11 +10351,11 @@ def main():
             omega_chart_col, omega_gauge_col = st.columns([2, 1])
             
             with omega_chart_col:
-                fig_omega = create_omega_cdf_chart(analysis_returns, threshold=0, frequency=frequency_choice.lower())
+                fig_omega = create_omega_cdf_chart(analysis_values, threshold=0, frequency=frequency_choice.lower())
                 st.plotly_chart(fig_omega, use_container_width=True)
             
             with omega_gauge_col:
-                omega_val = PortfolioMetrics.omega_ratio(analysis_returns)
+                omega_val = PortfolioMetrics.omega_ratio(analysis_values)
                 fig_omega_gauge = create_omega_gauge(omega_val, frequency=frequency_choice)
                 st.plotly_chart(fig_omega_gauge, use_container_width=True)
             
@@ -10084,8 +10367,8 @@ def main():
             rachev_chart_col, rachev_metrics_col = st.columns([2, 1])
             
             with rachev_chart_col:
-                var_val = PortfolioMetrics.var(analysis_returns, 0.95)
-                cvar_val = PortfolioMetrics.cvar(analysis_returns, 0.95)
+                var_val = PortfolioMetrics.var(analysis_values, 0.95)
+                cvar_val = PortfolioMetrics.cvar(analysis_values, 0.95)
                 
                 fig_rachev = create_combined_rachev_var_chart(
                     analysis_returns, var_val, cvar_val, frequency=frequency_choice.lower()
@@ -10094,12 +10377,8 @@ def main():
             
             with rachev_metrics_col:
                 # Calculate Rachev ratio
-                returns_pct = analysis_returns * 100
-                lower_threshold = np.percentile(returns_pct, 5)
-                upper_threshold = np.percentile(returns_pct, 95)
-                
-                expected_loss = abs(returns_pct[returns_pct <= lower_threshold].mean())
-                expected_gain = returns_pct[returns_pct >= upper_threshold].mean()
+                _, _, expected_loss, expected_gain = rachev_tails(analysis_values * 100)
+                expected_loss = abs(expected_loss)
                 
                 rachev_val = expected_gain / expected_loss if expected_loss > 0 else np.inf
                 
@@ -10113,26 +10392,17 @@ def main():
             # ═══════════════════════════════════════════════════════════════════════════
             
             st.markdown("### 📊 Sharpe Ratio Analysis")
+            risk_metrics = portfolio_risk_metrics(portfolio_returns)
             
             sharpe_chart_col, sharpe_metrics_col = st.columns([3, 1])
             
             with sharpe_chart_col:
-                fig_sharpe = create_rolling_sharpe_chart(portfolio_returns, window_months=12)
+                fig_sharpe = cached_rolling_sharpe_chart(portfolio_returns, window_months=12)
                 st.plotly_chart(fig_sharpe, use_container_width=True)
             
             with sharpe_metrics_col:
                 # Calculate Sharpe for different periods
-                for period_name, months in [('12M', 12), ('24M', 24), ('36M', 36), ('Total', None)]:
-                    if months:
-                        cutoff = portfolio_returns.index[-1] - pd.DateOffset(months=months)
-                        if cutoff >= portfolio_returns.index[0]:
-                            period_ret = portfolio_returns[portfolio_returns.index >= cutoff]
-                        else:
-                            continue
-                    else:
-                        period_ret = portfolio_returns
-                    
-                    sharpe = PortfolioMetrics.sharpe_ratio(period_ret)
+                for period_name, sharpe in risk_metrics['sharpe'].items():
                     st.metric(f"Sharpe {period_name}", f"{sharpe:.2f}")
             
             st.markdown("---")
@@ -10149,21 +10419,11 @@ def main():
             vol_chart_col, vol_metrics_col = st.columns([3, 1])
             
             with vol_chart_col:
-                fig_vol = create_rolling_vol_chart(portfolio_returns, window_months=12)
+                fig_vol = cached_rolling_vol_chart(portfolio_returns, window_months=12)
                 st.plotly_chart(fig_vol, use_container_width=True)
             
             with vol_metrics_col:
-                for period_name, months in [('12M', 12), ('24M', 24), ('36M', 36), ('Total', None)]:
-                    if months:
-                        cutoff = portfolio_returns.index[-1] - pd.DateOffset(months=months)
-                        if cutoff >= portfolio_returns.index[0]:
-                            period_ret = portfolio_returns[portfolio_returns.index >= cutoff]
-                        else:
-                            continue
-                    else:
-                        period_ret = portfolio_returns
-                    
-                    vol = PortfolioMetrics.annualized_volatility(period_ret)
+                for period_name, vol in risk_metrics['vol'].items():
                     st.metric(f"Vol {period_name}", f"{vol*100:.2f}%")
             
             st.markdown("---")
@@ -10174,11 +10434,11 @@ def main():
             dd_chart_col, dd_metrics_col = st.columns([3, 1])
             
             with dd_chart_col:
-                fig_underwater, max_dd_info = create_underwater_plot(portfolio_returns)
+                fig_underwater, max_dd_info = cached_underwater_plot(portfolio_returns)
                 st.plotly_chart(fig_underwater, use_container_width=True)
             
             with dd_metrics_col:
-                mdd = PortfolioMetrics.max_drawdown(portfolio_returns)
+                mdd = risk_metrics['mdd']
                 st.metric("Max Drawdown", f"{mdd*100:.2f}%")
                 
                 # Display CDaR metric
@@ -10188,78 +10448,39 @@ def main():
                              help="Conditional Drawdown at Risk: Average of worst 5% drawdowns")
                 
                 # Calculate MDD duration - find the LONGEST drawdown period
-                drawdowns = PortfolioMetrics.drawdown_series(portfolio_returns)
+                drawdowns = risk_metrics['drawdowns']
                 
                 if len(drawdowns) > 0 and drawdowns.min() < -0.01:
-                    cumulative = (1 + portfolio_returns).cumprod()
-                    running_max = cumulative.expanding().max()
-                    
-                    # Identify all drawdown periods
-                    in_drawdown = drawdowns < -0.001  # Consider drawdowns > 0.1%
-                    
-                    if in_drawdown.any():
-                        # Find all drawdown periods (contiguous sequences)
-                        drawdown_periods = []
-                        start_idx = None
-                        
-                        for i in range(len(in_drawdown)):
-                            if in_drawdown.iloc[i] and start_idx is None:
-                                # Start of a new drawdown
-                                start_idx = i
-                            elif not in_drawdown.iloc[i] and start_idx is not None:
-                                # End of drawdown (recovered)
-                                end_idx = i - 1
-                                duration = (in_drawdown.index[end_idx] - in_drawdown.index[start_idx]).days
-                                max_dd_in_period = drawdowns.iloc[start_idx:end_idx+1].min()
-                                
-                                drawdown_periods.append({
-                                    'start': in_drawdown.index[start_idx],
-                                    'end': in_drawdown.index[end_idx],
-                                    'duration': duration,
-                                    'max_dd': max_dd_in_period
-                                })
-                                start_idx = None
-                        
-                        # Check if still in drawdown at the end
-                        if start_idx is not None:
-                            duration = (in_drawdown.index[-1] - in_drawdown.index[start_idx]).days
-                            max_dd_in_period = drawdowns.iloc[start_idx:].min()
-                            drawdown_periods.append({
-                                'start': in_drawdown.index[start_idx],
-                                'end': in_drawdown.index[-1],
-                                'duration': duration,
-                                'max_dd': max_dd_in_period,
-                                'ongoing': True
-                            })
+                    # Identify all drawdown periods (contiguous runs deeper than 0.1%)
+                    dd_starts, dd_ends, dd_durations, dd_depths, dd_ongoing = drawdown_periods(drawdowns, -0.001)
+                    dd_dates = drawdowns.index
+                    
+                    if len(dd_starts) > 0:
+                        # Find the drawdown with longest duration
+                        longest = int(np.argmax(dd_durations))
                         
-                        if drawdown_periods:
-                            # Find the drawdown with longest duration
-                            longest_dd = max(drawdown_periods, key=lambda x: x['duration'])
-                            
-                            # Also identify the deepest drawdown
-                            deepest_dd = min(drawdown_periods, key=lambda x: x['max_dd'])
-                            
-                            # Display the longest duration drawdown
-                            if longest_dd.get('ongoing', False):
-                                st.metric(
-                                    "Longest DD Duration", 
-                                    f"{longest_dd['duration']} days",
-                                    help="Longest drawdown period (still ongoing)"
-                                )
-                                st.caption(f"From {longest_dd['start'].date()} (ongoing)")
-                            else:
-                                st.metric(
-                                    "Longest DD Duration", 
-                                    f"{longest_dd['duration']} days",
-                                    help="Longest time to recover from a drawdown"
-                                )
-                                st.caption(f"From {longest_dd['start'].date()} to {longest_dd['end'].date()}")
-                            
-                            # Show if longest != deepest
-                            if longest_dd['start'] != deepest_dd['start']:
-                                st.caption(f"⚠️ Note: Deepest DD ({deepest_dd['max_dd']*100:.2f}%) occurred from {deepest_dd['start'].date()}")
+                        # Also identify the deepest drawdown
+                        deepest = int(np.argmin(dd_depths))
+                        
+                        # Display the longest duration drawdown
+                        if dd_ongoing and longest == len(dd_starts) - 1:
+                            st.metric(
+                                "Longest DD Duration", 
+                                f"{dd_durations[longest]} days",
+                                help="Longest drawdown period (still ongoing)"
+                            )
+                            st.caption(f"From {dd_dates[dd_starts[longest]].date()} (ongoing)")
                         else:
-                            st.metric("Longest DD Duration", "N/A")
+                            st.metric(
+                                "Longest DD Duration", 
+                                f"{dd_durations[longest]} days",
+                                help="Longest time to recover from a drawdown"
+                            )
+                            st.caption(f"From {dd_dates[dd_starts[longest]].date()} to {dd_dates[dd_ends[longest]].date()}")
+                        
+                        # Show if longest != deepest
+                        if longest != deepest:
+                            st.caption(f"⚠️ Note: Deepest DD ({dd_depths[deepest]*100:.2f}%) occurred from {dd_dates[dd_starts[deepest]].date()}")
                     else:
                         st.metric("Longest DD Duration", "0 days")
                 else:
@@ -10273,96 +10494,83 @@ def main():
             
             st.markdown("### 🌐 Benchmark Exposures")
             
-            available_benchmarks = ['CDI', 'USDBRL', 'GOLD', 'IBOVESPA', 'SP500', 'BITCOIN']
+            available_benchmarks = _available_benchmarks(tuple(benchmarks.columns))
             default_exposure = ['CDI', 'IBOVESPA'] if all(b in benchmarks.columns for b in ['CDI', 'IBOVESPA']) else ['CDI']
             
             selected_exposure_benches = st.multiselect(
                 "Select Benchmarks for Exposure Analysis:",
-                options=[b for b in available_benchmarks if b in benchmarks.columns],
+                options=available_benchmarks,
                 default=default_exposure,
                 key="portfolio_exposure"
             )
             
+            copula_by_bench = {}  # filled by the exposure table, reused by the time series
             if selected_exposure_benches:
                 exposure_data = []
+                u_port = None  # portfolio ECDF, ranked once for all fallback benchmarks
+                
+                # Calculate rolling copula metrics to match time series analysis
+                with st.spinner('Calculating benchmark exposures...'):
+                    bench_map = {b: benchmarks[b] for b in selected_exposure_benches}
+                    copula_by_bench = estimate_rolling_copula_by_benchmark_cached(
+                        _series_content_key(portfolio_returns),
+                        tuple((b,) + _series_content_key(bench_map[b]) for b in selected_exposure_benches),
+                        250,
+                        portfolio_returns,
+                        bench_map
+                    )
                 
                 for bench in selected_exposure_benches:
-                    # Calculate rolling copula metrics to match time series analysis
-                    with st.spinner(f'Calculating exposure for {bench}...'):
-                        copula_results = estimate_rolling_copula_for_chart(
-                            portfolio_returns,
-                            benchmarks[bench],
-                            window=250
+                    copula_results = copula_by_bench[bench]
+                    
+                    if copula_results is not None:
+                        # Last-window (most recent) and average values
+                        last_vals, avg_vals = copula_last_and_average(copula_results)
+                        last_kendall, last_tail_lower, last_tail_upper, last_asymmetry = last_vals
+                        avg_kendall, avg_tail_lower, avg_tail_upper, avg_asymmetry = avg_vals
+                        
+                        # Add last window row
+                        exposure_data.append({
+                            'Benchmark': f'{bench} - Last Window',
+                            'Kendall Tau': last_kendall,
+                            'Tail Lower': last_tail_lower,
+                            'Tail Upper': last_tail_upper,
+                            'Asymmetry': last_asymmetry
+                        })
+                        
+                        # Add average row
+                        exposure_data.append({
+                            'Benchmark': f'{bench} - Average',
+                            'Kendall Tau': avg_kendall,
+                            'Tail Lower': avg_tail_lower,
+                            'Tail Upper': avg_tail_upper,
+                            'Asymmetry': avg_asymmetry
+                        })
+                    else:
+                        # Insufficient data - use full data calculation as fallback
+                        bench_vals = align_ffill(
+                            benchmarks[bench].to_numpy(dtype=np.float64),
+                            benchmarks.index.as_unit('ns').asi8,
+                            portfolio_returns.index.as_unit('ns').asi8
                         )
                         
-                        if copula_results is not None:
-                            # Last window values (most recent)
-                            last_kendall = copula_results['kendall_tau'].iloc[-1]
-                            last_tail_lower = copula_results['tail_lower'].iloc[-1]
-                            last_tail_upper = copula_results['tail_upper'].iloc[-1]
-                            last_asymmetry = copula_results['asymmetry_index'].iloc[-1]
-                            
-                            # Average values across all windows
-                            avg_kendall = copula_results['kendall_tau'].mean()
-                            avg_tail_lower = copula_results['tail_lower'].mean()
-                            avg_tail_upper = copula_results['tail_upper'].mean()
-                            avg_asymmetry = copula_results['asymmetry_index'].mean()
-                            
-                            # Add last window row
-                            exposure_data.append({
-                                'Benchmark': f'{bench} - Last Window',
-                                'Kendall Tau': last_kendall,
-                                'Tail Lower': last_tail_lower,
-                                'Tail Upper': last_tail_upper,
-                                'Asymmetry': last_asymmetry
-                            })
-                            
-                            # Add average row
-                            exposure_data.append({
-                                'Benchmark': f'{bench} - Average',
-                                'Kendall Tau': avg_kendall,
-                                'Tail Lower': avg_tail_lower,
-                                'Tail Upper': avg_tail_upper,
-                                'Asymmetry': avg_asymmetry
-                            })
-                        else:
-                            # Insufficient data - use full data calculation as fallback
-                            bench_returns = benchmarks[bench].reindex(portfolio_returns.index, method='ffill').fillna(0)
-                            
-                            u = to_empirical_cdf(portfolio_returns)
-                            v = to_empirical_cdf(bench_returns)
-                            
-                            tau = stats.kendalltau(u.values, v.values)[0]
-                            
-                            theta_lower, _ = estimate_gumbel_270_parameter(u.values, v.values)
-                            lambda_lower, _ = gumbel_270_tail_dependence(theta_lower)
-                            
-                            theta_upper, _ = estimate_gumbel_180_parameter(u.values, v.values)
-                            _, lambda_upper = gumbel_180_tail_dependence(theta_upper)
-                            
-                            asymmetry = (lambda_lower - lambda_upper) / (lambda_lower + lambda_upper) if (lambda_lower + lambda_upper) > 0 else 0
-                            
-                            exposure_data.append({
-                                'Benchmark': f'{bench} - Full Period',
-                                'Kendall Tau': tau,
-                                'Tail Lower': lambda_lower,
-                                'Tail Upper': lambda_upper,
-                                'Asymmetry': asymmetry
-                            })
+                        if u_port is None:
+                            u_port = to_empirical_cdf(portfolio_returns).to_numpy()
+                        _, (tau, lambda_lower, lambda_upper, asymmetry) = _compute_exposure_row(
+                            bench, u_port, bench_vals
+                        )
+                        
+                        exposure_data.append({
+                            'Benchmark': f'{bench} - Full Period',
+                            'Kendall Tau': tau,
+                            'Tail Lower': lambda_lower,
+                            'Tail Upper': lambda_upper,
+                            'Asymmetry': asymmetry
+                        })
                 
                 exposure_df = pd.DataFrame(exposure_data)
                 
-                st.dataframe(
-                    exposure_df.style.format(
-                        {col: "{:.4f}" for col in exposure_df.columns if col != 'Benchmark'}
-                    ).background_gradient(
-                        cmap='RdYlGn',
-                        subset=[col for col in exposure_df.columns if col != 'Benchmark'],
-                        vmin=-1, vmax=1
-                    ),
-                    use_container_width=True,
-                    hide_index=True
-                )
+                st.markdown(style_exposure_table(exposure_df), unsafe_allow_html=True)
                 
                 with st.expander("📚 Exposure Metrics Guide"):
                     st.markdown("""
@@ -10390,7 +10598,7 @@ def main():
             st.info("💡 Select a benchmark below to visualize the evolution of portfolio exposure metrics over time")
 
             # Benchmark selection for time series
-            portfolio_ts_benchmarks = ['None'] + [b for b in available_benchmarks if b in benchmarks.columns]
+            portfolio_ts_benchmarks = ('None',) + available_benchmarks
             selected_portfolio_ts_benchmark = st.selectbox(
                 "Select Benchmark for Time Series:",
                 options=portfolio_ts_benchmarks,
@@ -10401,74 +10609,33 @@ def main():
             if selected_portfolio_ts_benchmark != 'None' and selected_portfolio_ts_benchmark in benchmarks.columns:
                 with st.spinner(f'Calculating portfolio exposure time series for {selected_portfolio_ts_benchmark}...'):
                     # Calculate rolling copula metrics for portfolio
-                    copula_results = estimate_rolling_copula_for_chart(
-                        portfolio_returns,
-                        benchmarks[selected_portfolio_ts_benchmark],
-                        window=250
-                    )
+                    if selected_portfolio_ts_benchmark in copula_by_bench:
+                        copula_results = copula_by_bench[selected_portfolio_ts_benchmark]
+                    else:
+                        copula_results = estimate_rolling_copula_cached(
+                            _series_content_key(portfolio_returns),
+                            _series_content_key(benchmarks[selected_portfolio_ts_benchmark]),
+                            250,
+                            portfolio_returns,
+                            benchmarks[selected_portfolio_ts_benchmark]
+                        )
                     
                     if copula_results is not None:
                         # Calculate current and average values
-                        current_kendall = copula_results['kendall_tau'].iloc[-1]
-                        avg_kendall = copula_results['kendall_tau'].mean()
-                        
-                        current_tail_lower = copula_results['tail_lower'].iloc[-1]
-                        avg_tail_lower = copula_results['tail_lower'].mean()
-                        
-                        current_tail_upper = copula_results['tail_upper'].iloc[-1]
-                        avg_tail_upper = copula_results['tail_upper'].mean()
-                        
-                        current_asymmetry = copula_results['asymmetry_index'].iloc[-1]
-                        avg_asymmetry = copula_results['asymmetry_index'].mean()
+                        last_vals, avg_vals = copula_last_and_average(copula_results)
+                        current_kendall, current_tail_lower, current_tail_upper, current_asymmetry = last_vals
+                        avg_kendall, avg_tail_lower, avg_tail_upper, avg_asymmetry = avg_vals
                         
                         # Create 2x2 grid of charts
                         st.markdown(f"##### Portfolio Exposure Evolution - {selected_portfolio_ts_benchmark}")
                         
-                        # Row 1: Kendall Tau and Asymmetry
-                        row1_col1, row1_col2 = st.columns(2)
-                        
-                        with row1_col1:
-                            fig_kendall = create_exposure_time_series_chart(
-                                copula_results,
-                                'kendall_tau',
-                                current_kendall,
-                                avg_kendall,
-                                selected_portfolio_ts_benchmark
-                            )
-                            st.plotly_chart(fig_kendall, use_container_width=True)
-                        
-                        with row1_col2:
-                            fig_asymmetry = create_exposure_time_series_chart(
-                                copula_results,
-                                'asymmetry_index',
-                                current_asymmetry,
-                                avg_asymmetry,
-                                selected_portfolio_ts_benchmark
-                            )
-                            st.plotly_chart(fig_asymmetry, use_container_width=True)
-                        
-                        # Row 2: Lower Tail and Upper Tail
-                        row2_col1, row2_col2 = st.columns(2)
-                        
-                        with row2_col1:
-                            fig_tail_lower = create_exposure_time_series_chart(
-                                copula_results,
-                                'tail_lower',
-                                current_tail_lower,
-                                avg_tail_lower,
-                                selected_portfolio_ts_benchmark
-                            )
-                            st.plotly_chart(fig_tail_lower, use_container_width=True)
-                        
-                        with row2_col2:
-                            fig_tail_upper = create_exposure_time_series_chart(
-                                copula_results,
-                                'tail_upper',
-                                current_tail_upper,
-                                avg_tail_upper,
-                                selected_portfolio_ts_benchmark
-                            )
-                            st.plotly_chart(fig_tail_upper, use_container_width=True)
+                        fig_exposure = cached_exposure_time_series_grid(
+                            copula_results,
+                            dict(zip(COPULA_METRICS, last_vals)),
+                            dict(zip(COPULA_METRICS, avg_vals)),
+                            selected_portfolio_ts_benchmark
+                        )
+                        st.plotly_chart(fig_exposure, use_container_width=True)
                         
                         # Summary metrics
                         st.markdown("##### Summary Statistics")
@@ -10567,10 +10734,7 @@ def main():
                     if creation_method == "📤 Upload Excel File":
                         st.markdown("---")
                         template_df = create_portfolio_template()
-                        buffer = io.BytesIO()
-                        with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
-                            template_df.to_excel(writer, index=False)
-                        buffer.seek(0)
+                        buffer = excel_template_bytes(template_df)
                         c1, c2 = st.columns([1, 2])
                         with c1:
                             st.download_button("📥 Download Template", buffer, "portfolio_template.xlsx", use_container_width=True)
@@ -10582,13 +10746,9 @@ def main():
                             try:
                                 pdf = pd.read_excel(uploaded)
                                 if 'Fund Name' in pdf.columns and 'Allocation (%)' in pdf.columns:
-                                    avail = fund_metrics['FUNDO DE INVESTIMENTO'].tolist()
-                                    valid, invalid = {}, []
-                                    for _, r in pdf.iterrows():
-                                        if r['Fund Name'] in avail:
-                                            valid[r['Fund Name']] = r['Allocation (%)']
-                                        else:
-                                            invalid.append(r['Fund Name'])
+                                    found = pdf['Fund Name'].isin(fund_metrics['FUNDO DE INVESTIMENTO']).to_numpy()
+                                    valid = dict(zip(pdf.loc[found, 'Fund Name'], pdf.loc[found, 'Allocation (%)']))
+                                    invalid = pdf.loc[~found, 'Fund Name'].tolist()
                                     if invalid:
                                         st.warning(f"Not found: {', '.join(invalid)}")
                                     if valid:
@@ -10803,8 +10963,9 @@ CREATE POLICY "Allow all operations" ON recommended_portfolios
                         st.session_state['rec_portfolio_view'] = 'fund'
                     
                     # Display pie chart
-                    fig_pie = create_portfolio_pie_chart(
-                        weights_series,
+                    weights_items = tuple(weights_series.items())
+                    fig_pie = cached_portfolio_pie_chart(
+                        weights_items,
                         st.session_state['rec_portfolio_view'],
                         rec_fund_categories,
                         rec_fund_subcategories
@@ -10816,15 +10977,7 @@ CREATE POLICY "Allow all operations" ON recommended_portfolios
                     
                     with summary_col1:
                         st.markdown("#### Category Breakdown")
-                        category_weights = {}
-                        for fund, weight in weights_series.items():
-                            cat = rec_fund_categories.get(fund, 'Unknown')
-                            category_weights[cat] = category_weights.get(cat, 0) + weight
-                        
-                        cat_df = pd.DataFrame({
-                            'Category': list(category_weights.keys()),
-                            'Weight %': [w*100 for w in category_weights.values()]
-                        }).sort_values('Weight %', ascending=False)
+                        cat_df = weight_breakdown(weights_items, rec_fund_categories, 'Category')
                         
                         st.dataframe(
                             cat_df.style.format({'Weight %': '{:.2f}%'}),
@@ -10834,15 +10987,7 @@ CREATE POLICY "Allow all operations" ON recommended_portfolios
                     
                     with summary_col2:
                         st.markdown("#### Subcategory Breakdown")
-                        subcat_weights = {}
-                        for fund, weight in weights_series.items():
-                            subcat = rec_fund_subcategories.get(fund, 'Unknown')
-                            subcat_weights[subcat] = subcat_weights.get(subcat, 0) + weight
-                        
-                        subcat_df = pd.DataFrame({
-                            'Subcategory': list(subcat_weights.keys()),
-                            'Weight %': [w*100 for w in subcat_weights.values()]
-                        }).sort_values('Weight %', ascending=False)
+                        subcat_df = weight_breakdown(weights_items, rec_fund_subcategories, 'Subcategory')
                         
                         st.dataframe(
                             subcat_df.style.format({'Weight %': '{:.2f}%'}),
@@ -10897,7 +11042,7 @@ CREATE POLICY "Allow all operations" ON recommended_portfolios
                             # Filter returns by period
                             if period_map[selected_period] is not None:
                                 cutoff = portfolio_returns.index[-1] - pd.DateOffset(months=period_map[selected_period])
-                                port_ret_filtered = portfolio_returns[portfolio_returns.index >= cutoff]
+                                port_ret_filtered = portfolio_returns.loc[cutoff:]
                             else:
                                 port_ret_filtered = portfolio_returns
                             
@@ -10919,29 +11064,13 @@ CREATE POLICY "Allow all operations" ON recommended_portfolios
                             st.markdown("#### Liquidity Breakdown")
                             
                             # Get liquidity for each fund
-                            liquidity_weights = {}
-                            total_liquidity_days = 0
-                            for fund_name, weight in portfolio.items():
-                                fund_row = fund_metrics[fund_metrics['FUNDO DE INVESTIMENTO'] == fund_name]
-                                if len(fund_row) > 0 and 'LIQUIDEZ' in fund_row.columns:
-                                    liquidity = fund_row['LIQUIDEZ'].iloc[0]
-                                    if pd.notna(liquidity):
-                                        norm_weight = weight / total_alloc
-                                        liquidity_weights[liquidity] = liquidity_weights.get(liquidity, 0) + norm_weight
-                                        # Extract days from "D+X" format for average calculation
-                                        try:
-                                            days = int(str(liquidity).replace('D+', '').strip())
-                                            total_liquidity_days += days * norm_weight
-                                        except (ValueError, AttributeError):
-                                            pass
-                            
-                            if liquidity_weights:
-                                # Sort by liquidity days (extract number from "D+X" format)
-                                sorted_liquidity = sorted(liquidity_weights.keys(), 
-                                    key=lambda x: int(str(x).replace('D+', '').strip()) if str(x).replace('D+', '').strip().isdigit() else 9999)
-                                
-                                # Create single-row dataframe with liquidity levels as columns
-                                liquidity_row = {liq: f"{liquidity_weights[liq]*100:.2f}%" for liq in sorted_liquidity}
+                            liquidity_weights, total_liquidity_days = liquidity_breakdown(
+                                tuple(portfolio.items()), fund_liquidity_map(fund_metrics), total_alloc
+                            )
+                            
+                            if len(liquidity_weights) > 0:
+                                # Create single-row dataframe with liquidity levels as columns (sorted by days)
+                                liquidity_row = {liq: f"{w*100:.2f}%" for liq, w in liquidity_weights.items()}
                                 liquidity_df = pd.DataFrame([liquidity_row])
                                 
                                 liq_col1, liq_col2 = st.columns([3, 1])
@@ -10990,12 +11119,7 @@ CREATE POLICY "Allow all operations" ON recommended_portfolios
                             
                             freq_label = frequency_choice.lower()
                             
-                            if frequency_choice == 'Daily':
-                                returns_data = portfolio_returns
-                            elif frequency_choice == 'Weekly':
-                                returns_data = portfolio_returns.resample('W').apply(lambda x: (1 + x).prod() - 1)
-                            else:
-                                returns_data = portfolio_returns.resample('ME').apply(lambda x: (1 + x).prod() - 1)
+                            returns_data = returns_by_frequency(portfolio_returns)[frequency_choice]
                             
                             st.markdown("---")
                             
@@ -11048,7 +11172,7 @@ CREATE POLICY "Allow all operations" ON recommended_portfolios
                             sharpe_chart_col, sharpe_metrics_col = st.columns([3, 1])
                             
                             with sharpe_chart_col:
-                                fig_sharpe = create_rolling_sharpe_chart(portfolio_returns, window_months=12)
+                                fig_sharpe = cached_rolling_sharpe_chart(portfolio_returns, window_months=12)
                                 st.plotly_chart(fig_sharpe, use_container_width=True)
                             
                             with sharpe_metrics_col:
@@ -11078,7 +11202,7 @@ CREATE POLICY "Allow all operations" ON recommended_portfolios
                             vol_chart_col, vol_metrics_col = st.columns([3, 1])
                             
                             with vol_chart_col:
-                                fig_vol = create_rolling_vol_chart(portfolio_returns, window_months=12)
+                                fig_vol = cached_rolling_vol_chart(portfolio_returns, window_months=12)
                                 st.plotly_chart(fig_vol, use_container_width=True)
                             
                             with vol_metrics_col:
@@ -11102,7 +11226,7 @@ CREATE POLICY "Allow all operations" ON recommended_portfolios
                             dd_chart_col, dd_metrics_col = st.columns([3, 1])
                             
                             with dd_chart_col:
-                                fig_underwater, max_dd_info = create_underwater_plot(portfolio_returns)
+                                fig_underwater, max_dd_info = cached_underwater_plot(portfolio_returns)
                                 st.plotly_chart(fig_underwater, use_container_width=True)
                             
                             with dd_metrics_col:
@@ -11123,7 +11247,7 @@ CREATE POLICY "Allow all operations" ON recommended_portfolios
                             
                             st.markdown("### 🌍 Benchmark Exposures")
                             
-                            available_benchmarks = [b for b in ['CDI', 'USDBRL', 'GOLD', 'IBOVESPA', 'SP500', 'BITCOIN'] if b in benchmarks.columns]
+                            available_benchmarks = _available_benchmarks(tuple(benchmarks.columns))
                             default_exposure = []
                             if 'CDI' in available_benchmarks:
                                 default_exposure.append('CDI')
@@ -11137,67 +11261,65 @@ CREATE POLICY "Allow all operations" ON recommended_portfolios
                                 key="rec_exposure_select"
                             )
                             
+                            copula_by_bench = {}  # filled by the exposure table, reused by the time series
                             if selected_exposure_benches:
                                 exposure_data = []
+                                u_port = None  # portfolio ECDF, ranked once for all fallback benchmarks
+                                
+                                with st.spinner('Calculating benchmark exposures...'):
+                                    bench_map = {b: benchmarks[b] for b in selected_exposure_benches}
+                                    copula_by_bench = estimate_rolling_copula_by_benchmark_cached(
+                                        _series_content_key(portfolio_returns),
+                                        tuple((b,) + _series_content_key(bench_map[b]) for b in selected_exposure_benches),
+                                        250,
+                                        portfolio_returns,
+                                        bench_map
+                                    )
                                 
                                 for bench in selected_exposure_benches:
-                                    with st.spinner(f'Calculating exposure for {bench}...'):
-                                        copula_results = estimate_rolling_copula_for_chart(
-                                            portfolio_returns,
-                                            benchmarks[bench],
-                                            window=250
+                                    copula_results = copula_by_bench[bench]
+                                    
+                                    if copula_results is not None:
+                                        last_vals, avg_vals = copula_last_and_average(copula_results)
+                                        last_kendall, last_tail_lower, last_tail_upper, last_asymmetry = last_vals
+                                        avg_kendall, avg_tail_lower, avg_tail_upper, avg_asymmetry = avg_vals
+                                        
+                                        exposure_data.append({
+                                            'Benchmark': f'{bench} - Last Window',
+                                            'Kendall Tau': last_kendall,
+                                            'Tail Lower': last_tail_lower,
+                                            'Tail Upper': last_tail_upper,
+                                            'Asymmetry': last_asymmetry
+                                        })
+                                        exposure_data.append({
+                                            'Benchmark': f'{bench} - Average',
+                                            'Kendall Tau': avg_kendall,
+                                            'Tail Lower': avg_tail_lower,
+                                            'Tail Upper': avg_tail_upper,
+                                            'Asymmetry': avg_asymmetry
+                                        })
+                                    else:
+                                        bench_vals = align_ffill(
+                                            benchmarks[bench].to_numpy(dtype=np.float64),
+                                            benchmarks.index.as_unit('ns').asi8,
+                                            portfolio_returns.index.as_unit('ns').asi8
+                                        )
+                                        if u_port is None:
+                                            u_port = to_empirical_cdf(portfolio_returns).to_numpy()
+                                        _, (tau, lambda_lower, lambda_upper, asymmetry) = _compute_exposure_row(
+                                            bench, u_port, bench_vals
                                         )
                                         
-                                        if copula_results is not None:
-                                            last_kendall = copula_results['kendall_tau'].iloc[-1]
-                                            last_tail_lower = copula_results['tail_lower'].iloc[-1]
-                                            last_tail_upper = copula_results['tail_upper'].iloc[-1]
-                                            last_asymmetry = copula_results['asymmetry_index'].iloc[-1]
-                                            
-                                            avg_kendall = copula_results['kendall_tau'].mean()
-                                            avg_tail_lower = copula_results['tail_lower'].mean()
-                                            avg_tail_upper = copula_results['tail_upper'].mean()
-                                            avg_asymmetry = copula_results['asymmetry_index'].mean()
-                                            
-                                            exposure_data.append({
-                                                'Benchmark': f'{bench} - Last Window',
-                                                'Kendall Tau': last_kendall,
-                                                'Tail Lower': last_tail_lower,
-                                                'Tail Upper': last_tail_upper,
-                                                'Asymmetry': last_asymmetry
-                                            })
-                                            exposure_data.append({
-                                                'Benchmark': f'{bench} - Average',
-                                                'Kendall Tau': avg_kendall,
-                                                'Tail Lower': avg_tail_lower,
-                                                'Tail Upper': avg_tail_upper,
-                                                'Asymmetry': avg_asymmetry
-                                            })
-                                        else:
-                                            bench_returns = benchmarks[bench].reindex(portfolio_returns.index, method='ffill').fillna(0)
-                                            u = to_empirical_cdf(portfolio_returns)
-                                            v = to_empirical_cdf(bench_returns)
-                                            tau = stats.kendalltau(u.values, v.values)[0]
-                                            theta_lower, _ = estimate_gumbel_270_parameter(u.values, v.values)
-                                            lambda_lower, _ = gumbel_270_tail_dependence(theta_lower)
-                                            theta_upper, _ = estimate_gumbel_180_parameter(u.values, v.values)
-                                            _, lambda_upper = gumbel_180_tail_dependence(theta_upper)
-                                            asymmetry = (lambda_lower - lambda_upper) / (lambda_lower + lambda_upper) if (lambda_lower + lambda_upper) > 0 else 0
-                                            
-                                            exposure_data.append({
-                                                'Benchmark': f'{bench} - Full Period',
-                                                'Kendall Tau': tau,
-                                                'Tail Lower': lambda_lower,
-                                                'Tail Upper': lambda_upper,
-                                                'Asymmetry': asymmetry
-                                            })
+                                        exposure_data.append({
+                                            'Benchmark': f'{bench} - Full Period',
+                                            'Kendall Tau': tau,
+                                            'Tail Lower': lambda_lower,
+                                            'Tail Upper': lambda_upper,
+                                            'Asymmetry': asymmetry
+                                        })
                                 
                                 exposure_df = pd.DataFrame(exposure_data)
-                                st.dataframe(
-                                    exposure_df.style.format({col: "{:.4f}" for col in exposure_df.columns if col != 'Benchmark'})
-                                    .background_gradient(cmap='RdYlGn', subset=[col for col in exposure_df.columns if col != 'Benchmark'], vmin=-1, vmax=1),
-                                    use_container_width=True, hide_index=True
-                                )
+                                st.markdown(style_exposure_table(exposure_df), unsafe_allow_html=True)
                             else:
                                 st.info("Select at least one benchmark to view exposures")
                             
@@ -11210,44 +11332,36 @@ CREATE POLICY "Allow all operations" ON recommended_portfolios
                             st.markdown("### 📈 Portfolio Exposure Time Series Analysis")
                             st.info("💡 Select a benchmark below to visualize the evolution of portfolio exposure metrics over time")
                             
-                            available_ts_benchmarks = ['None'] + [b for b in ['CDI', 'USDBRL', 'GOLD', 'IBOVESPA', 'SP500', 'BITCOIN'] if b in benchmarks.columns]
+                            available_ts_benchmarks = ('None',) + _available_benchmarks(tuple(benchmarks.columns))
                             selected_ts_benchmark = st.selectbox("Select Benchmark for Time Series:", available_ts_benchmarks, index=0, key="rec_ts_bench")
                             
                             if selected_ts_benchmark != 'None' and selected_ts_benchmark in benchmarks.columns:
                                 with st.spinner(f'Calculating exposure time series for {selected_ts_benchmark}...'):
-                                    copula_results = estimate_rolling_copula_for_chart(
-                                        portfolio_returns,
-                                        benchmarks[selected_ts_benchmark],
-                                        window=250
-                                    )
+                                    if selected_ts_benchmark in copula_by_bench:
+                                        copula_results = copula_by_bench[selected_ts_benchmark]
+                                    else:
+                                        copula_results = estimate_rolling_copula_cached(
+                                            _series_content_key(portfolio_returns),
+                                            _series_content_key(benchmarks[selected_ts_benchmark]),
+                                            250,
+                                            portfolio_returns,
+                                            benchmarks[selected_ts_benchmark]
+                                        )
                                     
                                     if copula_results is not None:
-                                        current_kendall = copula_results['kendall_tau'].iloc[-1]
-                                        avg_kendall = copula_results['kendall_tau'].mean()
-                                        current_tail_lower = copula_results['tail_lower'].iloc[-1]
-                                        avg_tail_lower = copula_results['tail_lower'].mean()
-                                        current_tail_upper = copula_results['tail_upper'].iloc[-1]
-                                        avg_tail_upper = copula_results['tail_upper'].mean()
-                                        current_asymmetry = copula_results['asymmetry_index'].iloc[-1]
-                                        avg_asymmetry = copula_results['asymmetry_index'].mean()
+                                        last_vals, avg_vals = copula_last_and_average(copula_results)
+                                        current_kendall, current_tail_lower, current_tail_upper, current_asymmetry = last_vals
+                                        avg_kendall, avg_tail_lower, avg_tail_upper, avg_asymmetry = avg_vals
                                         
                                         st.markdown(f"##### Portfolio Exposure Evolution - {selected_ts_benchmark}")
                                         
-                                        row1_col1, row1_col2 = st.columns(2)
-                                        with row1_col1:
-                                            fig_kendall = create_exposure_time_series_chart(copula_results, 'kendall_tau', current_kendall, avg_kendall, selected_ts_benchmark)
-                                            st.plotly_chart(fig_kendall, use_container_width=True)
-                                        with row1_col2:
-                                            fig_asymmetry = create_exposure_time_series_chart(copula_results, 'asymmetry_index', current_asymmetry, avg_asymmetry, selected_ts_benchmark)
-                                            st.plotly_chart(fig_asymmetry, use_container_width=True)
-                                        
-                                        row2_col1, row2_col2 = st.columns(2)
-                                        with row2_col1:
-                                            fig_tail_lower = create_exposure_time_series_chart(copula_results, 'tail_lower', current_tail_lower, avg_tail_lower, selected_ts_benchmark)
-                                            st.plotly_chart(fig_tail_lower, use_container_width=True)
-                                        with row2_col2:
-                                            fig_tail_upper = create_exposure_time_series_chart(copula_results, 'tail_upper', current_tail_upper, avg_tail_upper, selected_ts_benchmark)
-                                            st.plotly_chart(fig_tail_upper, use_container_width=True)
+                                        fig_exposure = cached_exposure_time_series_grid(
+                                            copula_results,
+                                            dict(zip(COPULA_METRICS, last_vals)),
+                                            dict(zip(COPULA_METRICS, avg_vals)),
+                                            selected_ts_benchmark
+                                        )
+                                        st.plotly_chart(fig_exposure, use_container_width=True)
                                         
                                         st.markdown("##### Summary Statistics")
                                         mc1, mc2, mc3, mc4 = st.columns(4)
@@ -12049,8 +12163,7 @@ CREATE POLICY "Allow all operations" ON recommended_portfolios
                 return None, None
             
             # Calculate rolling compound returns
-            rolling_returns = (1 + daily_returns).rolling(window=window).apply(lambda x: x.prod() - 1, raw=True)
-            rolling_returns = rolling_returns.dropna()
+            rolling_returns = rolling_compound_returns(daily_returns, window).dropna()
             
             if len(rolling_returns) < 10:
                 return None, None
@@ -12743,10 +12856,7 @@ CREATE POLICY "Allow all operations" ON recommended_portfolios
             
             # Template download
             template_df = create_risk_monitor_template()
-            buffer = io.BytesIO()
-            with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
-                template_df.to_excel(writer, index=False, sheet_name='Funds')
-            buffer.seek(0)
+            buffer = excel_template_bytes(template_df, sheet_name='Funds')
             
             col1, col2 = st.columns([1, 2])
             with col1:
@@ -12795,7 +12905,8 @@ CREATE POLICY "Allow all operations" ON recommended_portfolios
             
             available_funds = sorted(fund_metrics['FUNDO DE INVESTIMENTO'].dropna().unique().tolist())
             # Filter out already selected funds
-            remaining_funds = [f for f in available_funds if f not in st.session_state['risk_monitor_funds']]
+            selected_set = set(st.session_state['risk_monitor_funds'])
+            remaining_funds = [f for f in available_funds if f not in selected_set]
             
             col1, col2, col3 = st.columns([3, 1, 1])
             
@@ -12941,18 +13052,19 @@ CREATE POLICY "Allow all operations" ON risk_monitor_funds
             # Get fund data with categories
             monitor_funds = st.session_state['risk_monitor_funds']
             
-            # Build fund info with sub-categories
+            # Build fund info with sub-categories (one name-indexed lookup, first row per fund)
+            monitor_meta = build_fund_lookup(fund_metrics, ('SUBCATEGORIA BTG', 'CNPJ', 'CNPJ_STANDARD', 'LAST_UPDATE'))
             fund_info_list = []
             for fund_name in monitor_funds:
-                fund_row = fund_metrics[fund_metrics['FUNDO DE INVESTIMENTO'] == fund_name]
-                if len(fund_row) > 0:
-                    subcategory = fund_row['SUBCATEGORIA BTG'].iloc[0] if 'SUBCATEGORIA BTG' in fund_row.columns else 'Other'
+                fund_row = monitor_meta.get(fund_name)
+                if fund_row is not None:
+                    subcategory = fund_row.get('SUBCATEGORIA BTG', 'Other')
                     # Rename "-" to "Multimercado"
                     if pd.isna(subcategory) or subcategory == '-' or subcategory == '':
                         subcategory = 'Multimercado'
-                    cnpj = fund_row['CNPJ'].iloc[0] if 'CNPJ' in fund_row.columns else None
-                    cnpj_standard = fund_row['CNPJ_STANDARD'].iloc[0] if 'CNPJ_STANDARD' in fund_row.columns else standardize_cnpj(cnpj) if cnpj else None
-                    update = fund_row['LAST_UPDATE'].iloc[0] if 'LAST_UPDATE' in fund_row.columns else 'N/A'
+                    cnpj = fund_row.get('CNPJ')
+                    cnpj_standard = fund_row['CNPJ_STANDARD'] if 'CNPJ_STANDARD' in fund_row else standardize_cnpj(cnpj) if cnpj else None
+                    update = fund_row.get('LAST_UPDATE', 'N/A')
                     
                     fund_info_list.append({
                         'name': fund_name,
@@ -0,0 +1,338 @@
+"""
+═══════════════════════════════════════════════════════════════════════════════
+COPULA NUMBA MODULE - JIT kernels for copula exposure estimation
+═══════════════════════════════════════════════════════════════════════════════
+Compiled counterparts of the copula helpers in app.py. They live in their own
+module so Streamlit reruns (which re-execute app.py) do not recompile them.
+
+Importing this module raises ImportError when numba is not installed; app.py
+guards the import and falls back to scipy.
+"""
+
+import numpy as np
+from numba import njit, types
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# RANKS AND KENDALL TAU
+# ═══════════════════════════════════════════════════════════════════════════════
+
+@njit(cache=True, nogil=True)
+def average_ranks(x):
+    """Average ranks (1-based), as stats.rankdata(method='average')."""
+    n = x.shape[0]
+    order = np.argsort(x, kind='mergesort')
+    ranks = np.empty(n)
+    i = 0
+    while i < n:
+        j = i + 1
+        while j < n and x[order[j]] == x[order[i]]:
+            j += 1
+        avg = 0.5 * (i + j - 1) + 1.0
+        for k in range(i, j):
+            ranks[order[k]] = avg
+        i = j
+    return ranks
+
+
+@njit(cache=True, nogil=True)
+def kendall_tau_knight(x, y):
+    """
+    Kendall's tau-b with Knight's O(n log n) algorithm (tie-corrected).
+    
+    Pairs are ordered by (x, y); discordant pairs are the inversions
+    counted by a bottom-up merge sort over y.
+    """
+    n = x.shape[0]
+    if n < 2:
+        return np.nan
+    
+    # Lexicographic order by (x, y) from two stable sorts
+    perm = np.argsort(y, kind='mergesort')
+    perm = perm[np.argsort(x[perm], kind='mergesort')]
+    xs = x[perm]
+    ys = y[perm].copy()
+    
+    # Ties in x (n1) and joint ties in (x, y) (n3)
+    n1 = 0.0
+    n3 = 0.0
+    run_x = 1
+    run_xy = 1
+    for i in range(1, n):
+        if xs[i] == xs[i - 1]:
+            run_x += 1
+            if ys[i] == ys[i - 1]:
+                run_xy += 1
+            else:
+                n3 += run_xy * (run_xy - 1) / 2.0
+                run_xy = 1
+        else:
+            n1 += run_x * (run_x - 1) / 2.0
+            n3 += run_xy * (run_xy - 1) / 2.0
+            run_x = 1
+            run_xy = 1
+    n1 += run_x * (run_x - 1) / 2.0
+    n3 += run_xy * (run_xy - 1) / 2.0
+    
+    # Bottom-up merge sort on y counting strict inversions (swaps)
+    swaps = 0.0
+    buf = np.empty_like(ys)
+    width = 1
+    while width < n:
+        for lo in range(0, n, 2 * width):
+            mid = min(lo + width, n)
+            hi = min(lo + 2 * width, n)
+            i = lo
+            j = mid
+            k = lo
+            while i < mid and j < hi:
+                if ys[j] < ys[i]:
+                    buf[k] = ys[j]
+                    swaps += mid - i
+                    j += 1
+                else:
+                    buf[k] = ys[i]
+                    i += 1
+                k += 1
+            while i < mid:
+                buf[k] = ys[i]
+                i += 1
+                k += 1
+            while j < hi:
+                buf[k] = ys[j]
+                j += 1
+                k += 1
+        ys, buf = buf, ys
+        width *= 2
+    
+    # Ties in y (n2) on the now sorted y
+    n2 = 0.0
+    run_y = 1
+    for i in range(1, n):
+        if ys[i] == ys[i - 1]:
+            run_y += 1
+        else:
+            n2 += run_y * (run_y - 1) / 2.0
+            run_y = 1
+    n2 += run_y * (run_y - 1) / 2.0
+    
+    n0 = n * (n - 1) / 2.0
+    denom = np.sqrt((n0 - n1) * (n0 - n2))
+    if denom == 0.0:
+        return np.nan
+    tau = (n0 - n1 - n2 + n3 - 2.0 * swaps) / denom
+    return min(1.0, max(-1.0, tau))
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# ROTATED GUMBEL MLE
+# ═══════════════════════════════════════════════════════════════════════════════
+
+@njit(cache=True, nogil=True)
+def _gumbel_rotated_terms(u, v, rotate_v):
+    """Theta-independent terms of the rotated Gumbel density (270° if not rotate_v, else 180°)."""
+    n = u.shape[0]
+    log_u = np.empty(n)
+    log_v = np.empty(n)
+    log_uv = np.empty(n)
+    for i in range(n):
+        ur = min(max(1.0 - u[i], 1e-10), 1 - 1e-10)
+        if rotate_v:
+            vr = min(max(1.0 - v[i], 1e-10), 1 - 1e-10)
+        else:
+            vr = min(max(v[i], 1e-10), 1 - 1e-10)
+        log_u[i] = -np.log(ur)
+        log_v[i] = -np.log(vr)
+        log_uv[i] = np.log(ur * vr)
+    return log_u, log_v, np.log(log_u), np.log(log_v), log_uv
+
+@njit(cache=True, nogil=True)
+def _gumbel_rotated_neg_loglik(log_u, log_v, ll_u, ll_v, log_uv, theta):
+    """
+    Negative log-likelihood of the rotated Gumbel copula, evaluated in log space
+    (exp/log of precomputed terms instead of repeated powers).
+    """
+    if theta <= 1.0:
+        return 1e10
+    inv_theta = 1.0 / theta
+    log_floor = np.log(1e-10)
+    total = 0.0
+    for i in range(log_u.shape[0]):
+        s_pow = np.exp(theta * ll_u[i]) + np.exp(theta * ll_v[i])
+        log_s = np.log(s_pow)
+        log_sum_term = inv_theta * log_s
+        sum_term = np.exp(log_sum_term)
+        log_c = (-sum_term + log_sum_term + (theta - 1) * (ll_u[i] + ll_v[i])
+                 + (inv_theta - 2) * log_s + np.log(1 + (theta - 1) / sum_term) - log_uv[i])
+        # Same as log(np.maximum(c, 1e-10)), NaN propagates
+        if log_c <= log_floor:
+            total += log_floor
+        else:
+            total += log_c
+    return -total
+
+@njit(cache=True, nogil=True)
+def fit_gumbel_rotated(u, v, rotate_v, lo, hi, xatol, maxiter):
+    """Bounded Brent minimization - port of scipy's minimize_scalar(method='bounded')."""
+    log_u, log_v, ll_u, ll_v, log_uv = _gumbel_rotated_terms(u, v, rotate_v)
+    flag = 0
+    sqrt_eps = np.sqrt(2.2e-16)
+    golden_mean = 0.5 * (3.0 - np.sqrt(5.0))
+    a, b = lo, hi
+    fulc = a + golden_mean * (b - a)
+    nfc, xf = fulc, fulc
+    rat = 0.0
+    e = 0.0
+    x = xf
+    fx = _gumbel_rotated_neg_loglik(log_u, log_v, ll_u, ll_v, log_uv, x)
+    num = 1
+    fu = np.inf
+    ffulc = fx
+    fnfc = fx
+    xm = 0.5 * (a + b)
+    tol1 = sqrt_eps * np.abs(xf) + xatol / 3.0
+    tol2 = 2.0 * tol1
+    while np.abs(xf - xm) > (tol2 - 0.5 * (b - a)):
+        golden = True
+        if np.abs(e) > tol1:
+            golden = False
+            r = (xf - nfc) * (fx - ffulc)
+            q = (xf - fulc) * (fx - fnfc)
+            p = (xf - fulc) * q - (xf - nfc) * r
+            q = 2.0 * (q - r)
+            if q > 0.0:
+                p = -p
+            q = np.abs(q)
+            r = e
+            e = rat
+            if (np.abs(p) < np.abs(0.5 * q * r)) and (p > q * (a - xf)) and (p < q * (b - xf)):
+                rat = (p + 0.0) / q
+                x = xf + rat
+                if ((x - a) < tol2) or ((b - x) < tol2):
+                    si = np.sign(xm - xf) + ((xm - xf) == 0)
+                    rat = tol1 * si
+            else:
+                golden = True
+        if golden:
+            if xf >= xm:
+                e = a - xf
+            else:
+                e = b - xf
+            rat = golden_mean * e
+        si = np.sign(rat) + (rat == 0)
+        x = xf + si * max(np.abs(rat), tol1)
+        fu = _gumbel_rotated_neg_loglik(log_u, log_v, ll_u, ll_v, log_uv, x)
+        num += 1
+        if fu <= fx:
+            if x >= xf:
+                a = xf
+            else:
+                b = xf
+            fulc, ffulc = nfc, fnfc
+            nfc, fnfc = xf, fx
+            xf, fx = x, fu
+        else:
+            if x < xf:
+                a = x
+            else:
+                b = x
+            if (fu <= fnfc) or (nfc == xf):
+                fulc, ffulc = nfc, fnfc
+                nfc, fnfc = x, fu
+            elif (fu <= ffulc) or (fulc == xf) or (fulc == nfc):
+                fulc, ffulc = x, fu
+        xm = 0.5 * (a + b)
+        tol1 = sqrt_eps * np.abs(xf) + xatol / 3.0
+        tol2 = 2.0 * tol1
+        if num >= maxiter:
+            flag = 1
+            break
+    if np.isnan(xf) or np.isnan(fx) or np.isnan(fu):
+        flag = 2
+    return xf, flag == 0
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# ROLLING WINDOW KERNEL
+# ═══════════════════════════════════════════════════════════════════════════════
+
+# Explicit signature: compiled eagerly when the module is imported (and cached to
+# disk), so the first chart of a session does not wait for JIT compilation.
+# Inputs are typed read-only so pandas' read-only to_numpy() views are accepted.
+_F8_IN = types.Array(types.float64, 1, 'A', readonly=True)
+_F8_OUT = types.Array(types.float64, 1, 'C')
+
+
+@njit(types.UniTuple(_F8_OUT, 4)(_F8_IN, _F8_IN, types.int64), cache=True, nogil=True)
+def rolling_copula_numba(fund_arr, bench_arr, window):
+    """
+    All rolling windows in one compiled pass: ECDF ranks, Kendall tau and both
+    rotated-Gumbel MLEs, with the same fallbacks as estimate_rolling_copula_for_chart in app.py.
+    """
+    n_windows = fund_arr.shape[0] - window + 1
+    kendall = np.zeros(n_windows)
+    tail_lower = np.zeros(n_windows)
+    tail_upper = np.zeros(n_windows)
+    asym = np.zeros(n_windows)
+    for i in range(n_windows):
+        u = average_ranks(fund_arr[i:i + window]) / (window + 1)
+        v = average_ranks(bench_arr[i:i + window]) / (window + 1)
+        tau = kendall_tau_knight(u, v)
+        kendall[i] = tau
+        
+        # Gumbel 270° (lower tail) and 180° (upper tail); skipped for tau <= 0.01
+        success_lower = False
+        success_upper = False
+        theta_lower = 1.1
+        theta_upper = 1.1
+        if not (tau <= 0.01):
+            theta_lower, success_lower = fit_gumbel_rotated(u, v, False, 1.01, 20.0, 1e-4, 500)
+            theta_upper, success_upper = fit_gumbel_rotated(u, v, True, 1.01, 20.0, 1e-4, 500)
+        
+        tail_lower[i] = 2 - 2 ** (1 / theta_lower) if success_lower else 0.1
+        tail_upper[i] = 2 - 2 ** (1 / theta_upper) if success_upper else tail_lower[i] / 3.0
+        
+        lam_sum = tail_lower[i] + tail_upper[i]
+        asym[i] = (tail_lower[i] - tail_upper[i]) / lam_sum if lam_sum > 0 else 0.0
+    return kendall, tail_lower, tail_upper, asym
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# FULL-PERIOD KERNEL
+# ═══════════════════════════════════════════════════════════════════════════════
+
+# Eagerly compiled like the rolling kernel: the exposure fallback is hit on short
+# histories, where JIT compilation would dominate the first render.
+_F8_IN_2D = types.Array(types.float64, 2, 'A', readonly=True)
+
+
+@njit(types.UniTuple(_F8_OUT, 4)(_F8_IN, _F8_IN_2D), cache=True, nogil=True)
+def full_period_copula_numba(u, bench_arrs):
+    """
+    Full-period copula metrics of one fund ECDF u against each row of bench_arrs
+    (raw benchmark returns aligned to the fund dates), as _compute_exposure_row in app.py.
+    """
+    n_bench = bench_arrs.shape[0]
+    n = bench_arrs.shape[1]
+    kendall = np.zeros(n_bench)
+    tail_lower = np.zeros(n_bench)
+    tail_upper = np.zeros(n_bench)
+    asym = np.zeros(n_bench)
+    for k in range(n_bench):
+        v = average_ranks(bench_arrs[k]) / (n + 1)
+        tau = kendall_tau_knight(u, v)
+        kendall[k] = tau
+        
+        # Estimators return theta = 1.1 for tau <= 0.01; the fit is used regardless of success
+        theta_lower = 1.1
+        theta_upper = 1.1
+        if not (tau <= 0.01):
+            theta_lower, _ = fit_gumbel_rotated(u, v, False, 1.01, 20.0, 1e-4, 500)
+            theta_upper, _ = fit_gumbel_rotated(u, v, True, 1.01, 20.0, 1e-4, 500)
+        
+        tail_lower[k] = 2 - 2 ** (1 / theta_lower)
+        tail_upper[k] = 2 - 2 ** (1 / theta_upper)
+        
+        lam_sum = tail_lower[k] + tail_upper[k]
+        asym[k] = (tail_lower[k] - tail_upper[k]) / lam_sum if lam_sum > 0 else 0.0
+    return kendall, tail_lower, tail_upper, asym
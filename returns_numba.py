@@ -0,0 +1,27 @@
+"""
+═══════════════════════════════════════════════════════════════════════════════
+RETURNS NUMBA MODULE - JIT kernels for return aggregation
+═══════════════════════════════════════════════════════════════════════════════
+Kept outside app.py on purpose: Streamlit re-executes the app script on every
+rerun, which would redefine (and recompile) any @njit function declared there.
+Functions in an imported module are compiled once per process and, with
+cache=True, reused across restarts.
+
+Importing this module raises ImportError when numba is not installed; app.py
+guards the import and falls back to pandas.
+"""
+
+import numpy as np
+from numba import njit
+
+
+# fastmath without 'nnan' so the NaN guard is kept
+@njit(cache=True, fastmath={'nsz', 'arcp', 'contract', 'afn', 'reassoc'})
+def compound_by_group(values, group_ids, n_groups):
+    """Single pass: accumulate log1p per group, then expm1. NaNs are skipped."""
+    acc = np.zeros(n_groups)
+    for i in range(values.shape[0]):
+        x = values[i]
+        if x == x:
+            acc[group_ids[i]] += np.log1p(x)
+    return np.expm1(acc)